@@ -0,0 +1,227 @@
+"""
+로컬 KIS 대역 서버 - 기록된 fixture 번들 재생
+
+modules/kis_recorder.py로 기록한 번들(.jsonl)을 읽어 KIS Open API와 같은 경로로
+응답한다. 지연/지터, 429·500 오류 주입, 초당 호출 제한을 설정할 수 있어 실시간
+KIS 없이 부하·성능 실험을 반복 재현할 수 있다.
+
+    python -m api.kis_standin --bundle .cache/kis_record --port 8900 --latency-ms 40 --jitter-ms 20
+    KIS_BASE_URL=http://127.0.0.1:8900 KIS_APP_KEY=dummy KIS_APP_SECRET=dummy python main.py --test
+
+응답 매칭 순서:
+1. (path, tr_id, tr_cont, params) 정확 일치 - 같은 요청이 여러 번 기록됐으면 순서대로 순환
+2. (path, tr_id) 일치 - 다른 종목 파라미터라도 기록된 응답을 순환 재생 (부하 실험용)
+3. 없으면 404 + rt_cd "1"
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from modules.kis_recorder import load_bundles, request_key
+
+# kis_client.py / kis_rank.py / collect_paper_trading.py가 호출하는 시세 경로
+KIS_QUOTATION_PATHS = {
+    "/uapi/domestic-stock/v1/quotations/inquire-price": "FHKST01010100",
+    "/uapi/domestic-stock/v1/quotations/inquire-investor": "FHKST01010900",
+    "/uapi/domestic-stock/v1/quotations/investor-trend-estimate": "HHPTJ04160200",
+    "/uapi/domestic-stock/v1/quotations/foreign-institution-total": "FHPTJ04400000",
+    "/uapi/domestic-stock/v1/quotations/inquire-daily-itemchartprice": "FHKST03010100",
+    "/uapi/domestic-stock/v1/quotations/inquire-daily-indexchartprice": "FHKUP03500100",
+    "/uapi/domestic-stock/v1/quotations/inquire-time-itemchartprice": "FHKST03010200",
+    "/uapi/domestic-stock/v1/quotations/daily-short-sale": "FHPST04830000",
+    "/uapi/domestic-stock/v1/quotations/volume-rank": "FHPST01710000",
+    "/uapi/domestic-stock/v1/ranking/fluctuation": "FHPST01700000",
+    "/uapi/domestic-stock/v1/finance/financial-ratio": "FHKST66430300",
+}
+
+# 실제 KIS가 초당 호출 제한 초과 시 돌려주는 응답 (HTTP 500)
+RATE_LIMIT_BODY = {"rt_cd": "1", "msg_cd": "EGW00201", "msg1": "초당 거래건수를 초과하였습니다."}
+
+
+class ReplayBook:
+    """기록 항목 → 요청 키별 응답 큐 (스레드 안전 순환 재생)"""
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        self._lock = threading.Lock()
+        self.exact: Dict[Tuple, List[Dict[str, Any]]] = {}
+        self.by_tr: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        self._cursor: Counter = Counter()
+        for entry in entries:
+            key = request_key(entry.get("path", ""), entry.get("tr_id", ""), entry.get("params"), entry.get("tr_cont", ""))
+            self.exact.setdefault(key, []).append(entry)
+            self.by_tr.setdefault(key[:2], []).append(entry)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self.exact.values())
+
+    def _next(self, bucket: Tuple, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        with self._lock:
+            idx = self._cursor[bucket] % len(entries)
+            self._cursor[bucket] += 1
+        return entries[idx]
+
+    def lookup(self, path: str, tr_id: str, params: Dict[str, Any], tr_cont: str = "") -> Tuple[Optional[Dict[str, Any]], str]:
+        """(기록 항목, 매칭 종류 exact|fallback|miss)"""
+        key = request_key(path, tr_id, params, tr_cont)
+        if key in self.exact:
+            return self._next(("exact",) + key, self.exact[key]), "exact"
+        if key[:2] in self.by_tr:
+            return self._next(("tr",) + key[:2], self.by_tr[key[:2]]), "fallback"
+        return None, "miss"
+
+
+class RateLimiter:
+    """1초 슬라이딩 윈도우 호출 제한 (0이면 무제한)"""
+
+    def __init__(self, per_second: float):
+        self.per_second = per_second
+        self._calls: deque = deque()
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        if self.per_second <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            while self._calls and now - self._calls[0] >= 1.0:
+                self._calls.popleft()
+            if len(self._calls) >= self.per_second:
+                return False
+            self._calls.append(now)
+            return True
+
+
+def create_app(
+    entries: List[Dict[str, Any]],
+    latency_ms: Optional[float] = 0.0,
+    jitter_ms: float = 0.0,
+    error_429: float = 0.0,
+    error_500: float = 0.0,
+    rate_limit: float = 20.0,
+    seed: Optional[int] = None,
+) -> FastAPI:
+    """대역 서버 앱 생성
+
+    Args:
+        entries: load_bundles() 결과
+        latency_ms: 응답 기본 지연 (None이면 기록된 elapsed_ms 재현)
+        jitter_ms: 지연에 더할 균등 분포 지터 최대값
+        error_429: 429 응답 주입 확률 (0~1)
+        error_500: 500 응답 주입 확률 (0~1)
+        rate_limit: 초당 허용 호출 수 (초과 시 KIS와 같은 EGW00201 500 응답, 0이면 무제한)
+        seed: 지터/오류 주입 난수 시드 (재현용)
+    """
+    app = FastAPI(title="KIS stand-in")
+    book = ReplayBook(entries)
+    limiter = RateLimiter(rate_limit)
+    rng = random.Random(seed)
+    stats: Counter = Counter()
+    by_path: Counter = Counter()
+
+    async def _delay(entry: Optional[Dict[str, Any]]) -> None:
+        base = float(entry.get("elapsed_ms", 0)) if latency_ms is None and entry else (latency_ms or 0.0)
+        total = base + (rng.uniform(0, jitter_ms) if jitter_ms else 0.0)
+        if total > 0:
+            await asyncio.sleep(total / 1000)
+
+    @app.post("/oauth2/tokenP")
+    async def token():
+        stats["token"] += 1
+        return {
+            "access_token": "standin-token",
+            "access_token_token_expired": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(time.time() + 86400)),
+            "token_type": "Bearer",
+            "expires_in": 86400,
+        }
+
+    @app.get("/standin/stats")
+    async def standin_stats():
+        return {
+            "fixtures": len(book),
+            "counts": dict(stats),
+            "by_path": dict(by_path),
+            "unrecorded_paths": sorted(p for p in KIS_QUOTATION_PATHS if (p, KIS_QUOTATION_PATHS[p]) not in book.by_tr),
+        }
+
+    @app.post("/standin/reset")
+    async def standin_reset():
+        stats.clear()
+        by_path.clear()
+        return {"ok": True}
+
+    @app.api_route("/uapi/{rest:path}", methods=["GET", "POST"])
+    async def replay(rest: str, request: Request):
+        path = f"/uapi/{rest}"
+        tr_id = request.headers.get("tr_id", "")
+        tr_cont = request.headers.get("tr_cont", "")
+        if request.method == "GET":
+            params = dict(request.query_params)
+        else:
+            try:
+                params = await request.json()
+            except ValueError:
+                params = {}
+        stats["requests"] += 1
+        by_path[path] += 1
+
+        if not limiter.allow():
+            stats["rate_limited"] += 1
+            return JSONResponse(RATE_LIMIT_BODY, status_code=500)
+        roll = rng.random()
+        if roll < error_429:
+            stats["injected_429"] += 1
+            await _delay(None)
+            return JSONResponse({"rt_cd": "1", "msg1": "Too Many Requests (stand-in)"}, status_code=429)
+        if roll < error_429 + error_500:
+            stats["injected_500"] += 1
+            await _delay(None)
+            return JSONResponse({"rt_cd": "1", "msg1": "Internal Server Error (stand-in)"}, status_code=500)
+
+        entry, match = book.lookup(path, tr_id, params, tr_cont)
+        stats[match] += 1
+        await _delay(entry)
+        if entry is None:
+            return JSONResponse({"rt_cd": "1", "msg1": f"기록 없음: {path} ({tr_id})"}, status_code=404)
+        return JSONResponse(entry.get("response", {}), status_code=int(entry.get("status", 200)))
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KIS fixture 번들 재생 서버")
+    parser.add_argument("--bundle", nargs="+", default=[os.getenv("KIS_RECORD_DIR") or ".cache/kis_record"],
+                        help="번들 파일(.jsonl) 또는 디렉토리")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", default="0", help="고정 지연(ms) 또는 'recorded' (기록된 응답 시간 재현)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-429", type=float, default=0.0, help="429 주입 확률 (0~1)")
+    parser.add_argument("--error-500", type=float, default=0.0, help="500 주입 확률 (0~1)")
+    parser.add_argument("--rate-limit", type=float, default=20.0, help="초당 허용 호출 수 (0: 무제한)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    entries = load_bundles(args.bundle)
+    print(f"[대역 서버] fixture {len(entries)}건 로드 ({', '.join(args.bundle)})")
+    latency = None if args.latency_ms == "recorded" else float(args.latency_ms)
+    app = create_app(entries, latency, args.jitter_ms, args.error_429, args.error_500, args.rate_limit, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
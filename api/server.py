@@ -2,13 +2,29 @@
 FastAPI 서버 - KIS API 실시간 호출 엔드포인트
 Refresh 버튼 클릭 시 최신 주식 데이터를 실시간으로 수집하여 반환
 """
+import gzip
+import hashlib
+import json
 import os
 import sys
+import threading
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+
+# brotli는 선택 의존성 (없으면 gzip만 사용)
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
 
 # 프로젝트 루트를 sys.path에 추가 (모듈 import 위해)
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -19,13 +35,100 @@ from config.settings import KIS_BASE_URL
 from modules.kis_client import KISClient
 from modules.kis_rank import KISRankAPI
 from modules.stock_filter import StockFilter
+from modules.stock_record import json_default
 from modules.stock_history import StockHistoryAPI
 from modules.exchange_rate import ExchangeRateAPI
 from modules.data_exporter import _strip_meta
+from modules.market_hours import is_market_hours
 from modules.utils import KST
 from main import collect_all_stocks
 
-app = FastAPI(title="Stock TOP10 API", version="1.0.0")
+# 사전 워밍 스케줄러 설정 (장중 백그라운드 갱신)
+PREWARM_ENABLED = os.environ.get("PREWARM_ENABLED", "").strip().lower() in ("1", "true", "yes")
+PREWARM_INTERVAL_SEC = max(15, int(os.environ.get("PREWARM_INTERVAL_SEC", "60") or 60))
+PREWARM_IDLE_SEC = 300  # 장외 시간 재확인 간격
+
+
+class _SnapshotStore:
+    """사전 워밍된 응답 스냅샷 + 증분 갱신용 상태 (스레드 안전)
+
+    - data: 마지막으로 조립된 /api/refresh 응답
+    - prices: 종목별 현재가 (가격 변동 종목만 재조회하기 위한 기준)
+    - history / investor: 종목별 일봉·수급 저장소 (가격 미변동 종목은 재사용)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 스케줄러와 요청 핸들러의 동시 수집 방지
+        self.refresh_lock = threading.Lock()
+        self.data = None
+        self.updated_at = 0.0
+        self.prices = {}
+        self.history = {}
+        self.investor = {}
+        self.investor_estimated = None
+
+    def get_fresh(self, max_age: float):
+        """max_age초 이내에 갱신된 스냅샷 반환 (없으면 None)"""
+        with self._lock:
+            if self.data is not None and time.monotonic() - self.updated_at <= max_age:
+                return self.data
+        return None
+
+    def candles(self):
+        """증분 갱신 기준 상태 복사본 반환"""
+        with self._lock:
+            return dict(self.prices), dict(self.history), dict(self.investor), self.investor_estimated
+
+    def update(self, data, prices, history, investor, investor_estimated):
+        with self._lock:
+            self.data = data
+            self.updated_at = time.monotonic()
+            self.prices = prices
+            self.history = history
+            self.investor = investor
+            self.investor_estimated = investor_estimated
+
+
+_snapshot = _SnapshotStore()
+
+
+def _prewarm_loop(stop_event: threading.Event):
+    """장중에는 PREWARM_INTERVAL_SEC 주기로 스냅샷 갱신, 장외에는 대기"""
+    print(f"[prewarm] 스케줄러 시작 (주기 {PREWARM_INTERVAL_SEC}초)")
+    while not stop_event.is_set():
+        if is_market_hours():
+            started = time.monotonic()
+            try:
+                with _snapshot.refresh_lock:
+                    data = _refresh_sync(store=_snapshot)
+                if "error" in data:
+                    print(f"  ⚠ [prewarm] 갱신 실패: {data['error']}")
+                else:
+                    print(f"  ✓ [prewarm] 스냅샷 갱신 완료 ({time.monotonic() - started:.1f}초)")
+            except Exception as e:
+                print(f"  ✗ [prewarm] 갱신 중 예외: {e}")
+            wait = PREWARM_INTERVAL_SEC
+        else:
+            wait = PREWARM_IDLE_SEC
+        stop_event.wait(wait)
+    print("[prewarm] 스케줄러 종료")
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    stop_event = threading.Event()
+    worker = None
+    if PREWARM_ENABLED:
+        worker = threading.Thread(target=_prewarm_loop, args=(stop_event,), name="prewarm", daemon=True)
+        worker.start()
+    yield
+    stop_event.set()
+    if worker is not None:
+        worker.join(timeout=5)
+
+
+app = FastAPI(title="Stock TOP10 API", version="1.0.0", lifespan=_lifespan)
 
 # CORS 설정
 ALLOWED_ORIGINS = os.environ.get("CORS_ORIGINS", "").split(",")
@@ -44,8 +147,138 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# 응답 압축 설정
+COMPRESS_MIN_BYTES = 1024  # 이보다 작은 응답은 압축하지 않음
+# 항상 포함되는 메타 필드 (?sections= 필터와 무관)
+_ALWAYS_SECTIONS = ("timestamp", "_warnings", "error", "errors")
+# 수집할 때마다 바뀌는 시각 필드 - ETag 계산에서 제외 (시세가 같으면 같은 ETag → 304)
+_VOLATILE_FIELDS = ("timestamp",)
+
+
+class _EncodedCache:
+    """스냅샷별 직렬화/압축 결과 캐시
+
+    같은 스냅샷 객체 + 같은 sections 조합이면 JSON 직렬화와 압축을 다시 하지 않음.
+    스냅샷이 교체되면 이전 항목은 모두 버린다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._source = None  # id 재사용 방지를 위해 객체 참조 유지
+        self._entries = {}
+
+    def get(self, data: dict, sections: tuple) -> dict:
+        with self._lock:
+            if self._source is not data:
+                self._source = data
+                self._entries = {}
+            entry = self._entries.get(sections)
+            if entry is None:
+                entry = _encode_payload(data, sections)
+                self._entries[sections] = entry
+            return entry
+
+
+def _without_volatile(data: dict) -> dict:
+    """ETag용 사본 - 최상위와 한 단계 아래(exchange 등)의 시각 필드 제거"""
+    stable = {}
+    for key, value in data.items():
+        if key in _VOLATILE_FIELDS:
+            continue
+        if isinstance(value, dict) and any(f in value for f in _VOLATILE_FIELDS):
+            value = {k: v for k, v in value.items() if k not in _VOLATILE_FIELDS}
+        stable[key] = value
+    return stable
+
+
+def _dumps(data: dict) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=json_default).encode("utf-8")
+
+
+def _encode_payload(data: dict, sections: tuple) -> dict:
+    """JSON 직렬화 + content-hash ETag 계산 (ETag는 시각 필드를 뺀 내용 기준)"""
+    if sections:
+        data = {k: v for k, v in data.items() if k in sections or k in _ALWAYS_SECTIONS}
+    etag = '"' + hashlib.sha256(_dumps(_without_volatile(data))).hexdigest()[:32] + '"'
+    return {"identity": _dumps(data), "etag": etag}
+
+
+def _negotiate_encoding(accept_encoding: str) -> str:
+    """Accept-Encoding 헤더에서 br > gzip > identity 순으로 선택 (q=0 제외)"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token] = q
+    wildcard = accepted.get("*", 0.0)
+    if brotli is not None and accepted.get("br", wildcard) > 0:
+        return "br"
+    if accepted.get("gzip", wildcard) > 0:
+        return "gzip"
+    return "identity"
+
+
+# nginx/Apache 등이 압축 응답 ETag에 붙이는 접미사
+_ETAG_ENCODING_SUFFIXES = ("-gzip", "-br", "-deflate")
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # 약한 비교: W/ 접두사 및 프록시가 붙이는 압축 접미사("abc-gzip" 등) 무시
+    candidates = set()
+    for token in if_none_match.split(","):
+        token = token.strip().removeprefix("W/")
+        candidates.add(token)
+        for suffix in _ETAG_ENCODING_SUFFIXES:
+            if token.endswith(suffix + '"'):
+                candidates.add(token[:-len(suffix) - 1] + '"')
+            elif token.endswith('"' + suffix):
+                candidates.add(token[:-len(suffix)])
+    return etag in candidates
+
+
+_encoded_cache = _EncodedCache()
+
+
+def _json_response(request: Request, data: dict, sections: tuple = ()) -> Response:
+    """ETag/조건부 GET + gzip/brotli 압축이 적용된 JSON 응답"""
+    entry = _encoded_cache.get(data, sections)
+    etag = entry["etag"]
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    body = entry["identity"]
+    encoding = _negotiate_encoding(request.headers.get("accept-encoding", ""))
+    if encoding != "identity" and len(body) >= COMPRESS_MIN_BYTES:
+        compressed = entry.get(encoding)
+        if compressed is None:
+            if encoding == "br":
+                compressed = brotli.compress(body, quality=5)
+            else:
+                compressed = gzip.compress(body, compresslevel=6)
+            entry[encoding] = compressed
+        body = compressed
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 @app.get("/api/health")
 def health():
@@ -67,8 +300,14 @@ def _check_kis_connectivity() -> "str | None":
         return f"KIS API 서버에 연결할 수 없습니다: {e}"
 
 
-def _refresh_sync():
-    """실시간 데이터 수집 로직 (동기)"""
+def _refresh_sync(store: "_SnapshotStore | None" = None):
+    """실시간 데이터 수집 로직 (동기)
+
+    Args:
+        store: 지정 시 증분 갱신 모드. 직전 스냅샷과 현재가가 같은 종목은
+               히스토리/수급을 재사용하고 가격이 바뀐 종목만 재조회한 뒤
+               결과를 store에 저장한다.
+    """
     errors = []
 
     # === Phase 0: KIS API 연결 테스트 (빠른 실패) ===
@@ -169,11 +408,40 @@ def _refresh_sync():
     investor_data = {}
     investor_estimated = False
 
+    # 증분 갱신: 가격이 바뀌었거나 새로 진입한 종목만 재조회
+    prev_prices, prev_history, prev_investor, prev_estimated = (
+        store.candles() if store is not None else ({}, {}, {}, None)
+    )
+    current_prices = {s["code"]: s.get("current_price") for s in all_stocks}
+    history_targets = [
+        s for s in all_stocks
+        if s["code"] not in prev_history or prev_prices.get(s["code"]) != current_prices[s["code"]]
+    ]
+    investor_targets = [
+        s for s in all_stocks
+        if s["code"] not in prev_investor or prev_prices.get(s["code"]) != current_prices[s["code"]]
+    ]
+    if store is not None:
+        print(f"  [증분] 히스토리 {len(history_targets)}/{len(all_stocks)}, "
+              f"수급 {len(investor_targets)}/{len(all_stocks)}종목 재조회")
+
     def fetch_history():
-        return history_api.get_multiple_stocks_history(all_stocks, days=3)
+        fetched = history_api.get_multiple_stocks_history(history_targets, days=3) if history_targets else {}
+        merged = {s["code"]: prev_history[s["code"]] for s in all_stocks if s["code"] in prev_history}
+        merged.update(fetched)
+        return merged
 
     def fetch_investor():
-        return rank_api.get_investor_data_auto(all_stocks)
+        fetched, estimated = (
+            rank_api.get_investor_data_auto(investor_targets) if investor_targets
+            else ({}, prev_estimated)
+        )
+        # 추정/확정 모드가 바뀌면 이전 수급 데이터는 섞지 않음
+        if prev_estimated is not None and estimated != prev_estimated and len(investor_targets) < len(all_stocks):
+            return rank_api.get_investor_data_auto(all_stocks)
+        merged = {s["code"]: prev_investor[s["code"]] for s in all_stocks if s["code"] in prev_investor}
+        merged.update(fetched)
+        return merged, bool(estimated)
 
     with ThreadPoolExecutor(max_workers=2) as executor:
         future_history = executor.submit(fetch_history)
@@ -217,14 +485,42 @@ def _refresh_sync():
     if errors:
         data["_warnings"] = errors
 
+    if store is not None:
+        store.update(data, current_prices, history_data, investor_data, investor_estimated)
+
     return data
 
 
 @app.get("/api/refresh")
-def refresh():
+def refresh(
+    request: Request,
+    sections: str = Query("", description="쉼표로 구분된 최상위 키만 반환 (예: rising,falling,history)"),
+):
     """실시간 데이터 수집 - latest.json과 동일한 구조 반환
 
     main.py의 step 1~9를 실행 (뉴스/텔레그램 제외)
     독립적인 API 호출은 ThreadPoolExecutor로 병렬 실행하여 응답 시간 단축
+    PREWARM_ENABLED 시 장중에는 사전 워밍된 스냅샷을 즉시 반환
+    응답은 ETag(If-None-Match → 304)와 gzip/brotli 압축을 지원
     """
-    return _refresh_sync()
+    section_keys = tuple(sorted({s.strip() for s in sections.split(",") if s.strip()}))
+    return _json_response(request, _get_refresh_data(), section_keys)
+
+
+def _get_refresh_data() -> dict:
+    """사전 워밍 스냅샷 또는 실시간 수집 결과 반환"""
+    if not PREWARM_ENABLED:
+        return _refresh_sync()
+
+    max_age = PREWARM_INTERVAL_SEC * 2
+    if is_market_hours():
+        snapshot = _snapshot.get_fresh(max_age)
+        if snapshot is not None:
+            return snapshot
+
+    # 스냅샷이 없거나 오래됨 → 진행 중인 갱신이 있으면 끝날 때까지 대기 후 재확인
+    with _snapshot.refresh_lock:
+        snapshot = _snapshot.get_fresh(max_age) if is_market_hours() else None
+        if snapshot is not None:
+            return snapshot
+        return _refresh_sync(store=_snapshot)
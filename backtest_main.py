@@ -14,8 +14,7 @@ from datetime import datetime, timedelta
 from config.settings import *  # noqa: F401,F403 — 환경변수 로드
 from modules.backtest import (
     get_active_predictions,
-    fetch_stock_returns,
-    fetch_index_return,
+    fetch_returns_by_period,
     evaluate_prediction,
     update_prediction_status,
     calculate_accuracy_report,
@@ -78,18 +77,13 @@ def main():
         "long_term": 45,   # 30 영업일 ≈ 45 달력일
     }
 
-    # 카테고리별 수익률 + 지수 수익률 캐시
-    returns_by_category = {}
-    index_by_category = {}
-    for cat, cal_days in category_periods.items():
-        start = (datetime.now(KST) - timedelta(days=cal_days)).strftime("%Y-%m-%d")
-        if all_codes:
-            returns_by_category[cat] = fetch_stock_returns(list(all_codes), start, end_date)
-        else:
-            returns_by_category[cat] = {}
-        index_by_category[cat] = fetch_index_return(start, end_date)
-
-    total_codes = sum(len(r) for r in returns_by_category.values())
+    # 가장 긴 기간으로 한 번만 배치 다운로드 후 카테고리별로 슬라이스
+    starts = {
+        cat: (datetime.now(KST) - timedelta(days=cal_days)).strftime("%Y-%m-%d")
+        for cat, cal_days in category_periods.items()
+    }
+    returns_by_category, index_by_category = fetch_returns_by_period(sorted(all_codes), starts, end_date)
+
     print(f"  ✓ 카테고리별 수익률 조회 완료 (종목 {len(all_codes)}개)")
     for cat in category_periods:
         print(f"    - {cat}: KOSPI {index_by_category[cat]:+.2f}%, 종목 {len(returns_by_category[cat])}개")
@@ -140,6 +134,8 @@ def main():
             print(f"  신뢰도 {conf}: {data['hit']}/{data['total']} ({data['accuracy']}%)")
         for cat, data in report.get("by_category", {}).items():
             print(f"  카테고리 {cat}: {data['hit']}/{data['total']} ({data['accuracy']}%)")
+        for theme, data in list(report.get("by_theme", {}).items())[:10]:
+            print(f"  테마 {theme}: {data['hit']}/{data['total']} ({data['accuracy']}%)")
     else:
         print("  ⏭ 정확도 리포트 건너뜀 (테스트 모드)")
 
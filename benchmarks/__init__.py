@@ -0,0 +1,6 @@
+"""
+성능 벤치마크
+
+- pipeline: 기록된 거래일 fixture로 main / api 갱신 / 예측 / 모의투자 파이프라인 전체를 재생 측정
+- stubs: 벤치마크 실행 중 외부 서비스(KIS, Gemini, Naver, Telegram, Supabase, yfinance) 대역
+"""
@@ -0,0 +1,272 @@
+"""
+지표·종목 기준 평가 마이크로 벤치마크 (규모별 시간/메모리 곡선)
+
+KIS 일봉(output2)과 같은 형식의 합성 캔들을 N종목 × B봉 규모로 만들어 아래 함수를
+측정한다. 종목별 연산 비용은 데이터 값과 무관하므로 서로 다른 히스토리 POOL_SIZE개를
+만들어 N종목에 돌려 쓰고(메모리 절약), 규모별 시간(최솟값)과 tracemalloc 최대 할당량을
+표로 출력한다. 로그-로그 기울기(N에 대한 차수)도 함께 보고한다.
+
+    rsi               FundamentalCollector.calculate_rsi
+    ema               stock_criteria._calc_ema (5/10/20/60/120)
+    ma_alignment      stock_criteria.check_ma_alignment
+    momentum_history  stock_criteria.check_momentum_history
+    high_breakout     stock_criteria.check_high_breakout
+    evaluate_all      stock_criteria.evaluate_all_stocks
+
+벡터화/증분 구현을 검증할 때는 --candidate 대상=모듈:함수로 같은 시그니처의 대체 구현을
+지정하면 기준 구현과 출력 동등성(실수 rtol 1e-9)과 속도 향상을 함께 보고한다.
+
+사용법:
+    python -m benchmarks.indicators                       # N 100~5000 × 120/250/500봉
+    python -m benchmarks.indicators --n 100,1000 --bars 250 --targets rsi,ema
+    python -m benchmarks.indicators --candidate rsi=modules.fast_indicators:calculate_rsi
+    python -m benchmarks.indicators --out .cache/indicators.json
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import math
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from modules import stock_criteria
+from modules.fundamental import FundamentalCollector
+
+DEFAULT_N = (100, 500, 1000, 2000, 5000)
+DEFAULT_BARS = (120, 250, 500)
+POOL_SIZE = 200  # 서로 다른 합성 히스토리 수
+EMA_PERIODS = (5, 10, 20, 60, 120)
+RTOL = 1e-9
+
+
+# ── 합성 데이터 ──────────────────────────────────────────────
+
+def synth_daily_prices(rng: np.random.Generator, bars: int) -> List[Dict[str, str]]:
+    """KIS 일봉 output2 형식 합성 캔들 (최신순, 값은 문자열)
+
+    로그 정규 랜덤워크에 가끔 상한가(+30%)·급등일을 섞어 끼/돌파 판정 분기도 지나가게 한다.
+    """
+    returns = rng.normal(0.0005, 0.025, bars)
+    spikes = rng.random(bars) < 0.01
+    returns[spikes] = 0.2999
+    closes = np.maximum(np.round(rng.uniform(2_000, 300_000) * np.exp(np.cumsum(returns))), 10).astype(int)
+    prev = np.concatenate([[closes[0]], closes[:-1]])
+    opens = np.maximum(np.round(prev * (1 + rng.normal(0, 0.01, bars))), 10).astype(int)
+    highs = np.maximum(closes, opens) + np.round(np.abs(rng.normal(0, 0.01, bars)) * closes).astype(int)
+    lows = np.minimum(closes, opens) - np.round(np.abs(rng.normal(0, 0.01, bars)) * closes).astype(int)
+    volumes = rng.integers(10_000, 5_000_000, bars)
+    days = np.datetime64("2026-01-02") - np.arange(bars)[::-1]
+
+    rows = []
+    for i in range(bars - 1, -1, -1):  # 최신순
+        rows.append({
+            "stck_bsop_date": str(days[i]).replace("-", ""),
+            "stck_clpr": str(closes[i]),
+            "stck_oprc": str(opens[i]),
+            "stck_hgpr": str(highs[i]),
+            "stck_lwpr": str(max(lows[i], 1)),
+            "prdy_vrss": str(closes[i] - prev[i]),
+            "acml_vol": str(volumes[i]),
+            "acml_tr_pbmn": str(int(volumes[i]) * int(closes[i])),
+        })
+    return rows
+
+
+class Dataset:
+    """N종목 × B봉 합성 데이터 (POOL_SIZE개 히스토리를 순환 배정)"""
+
+    def __init__(self, n_stocks: int, bars: int, seed: int = 0):
+        rng = np.random.default_rng(seed + bars)
+        pool = [synth_daily_prices(rng, bars) for _ in range(min(POOL_SIZE, n_stocks))]
+        self.n_stocks = n_stocks
+        self.bars = bars
+        self.codes = [f"{i:06d}" for i in range(n_stocks)]
+        self.daily = [pool[i % len(pool)] for i in range(n_stocks)]
+        self.closes = [[int(p["stck_clpr"]) for p in d] for d in pool]
+        self.stocks = []
+        for code, daily in zip(self.codes, self.daily):
+            price = int(daily[0]["stck_clpr"])
+            change = int(daily[0]["prdy_vrss"])
+            self.stocks.append({
+                "code": code, "name": code, "current_price": price, "change_price": change,
+                "change_rate": round(change / max(price - change, 1) * 100, 2),
+                "volume_rate": float(rng.uniform(50, 500)),
+            })
+        self.history_data = {code: {"raw_daily_prices": d} for code, d in zip(self.codes, self.daily)}
+        self.fundamental_data = {
+            code: {"w52_hgpr": int(max(int(p["stck_hgpr"]) for p in d[:250])), "rsi": 55.0,
+                   "pgtr_ntby_qty": 1000, "market_cap": 5000}
+            for code, d in zip(self.codes, self.daily)
+        }
+        self.investor_data = {code: {"foreign_net": 100, "institution_net": -50} for code in self.codes}
+        self.trading_value_data = {"kospi": self.stocks[:30], "kosdaq": self.stocks[30:60]}
+
+
+# ── 측정 대상 ────────────────────────────────────────────────
+
+_rsi_collector = FundamentalCollector(None)
+
+REFERENCES: Dict[str, Callable] = {
+    "rsi": _rsi_collector.calculate_rsi,
+    "ema": stock_criteria._calc_ema,
+    "ma_alignment": stock_criteria.check_ma_alignment,
+    "momentum_history": stock_criteria.check_momentum_history,
+    "high_breakout": stock_criteria.check_high_breakout,
+    "evaluate_all": stock_criteria.evaluate_all_stocks,
+}
+
+
+def _runner(target: str, fn: Callable, ds: Dataset) -> Callable[[], Any]:
+    """대상별 호출 방식 (전 종목 1회 평가 = 측정 1회)"""
+    if target == "rsi":
+        return lambda: [fn(d) for d in ds.daily]
+    if target == "ema":
+        pool_closes = ds.closes
+        return lambda: [[fn(pool_closes[i % len(pool_closes)], p) for p in EMA_PERIODS] for i in range(ds.n_stocks)]
+    if target == "ma_alignment":
+        return lambda: [fn(s["current_price"], d) for s, d in zip(ds.stocks, ds.daily)]
+    if target == "momentum_history":
+        return lambda: [fn(d) for d in ds.daily]
+    if target == "high_breakout":
+        return lambda: [fn(s["current_price"], d, ds.fundamental_data[s["code"]]["w52_hgpr"]) for s, d in zip(ds.stocks, ds.daily)]
+    if target == "evaluate_all":
+        def run():
+            with contextlib.redirect_stdout(io.StringIO()):  # 진행 로그 억제
+                return fn(ds.stocks, ds.history_data, ds.fundamental_data, ds.investor_data, ds.trading_value_data)
+        return run
+    raise ValueError(f"알 수 없는 대상: {target}")
+
+
+def measure(run: Callable[[], Any], repeat: int) -> Tuple[float, float, Any]:
+    """(최소 실행 시간 초, tracemalloc 최대 할당 MB, 마지막 출력)"""
+    best = math.inf
+    output = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = run()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / (1024 * 1024), output
+
+
+def equivalent(a: Any, b: Any, rtol: float = RTOL) -> bool:
+    """출력 동등성 (실수는 상대 오차 허용, dict/list는 재귀 비교)"""
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(equivalent(a[k], b[k], rtol) for k in a)
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return len(a) == len(b) and all(equivalent(x, y, rtol) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        if a is None or b is None:
+            return a is b
+        return math.isclose(a, b, rel_tol=rtol, abs_tol=rtol)
+    return a == b
+
+
+def _load_candidate(spec: str) -> Tuple[str, Callable]:
+    """'대상=모듈:함수' → (대상, 함수)"""
+    target, _, path = spec.partition("=")
+    module_name, _, attr = path.partition(":")
+    if target not in REFERENCES or not attr:
+        raise ValueError(f"잘못된 --candidate 형식: {spec} (예: rsi=modules.fast:calculate_rsi)")
+    return target, getattr(importlib.import_module(module_name), attr)
+
+
+def _slope(xs: List[float], ys: List[float]) -> Optional[float]:
+    """로그-로그 기울기 (규모 증가에 대한 시간 차수)"""
+    points = [(math.log(x), math.log(y)) for x, y in zip(xs, ys) if x > 0 and y > 0]
+    if len(points) < 2:
+        return None
+    return float(np.polyfit(*zip(*points), 1)[0])
+
+
+def run_benchmarks(
+    n_values, bars_values, targets, repeat: int = 3, candidates: Optional[Dict[str, Callable]] = None, seed: int = 0,
+) -> List[Dict[str, Any]]:
+    candidates = candidates or {}
+    rows = []
+    for bars in bars_values:
+        for n in n_values:
+            ds = Dataset(n, bars, seed)
+            for target in targets:
+                ref_sec, ref_mb, ref_out = measure(_runner(target, REFERENCES[target], ds), repeat)
+                row = {"target": target, "n": n, "bars": bars, "sec": round(ref_sec, 6), "peak_mb": round(ref_mb, 2),
+                       "us_per_stock": round(ref_sec / n * 1e6, 2)}
+                if target in candidates:
+                    cand_sec, cand_mb, cand_out = measure(_runner(target, candidates[target], ds), repeat)
+                    row.update({
+                        "candidate_sec": round(cand_sec, 6),
+                        "candidate_peak_mb": round(cand_mb, 2),
+                        "speedup": round(ref_sec / cand_sec, 2) if cand_sec else None,
+                        "equivalent": equivalent(ref_out, cand_out),
+                    })
+                rows.append(row)
+                cand = ""
+                if "speedup" in row:
+                    cand = f" | 후보 {row['candidate_sec'] * 1000:.1f}ms ×{row['speedup']} {'동등' if row['equivalent'] else '불일치'}"
+                print(f"  {target:<17} N={n:>5} bars={bars:>3}: {ref_sec * 1000:9.1f}ms "
+                      f"({row['us_per_stock']:.1f}µs/종목), 최대 {ref_mb:.1f}MB{cand}")
+    return rows
+
+
+def print_curves(rows: List[Dict[str, Any]]) -> None:
+    print("\n[규모 곡선] 대상별 시간 차수 (log 시간 / log N, bars 고정)")
+    for target in dict.fromkeys(r["target"] for r in rows):
+        for bars in dict.fromkeys(r["bars"] for r in rows):
+            sel = [r for r in rows if r["target"] == target and r["bars"] == bars]
+            slope = _slope([r["n"] for r in sel], [r["sec"] for r in sel])
+            if slope is not None:
+                print(f"  {target:<17} bars={bars:>3}: N^{slope:.2f}")
+    print("\n[규모 곡선] 대상별 봉 수 차수 (log 시간 / log bars, N 고정)")
+    for target in dict.fromkeys(r["target"] for r in rows):
+        for n in dict.fromkeys(r["n"] for r in rows):
+            sel = [r for r in rows if r["target"] == target and r["n"] == n]
+            slope = _slope([r["bars"] for r in sel], [r["sec"] for r in sel])
+            if slope is not None:
+                print(f"  {target:<17} N={n:>5}: bars^{slope:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="지표·기준 평가 마이크로 벤치마크")
+    parser.add_argument("--n", default=",".join(map(str, DEFAULT_N)), help="종목 수 목록 (쉼표 구분)")
+    parser.add_argument("--bars", default=",".join(map(str, DEFAULT_BARS)), help="종목당 봉 수 목록 (쉼표 구분)")
+    parser.add_argument("--targets", default=",".join(REFERENCES), help=f"쉼표 구분 ({', '.join(REFERENCES)})")
+    parser.add_argument("--repeat", type=int, default=3, help="반복 횟수 (최솟값 사용)")
+    parser.add_argument("--candidate", action="append", default=[], help="대체 구현 대상=모듈:함수 (반복 지정)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    n_values = [int(x) for x in args.n.split(",") if x]
+    bars_values = [int(x) for x in args.bars.split(",") if x]
+    targets = [t for t in args.targets.split(",") if t]
+    candidates = dict(_load_candidate(spec) for spec in args.candidate)
+
+    print(f"[지표 벤치마크] N={n_values} × bars={bars_values}, 대상 {len(targets)}개 (반복 {args.repeat}회)")
+    rows = run_benchmarks(n_values, bars_values, targets, args.repeat, candidates, args.seed)
+    print_curves(rows)
+
+    mismatched = [r for r in rows if r.get("equivalent") is False]
+    if args.out:
+        Path(args.out).write_text(json.dumps(rows, ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"\n  ✓ 결과 저장: {args.out}")
+    if mismatched:
+        print(f"\n  ✗ 후보 구현 출력 불일치 {len(mismatched)}건")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
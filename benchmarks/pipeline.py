@@ -0,0 +1,328 @@
+"""
+파이프라인 종단 벤치마크 (기록된 거래일 재생)
+
+각 시나리오를 독립된 자식 프로세스 + 임시 샌드박스에서 실행하여 모듈 전역 캐시·
+최대 RSS가 시나리오 사이에 섞이지 않게 한다. 외부 서비스는 benchmarks/stubs.py 대역으로
+교체되고, KIS는 거래일 번들을 재생하는 api/kis_standin 서버가 응답한다.
+
+시나리오:
+    main      main.main(test_mode=True)
+    refresh   api.server._refresh_sync()
+    forecast  forecast_main.main() (--test)
+    paper     collect_paper_trading.collect_paper_trading_data(test_mode=True)
+
+거래일 fixture (benchmarks/fixtures/<거래일>/):
+    kis/*.jsonl   KIS 번들 - 실거래일에 KIS_RECORD_DIR=benchmarks/fixtures/<거래일>/kis 로
+                  main.py / forecast_main.py / collect_paper_trading.py를 실행해 기록
+    data/         당시 frontend/public/data 사본 (latest.json, history/, theme-forecast.json 등)
+    stubs.json    (선택) Gemini/Naver/기타 HTTP 대역 응답 - benchmarks/stubs.py 참고
+
+사용법:
+    python -m benchmarks.pipeline                       # 전체 거래일 × 전체 시나리오, 기준선 비교
+    python -m benchmarks.pipeline --scenario main,paper --repeat 3
+    python -m benchmarks.pipeline --update-baseline     # 현재 결과를 기준선으로 저장
+
+결과마다 실행 시간, 외부 요청 수(대역별), 최대 RSS, run_profile 단계별 시간을 보고하고,
+benchmarks/baseline.json 대비 회귀가 있으면 종료 코드 1로 실패한다.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+BENCH_DIR = Path(__file__).parent
+ROOT_DIR = BENCH_DIR.parent
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+BASELINE_PATH = BENCH_DIR / "baseline.json"
+
+SCENARIOS = ("main", "refresh", "forecast", "paper")
+
+# 회귀 판정 허용치
+WALL_TOLERANCE = 0.20  # 실행/단계 시간 +20%
+RSS_TOLERANCE = 0.15  # 최대 RSS +15%
+MIN_TIME_SLACK_SEC = 0.2  # 짧은 단계의 측정 잡음 흡수
+
+# 대역 환경 (실제 키/토큰/기록 설정이 새지 않도록 명시적으로 덮어씀)
+_STANDIN_ENV = {
+    "KIS_APP_KEY": "benchmark-app-key",
+    "KIS_APP_SECRET": "benchmark-app-secret",
+    "KIS_RECORD_DIR": "",
+    "GEMINI_API_KEY_01": "benchmark-gemini-key",
+    "NAVER_CLIENT_ID": "benchmark",
+    "NAVER_CLIENT_SECRET": "benchmark",
+    "TELEGRAM_TOKEN": "benchmark",
+    "CHAT_ID": "0",
+    "SUPABASE_URL": "https://supabase.standin",
+    "SUPABASE_SERVICE_ROLE_KEY": "benchmark",
+    "FINNHUB_API_KEY": "",
+    "PREWARM_ENABLED": "",
+}
+
+
+# ── 자식 프로세스: 시나리오 1회 실행 ──────────────────────────
+
+def _prepare_sandbox(day_dir: Path) -> Path:
+    sandbox = Path(tempfile.mkdtemp(prefix="bench-"))
+    data_dir = sandbox / "frontend" / "public" / "data"
+    if (day_dir / "data").exists():
+        shutil.copytree(day_dir / "data", data_dir)
+    else:
+        data_dir.mkdir(parents=True)
+    return sandbox
+
+
+def _redirect_outputs(sandbox: Path) -> None:
+    """프로젝트 데이터/캐시 경로를 샌드박스로 교체 (저장소 파일을 건드리지 않도록)"""
+    data_dir = sandbox / "frontend" / "public" / "data"
+    import collect_paper_trading
+    import forecast_main
+    import main
+    import modules.data_exporter as data_exporter
+    import modules.kis_client as kis_client
+    import modules.theme_forecast as theme_forecast
+
+    data_exporter.ROOT_DIR = sandbox
+    theme_forecast.ROOT_DIR = sandbox
+    kis_client.ROOT_DIR = sandbox
+    forecast_main.DATA_DIR = data_dir
+    main.DATA_DIR = str(data_dir)
+    collect_paper_trading.DATA_DIR = data_dir
+    collect_paper_trading.PAPER_TRADING_DIR = data_dir / "paper-trading"
+    collect_paper_trading.INDEX_PATH = data_dir / "paper-trading-index.json"
+    collect_paper_trading.LATEST_PATH = data_dir / "latest.json"
+
+
+def _run_scenario(name: str) -> None:
+    if name == "main":
+        import main
+        main.main(test_mode=True)
+    elif name == "refresh":
+        import api.server
+        result = api.server._refresh_sync()
+        if isinstance(result, dict) and result.get("error"):
+            raise RuntimeError(result["error"])
+    elif name == "forecast":
+        import forecast_main
+        sys.argv = ["forecast_main.py", "--test"]
+        forecast_main.main()
+    elif name == "paper":
+        import collect_paper_trading
+        collect_paper_trading.collect_paper_trading_data(test_mode=True)
+    else:
+        raise ValueError(f"알 수 없는 시나리오: {name}")
+
+
+def run_child(args) -> None:
+    day_dir = Path(args.day).resolve()
+    sandbox = _prepare_sandbox(day_dir)
+    port = int(args.port)
+    os.environ.update(_STANDIN_ENV)
+    os.environ["KIS_BASE_URL"] = f"http://127.0.0.1:{port}"
+    sys.path.insert(0, str(ROOT_DIR))
+    # 상대 경로 기본값(output_dir="frontend/public/data" 등)도 픽스처 날짜의 data/를 보도록 샌드박스에서 실행
+    os.chdir(sandbox)
+
+    # CACHE_DIR 기반 경로 상수가 import 시점에 계산되므로 다른 모듈보다 먼저 교체
+    import config.settings as settings
+    settings.CACHE_DIR = sandbox / ".cache"
+
+    from benchmarks import stubs
+
+    stubs_path = day_dir / "stubs.json"
+    stub_data = json.loads(stubs_path.read_text(encoding="utf-8")) if stubs_path.exists() else {}
+    latency = None if args.kis_latency_ms == "recorded" else float(args.kis_latency_ms)
+    stubs.start_kis_standin(day_dir / "kis", port, latency, args.kis_jitter_ms, args.kis_rate_limit, seed=0)
+    fake_supabase = stubs.install_stubs(stub_data, port)
+
+    import_started = time.perf_counter()
+    _redirect_outputs(sandbox)
+    import main  # noqa: F401 — 시나리오 공통 import 비용은 실행 시간에서 분리
+    import_sec = time.perf_counter() - import_started
+
+    from modules.run_profile import reset_run_profile
+
+    profile = reset_run_profile()
+    stubs.REQUEST_COUNTS.clear()
+    error = None
+    started = time.perf_counter()
+    try:
+        _run_scenario(args.child)
+    except SystemExit as e:
+        if e.code not in (0, None):
+            error = f"SystemExit({e.code})"
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    wall_sec = time.perf_counter() - started
+
+    snap = profile.snapshot()
+    result = {
+        "scenario": args.child,
+        "day": day_dir.name,
+        "wall_sec": round(wall_sec, 3),
+        "import_sec": round(import_sec, 3),
+        # Linux ru_maxrss 단위는 KB
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "requests": dict(stubs.REQUEST_COUNTS),
+        "requests_total": sum(stubs.REQUEST_COUNTS.values()),
+        "stages": snap["stages"],
+        "counters": snap["counters"],
+        "supabase_writes": dict(fake_supabase.writes),
+        "error": error,
+    }
+    Path(args.out).write_text(json.dumps(result, ensure_ascii=False, indent=1), encoding="utf-8")
+    shutil.rmtree(sandbox, ignore_errors=True)
+
+
+# ── 부모 프로세스: 반복 실행 + 기준선 비교 ──────────────────────
+
+def _spawn(day_dir: Path, scenario: str, args) -> Dict[str, Any]:
+    from benchmarks.stubs import free_port
+
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        out_path = f.name
+    cmd = [
+        sys.executable, "-m", "benchmarks.pipeline", "--child", scenario, "--day", str(day_dir), "--out", out_path,
+        "--port", str(free_port()), "--kis-latency-ms", str(args.kis_latency_ms),
+        "--kis-jitter-ms", str(args.kis_jitter_ms), "--kis-rate-limit", str(args.kis_rate_limit),
+    ]
+    log = None if args.verbose else subprocess.DEVNULL
+    proc = subprocess.run(cmd, cwd=ROOT_DIR, stdout=log, stderr=subprocess.STDOUT if log else None)
+    try:
+        with open(out_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"scenario": scenario, "day": day_dir.name, "error": f"자식 프로세스 실패 (exit {proc.returncode})"}
+    finally:
+        os.unlink(out_path)
+
+
+def _median_result(runs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """반복 실행 결과의 중앙값 (시간/RSS), 요청 수는 최대값"""
+    ok = [r for r in runs if not r.get("error")] or runs
+    result = dict(ok[0])
+    for key in ("wall_sec", "import_sec", "peak_rss_mb"):
+        values = [r[key] for r in ok if key in r]
+        if values:
+            result[key] = round(statistics.median(values), 3)
+    if "requests_total" in result:
+        result["requests_total"] = max(r.get("requests_total", 0) for r in ok)
+    stage_times: Dict[str, List[float]] = {}
+    for r in ok:
+        for st in r.get("stages", []):
+            stage_times.setdefault(st["name"], []).append(st["sec"])
+    result["stages"] = [{"name": n, "sec": round(statistics.median(v), 3)} for n, v in stage_times.items()]
+    result["runs"] = len(runs)
+    return result
+
+
+def compare(result: Dict[str, Any], base: Optional[Dict[str, Any]]) -> List[str]:
+    """기준선 대비 회귀 목록 (없으면 빈 리스트)"""
+    if not base:
+        return []
+    issues = []
+    if result.get("error") and not base.get("error"):
+        issues.append(f"오류 발생: {result['error']}")
+    if "wall_sec" in result and "wall_sec" in base:
+        limit = base["wall_sec"] * (1 + WALL_TOLERANCE) + MIN_TIME_SLACK_SEC
+        if result["wall_sec"] > limit:
+            issues.append(f"실행 시간 {base['wall_sec']:.2f}s → {result['wall_sec']:.2f}s")
+    if "peak_rss_mb" in result and "peak_rss_mb" in base:
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + RSS_TOLERANCE):
+            issues.append(f"최대 RSS {base['peak_rss_mb']:.0f}MB → {result['peak_rss_mb']:.0f}MB")
+    for label, count in (result.get("requests") or {}).items():
+        before = (base.get("requests") or {}).get(label, 0)
+        if count > before:
+            issues.append(f"요청 수({label}) {before} → {count}")
+    base_stages = {st["name"]: st["sec"] for st in base.get("stages", [])}
+    for st in result.get("stages", []):
+        before = base_stages.get(st["name"])
+        if before is not None and st["sec"] > before * (1 + WALL_TOLERANCE) + MIN_TIME_SLACK_SEC:
+            issues.append(f"단계 '{st['name']}' {before:.2f}s → {st['sec']:.2f}s")
+    return issues
+
+
+def _print_result(key: str, result: Dict[str, Any], issues: List[str]) -> None:
+    mark = "✗" if issues else ("⚠" if result.get("error") else "✓")
+    if "wall_sec" not in result:
+        print(f"  {mark} {key}: {result.get('error')}")
+        return
+    reqs = ", ".join(f"{k} {v}" for k, v in sorted(result.get("requests", {}).items())) or "없음"
+    print(f"  {mark} {key}: {result['wall_sec']:.2f}s (import {result['import_sec']:.2f}s), "
+          f"RSS {result['peak_rss_mb']:.0f}MB, 요청 {result['requests_total']}건 ({reqs})")
+    for st in result.get("stages", []):
+        print(f"    - {st['name']}: {st['sec']:.2f}s")
+    if result.get("error"):
+        print(f"    ⚠ 오류: {result['error']}")
+    for issue in issues:
+        print(f"    ↳ 회귀: {issue}")
+
+
+def run_suite(args) -> int:
+    days = [Path(d) for d in args.day] if args.day else sorted(p for p in FIXTURES_DIR.glob("*") if p.is_dir())
+    if not days:
+        print(f"  ⚠ 거래일 fixture 없음: {FIXTURES_DIR}/<거래일>/ (kis/*.jsonl + data/)")
+        return 1
+    scenarios = [s.strip() for s in args.scenario.split(",") if s.strip()]
+
+    baseline: Dict[str, Any] = {}
+    if BASELINE_PATH.exists():
+        baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+
+    print(f"[벤치마크] 거래일 {len(days)}개 × 시나리오 {len(scenarios)}개 (반복 {args.repeat}회)")
+    results: Dict[str, Any] = {}
+    regressions = 0
+    for day_dir in days:
+        for scenario in scenarios:
+            key = f"{day_dir.name}/{scenario}"
+            result = _median_result([_spawn(day_dir, scenario, args) for _ in range(args.repeat)])
+            issues = [] if args.update_baseline else compare(result, baseline.get(key))
+            regressions += bool(issues)
+            results[key] = result
+            _print_result(key, result, issues)
+
+    if args.update_baseline:
+        baseline.update(results)
+        tmp_path = BASELINE_PATH.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(baseline, ensure_ascii=False, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp_path, BASELINE_PATH)
+        print(f"\n  ✓ 기준선 저장: {BASELINE_PATH} ({len(results)}건)")
+        return 0
+    if regressions:
+        print(f"\n  ✗ 회귀 {regressions}건")
+        return 1
+    print("\n  ✓ 회귀 없음" if baseline else "\n  ℹ 기준선 없음 (--update-baseline으로 생성)")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="파이프라인 종단 벤치마크 (기록된 거래일 재생)")
+    parser.add_argument("--day", action="append", help="거래일 fixture 디렉토리 (반복 지정, 기본: fixtures/* 전체)")
+    parser.add_argument("--scenario", default=",".join(SCENARIOS), help=f"쉼표 구분 ({', '.join(SCENARIOS)})")
+    parser.add_argument("--repeat", type=int, default=1, help="시나리오별 반복 횟수 (중앙값 사용)")
+    parser.add_argument("--update-baseline", action="store_true", help="현재 결과를 기준선으로 저장")
+    parser.add_argument("--kis-latency-ms", default="recorded", help="KIS 대역 지연(ms) 또는 'recorded'")
+    parser.add_argument("--kis-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--kis-rate-limit", type=float, default=0.0, help="KIS 대역 초당 호출 제한 (0: 무제한)")
+    parser.add_argument("--verbose", action="store_true", help="자식 프로세스 출력 표시")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    parser.add_argument("--port", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.day = args.day[0]
+        run_child(args)
+        return
+    sys.exit(run_suite(args))
+
+
+if __name__ == "__main__":
+    main()
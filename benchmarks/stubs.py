@@ -0,0 +1,195 @@
+"""
+벤치마크용 외부 서비스 대역
+
+벤치마크 자식 프로세스 안에서만 설치한다 (install_stubs). 설치 후:
+- KIS: 같은 프로세스에서 띄운 api/kis_standin 서버가 거래일 번들(kis/*.jsonl)을 재생
+- HTTP: requests.Session.request를 가로채 호스트별로 응답
+    Gemini(generativelanguage) → stubs.json "gemini"의 match 문자열이 프롬프트에 포함된 첫 응답
+    Naver 검색 → stubs.json "naver" (없으면 빈 items)
+    Telegram → {"ok": true}
+    그 외 → stubs.json "http"의 url_prefix 일치 응답, 없으면 즉시 503 (네트워크 미사용)
+- Supabase: create_client를 메모리 대역으로 교체 (조회는 빈 결과, 쓰기는 건수만 집계)
+- yfinance: download/Ticker가 빈 DataFrame 반환
+
+모든 호출은 REQUEST_COUNTS[라벨]에 집계되어 벤치마크 결과의 요청 수가 된다.
+"""
+import json
+import socket
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+REQUEST_COUNTS: Counter = Counter()
+_lock = threading.Lock()
+
+
+def _count(label: str) -> None:
+    with _lock:
+        REQUEST_COUNTS[label] += 1
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _make_response(url: str, status: int = 200, payload: Any = None, text: Optional[str] = None) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp.url = url
+    if text is None:
+        text = json.dumps(payload if payload is not None else {}, ensure_ascii=False)
+        resp.headers["Content-Type"] = "application/json"
+    resp._content = text.encode("utf-8")
+    resp._content_consumed = True
+    resp.encoding = "utf-8"
+    return resp
+
+
+class HTTPRouter:
+    """requests.Session.request 대체 - KIS 대역 서버만 실제 소켓으로 전달"""
+
+    def __init__(self, stubs: Dict[str, Any], kis_netloc: str):
+        self.stubs = stubs
+        self.kis_netloc = kis_netloc
+        self._original = requests.Session.request
+
+    def install(self) -> None:
+        router = self
+
+        def request(session, method, url, *args, **kwargs):
+            return router.route(session, method, url, *args, **kwargs)
+
+        requests.Session.request = request
+
+    def route(self, session, method, url, *args, **kwargs):
+        host = urlparse(url).netloc
+        if host == self.kis_netloc:
+            _count("kis")
+            return self._original(session, method, url, *args, **kwargs)
+        if "generativelanguage.googleapis.com" in host:
+            _count("gemini")
+            return self._gemini(url, kwargs.get("json") or {})
+        if "openapi.naver.com" in host:
+            _count("naver")
+            return _make_response(url, payload=self.stubs.get("naver") or {"items": []})
+        if "api.telegram.org" in host:
+            _count("telegram")
+            return _make_response(url, payload={"ok": True, "result": {}})
+        _count("other")
+        for stub in self.stubs.get("http", []):
+            if url.startswith(stub.get("url_prefix", "\0")):
+                return _make_response(url, stub.get("status", 200), stub.get("json"), stub.get("text"))
+        return _make_response(url, 503, {"error": "benchmark stand-in: network disabled"})
+
+    def _gemini(self, url: str, payload: Dict[str, Any]) -> requests.Response:
+        prompt = json.dumps(payload.get("contents", []), ensure_ascii=False)
+        text = '{"themes": []}'
+        for stub in self.stubs.get("gemini", []):
+            if stub.get("match", "") in prompt:
+                text = stub["text"]
+                break
+        body = {"candidates": [{"content": {"parts": [{"text": text}]}, "finishReason": "STOP"}]}
+        if "alt=sse" in url:
+            return _make_response(url, text=f"data: {json.dumps(body, ensure_ascii=False)}\n\n")
+        return _make_response(url, payload=body)
+
+
+class _FakeQuery:
+    """supabase-py 체이닝 쿼리 대역 (select/eq/upsert/... 모두 자기 자신 반환)"""
+
+    def __init__(self, table: str, writes: Counter):
+        self.table = table
+        self.writes = writes
+        self.rows: List[Dict[str, Any]] = []
+
+    def __getattr__(self, name):
+        def chain(*args, **kwargs):
+            if name in ("insert", "upsert", "update", "delete"):
+                self.writes[f"{self.table}.{name}"] += 1
+                if args and isinstance(args[0], (dict, list)):
+                    self.rows = args[0] if isinstance(args[0], list) else [args[0]]
+            return self
+        return chain
+
+    def execute(self):
+        _count("supabase")
+        return SimpleNamespace(data=self.rows, count=len(self.rows))
+
+
+class FakeSupabase:
+    def __init__(self):
+        self.writes: Counter = Counter()
+
+    def table(self, name: str) -> _FakeQuery:
+        return _FakeQuery(name, self.writes)
+
+    def rpc(self, name: str, params=None) -> _FakeQuery:
+        return _FakeQuery(f"rpc:{name}", self.writes)
+
+
+def _install_yfinance_stub() -> None:
+    try:
+        import pandas as pd
+        import yfinance as yf
+    except ImportError:
+        return
+
+    def download(*args, **kwargs):
+        _count("yfinance")
+        return pd.DataFrame()
+
+    class Ticker:
+        def __init__(self, symbol):
+            self.symbol = symbol
+            self.info = {}
+            self.fast_info = {}
+
+        def history(self, *args, **kwargs):
+            _count("yfinance")
+            return pd.DataFrame()
+
+    yf.download = download
+    yf.Ticker = Ticker
+
+
+def start_kis_standin(
+    bundle_dir: Path, port: int, latency_ms: Optional[float], jitter_ms: float, rate_limit: float, seed: int,
+) -> None:
+    """번들 재생 KIS 대역 서버를 데몬 스레드로 기동하고 응답할 때까지 대기"""
+    import uvicorn
+
+    from api.kis_standin import create_app
+    from modules.kis_recorder import load_bundles
+
+    entries = load_bundles([bundle_dir]) if bundle_dir.exists() else []
+    app = create_app(entries, latency_ms=latency_ms, jitter_ms=jitter_ms, rate_limit=rate_limit, seed=seed)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("KIS 대역 서버 기동 실패")
+
+
+def install_stubs(stubs: Dict[str, Any], kis_port: int) -> FakeSupabase:
+    """HTTP 라우터 + Supabase + yfinance 대역 설치 (KIS 대역 서버 기동 후 호출)"""
+    HTTPRouter(stubs, f"127.0.0.1:{kis_port}").install()
+    _install_yfinance_stub()
+
+    import modules.supabase_client as supabase_client
+
+    fake = FakeSupabase()
+    supabase_client.create_client = lambda url, key: fake
+    return fake
@@ -12,6 +12,7 @@ Gemini AI가 오전에 선정한 대장주를 1주씩 매수했다고 가정하
 from __future__ import annotations
 
 import json
+import sqlite3
 import argparse
 import subprocess
 import time
@@ -20,6 +21,7 @@ from pathlib import Path
 from typing import Optional
 
 from modules.kis_client import KISClient
+from modules.price_store import get_price_store
 
 # 프로젝트 경로
 ROOT_DIR = Path(__file__).parent
@@ -151,20 +153,23 @@ def find_morning_price(data: dict, code: str) -> Optional[int]:
 
 
 def get_stock_prices(client: KISClient, code: str) -> Optional[dict]:
-    """KIS API로 종가 + 최고가 조회"""
+    """KIS API로 종가 + 최고가 + 최저가 조회"""
     try:
         result = client.get_stock_price(code)
         if result.get("rt_cd") == "0":
             output = result.get("output", {})
             close_str = output.get("stck_prpr", "0")
             high_str = output.get("stck_hgpr", "0")
+            low_str = output.get("stck_lwpr", "0")
             close_price = int(close_str) if close_str else None
             high_price = int(high_str) if high_str else None
+            low_price = int(low_str) if low_str else None
             if close_price is None:
                 return None
             return {
                 "close_price": close_price,
                 "high_price": high_price if high_price else close_price,
+                "low_price": low_price if low_price else close_price,
             }
         else:
             print(f"  [오류] {code} API 응답: {result.get('msg1', 'Unknown')}")
@@ -290,6 +295,12 @@ def collect_paper_trading_data(
 
         close_price = prices["close_price"]
         high_price = prices["high_price"]
+        if not test_mode:
+            # 오늘 일봉을 가격 저장소에 기록 (백테스트가 같은 날짜를 다시 받지 않도록)
+            try:
+                get_price_store().put(code, today_str, close_price, high_price, prices["low_price"], source="kis")
+            except (sqlite3.Error, OSError) as e:
+                print(f"  ⚠ 가격 저장소 기록 실패 ({code}): {e}")
 
         # 최고가 달성 시간 조회
         high_time = find_high_price_time(client, code, high_price)
@@ -8,6 +8,9 @@ from dotenv import load_dotenv
 # 프로젝트 루트 경로
 ROOT_DIR = Path(__file__).parent.parent
 
+# 실행 간 재사용하는 로컬 캐시 디렉토리 (git 미추적, Actions cache로 보존)
+CACHE_DIR = ROOT_DIR / ".cache"
+
 # .env 파일 로드
 load_dotenv(ROOT_DIR / ".env")
 
@@ -18,7 +21,17 @@ KIS_APP_SECRET = os.getenv("KIS_APP_SECRET")
 KIS_ACCOUNT_NO = os.getenv("KIS_ACCOUNT_NO")  # 계좌번호 (XXXXXXXX-XX 형식)
 
 # KIS API 엔드포인트 (실전투자 전용)
-KIS_BASE_URL = "https://openapi.koreainvestment.com:9443"
+KIS_LIVE_BASE_URL = "https://openapi.koreainvestment.com:9443"
+# 오프라인 재현용 로컬 대역 서버(api/kis_standin.py) 주소로 바꿀 수 있음
+KIS_BASE_URL = os.getenv("KIS_BASE_URL", "").rstrip("/") or KIS_LIVE_BASE_URL
+# 설정 시 KISClient.request 응답을 이 디렉토리에 fixture 번들(JSONL)로 기록
+KIS_RECORD_DIR = os.getenv("KIS_RECORD_DIR", "")
+# KISClient 시세 응답 캐시 (같은 tr_id + 파라미터 GET 요청을 실행 중 재사용)
+# 미설정: 클라이언트 수명(1회 실행) 동안 유지, 양수: 초 단위 TTL, 0: 사용 안 함
+KIS_QUOTE_CACHE_TTL_SEC = os.getenv("KIS_QUOTE_CACHE_TTL_SEC", "")
+# 종목 마스터 파일(kospi_code.mst.zip / kosdaq_code.mst.zip) 다운로드 경로
+# 빈 값이면 다운로드하지 않고 기존 .cache 마스터(없으면 코드 규칙 추정)만 사용
+KIS_MASTER_URL = os.getenv("KIS_MASTER_URL", "https://new.real.download.dws.co.kr/common/master").rstrip("/")
 
 # 텔레그램 설정
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_TOKEN")
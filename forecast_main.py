@@ -8,6 +8,7 @@ Usage:
     python forecast_main.py              # 전체 실행
     python forecast_main.py --test       # 테스트 (Supabase 저장 건너뜀)
     python forecast_main.py --intraday   # 장중 재예측 (today만)
+    python forecast_main.py --no-llm-cache  # Gemini 응답 캐시 사용 안 함
 """
 import json
 import sys
@@ -20,6 +21,9 @@ from modules.theme_forecast import (
     save_forecast_to_supabase,
     export_forecast_json,
 )
+from modules import llm_cache
+from modules.gemini_pool import get_key_pool
+from modules.run_profile import get_run_profile
 from modules.us_market_data import (
     fetch_us_market_data,
     fetch_vix_index,
@@ -34,6 +38,10 @@ DATA_DIR = ROOT_DIR / "frontend" / "public" / "data"
 def main():
     test_mode = "--test" in sys.argv
     intraday_mode = "--intraday" in sys.argv
+    profile = get_run_profile()
+    if "--no-llm-cache" in sys.argv:
+        llm_cache.set_enabled(False)
+        print("⏭ Gemini 응답 캐시 사용 안 함")
 
     if test_mode:
         print("🧪 테스트 모드 (Supabase 저장 건너뜀)")
@@ -58,6 +66,8 @@ def main():
     theme_count = len(latest_data.get("theme_analysis", {}).get("themes", []))
     print(f"  ✓ 전일 데이터 로드 완료 (수집일: {timestamp}, 테마 {theme_count}개)")
 
+    profile.checkpoint("1 전일 데이터")
+
     # Step 2: 미국 시장 데이터 + 심리지표 수집
     print("\n[2/6] 미국 시장 데이터 + 심리지표 수집...")
     us_data = fetch_us_market_data()
@@ -82,6 +92,24 @@ def main():
     else:
         print("  ⚠ 글로벌 뉴스 수집 실패 (계속 진행)")
 
+    # 코스피/코스닥 지수 이동평균 (main.py·백테스트와 같은 지수 시계열)
+    index_status = {}
+    try:
+        from modules.index_series import get_index_series
+        index_series = get_index_series()
+        index_series.refresh(("KOSPI", "KOSDAQ"))
+        for name in ("KOSPI", "KOSDAQ"):
+            status = index_series.ma_status(name)
+            if status:
+                index_status[name] = status
+                print(f"  ✓ {name} 지수: {status['current']:.2f} ({status['status']})")
+            else:
+                print(f"  ⚠ {name} 지수 일봉 부족 - 이동평균 생략")
+    except Exception as e:
+        print(f"  ⚠ 지수 이동평균 조회 실패 (계속 진행): {e}")
+
+    profile.checkpoint("2 미국 시장 + 심리지표")
+
     # Step 3: 테마 히스토리 + 모멘텀 분석
     print("\n[3/6] 테마 히스토리 + 모멘텀 분석...")
     history_dir = DATA_DIR / "history"
@@ -100,12 +128,19 @@ def main():
     else:
         print("  ⚠ 모멘텀 분석 데이터 없음")
 
+    profile.checkpoint("3 테마 히스토리 + 모멘텀")
+
     # Step 4: 섹터 로테이션 분석
     print("\n[4/6] 섹터 로테이션 분석...")
     rotation_data = None
     try:
         from modules.sector_rotation import detect_sector_rotation
-        rotation_data = detect_sector_rotation(theme_history, latest_data)
+        from modules.theme_matrix import index_to_history, load_theme_history_index
+        # 판정은 최근 7일, 장기 라이프사이클 지표는 누적 인덱스(최대 250거래일) 기준
+        # 인덱스 파일은 데이터 수집(main.py) 쪽에서만 갱신·커밋 → 여기서는 읽기 전용 재구성
+        long_history = index_to_history(load_theme_history_index(DATA_DIR, write=False), limit=250) or theme_history
+        print(f"  ✓ 장기 테마 인덱스 {len(long_history)}일분")
+        rotation_data = detect_sector_rotation(long_history, latest_data)
         if rotation_data:
             print(f"  ✓ 섹터 로테이션 분석 완료 ({len(rotation_data)}개 테마)")
             for r in rotation_data[:5]:
@@ -115,8 +150,16 @@ def main():
     except ImportError:
         print("  ⏭ 섹터 로테이션 모듈 미설치 (건너뜀)")
 
+    profile.checkpoint("4 섹터 로테이션")
+
     # Step 5: Gemini 유망 테마 예측
     print("\n[5/6] Gemini 유망 테마 예측...")
+    forecast_path = DATA_DIR / "theme-forecast.json"
+    existing = None
+    if intraday_mode and forecast_path.exists():
+        # 장중 모드: 오늘 아침 예측을 기준으로 변화분만 반영
+        with open(forecast_path, "r", encoding="utf-8") as f:
+            existing = json.load(f)
     forecast = generate_forecast(
         latest_data, theme_history,
         us_data=us_data,
@@ -125,6 +168,8 @@ def main():
         rotation_data=rotation_data,
         global_news=global_news,
         intraday=intraday_mode,
+        morning_forecast=existing,
+        index_status=index_status,
     )
 
     if not forecast:
@@ -156,19 +201,20 @@ def main():
             print(f"  [{t.get('confidence', '')}] {t.get('theme_name', '')} ({t.get('target_period', '')}) — {t.get('catalyst', '')}")
             print(f"    대장주: {leaders}")
 
+    profile.checkpoint("5 Gemini 예측")
+
     # Step 6: 저장
     print("\n[6/6] 결과 저장...")
 
     if intraday_mode:
-        # 장중 모드: today 섹션만 갱신
-        forecast_path = DATA_DIR / "theme-forecast.json"
-        if forecast_path.exists():
-            with open(forecast_path, "r", encoding="utf-8") as f:
-                existing = json.load(f)
+        # 장중 모드: today 섹션만 갱신 (아침 스냅샷 intraday_baseline은 유지)
+        if existing is not None:
             existing["today"] = forecast["today"]
             existing["market_context"] = forecast["market_context"]
             existing["us_market_summary"] = forecast["us_market_summary"]
             existing["generated_at"] = forecast["generated_at"]
+            if forecast.get("intraday_last"):
+                existing["intraday_last"] = forecast["intraday_last"]
             export_forecast_json(existing)
         else:
             export_forecast_json(forecast)
@@ -190,6 +236,8 @@ def main():
         else:
             print("  ⏭ Supabase 저장 건너뜀 (테스트 모드)")
 
+    profile.checkpoint("6 저장")
+
     # 정상 완료 시 알림 해제
     try:
         from modules.api_health import resolve_key_alert
@@ -198,6 +246,10 @@ def main():
     except Exception:
         pass
 
+    for k in get_key_pool().summary():
+        profile.count(f"gemini.key{k['key']}.today", k["today"])
+    profile.report()
+
     print("\n" + "=" * 50)
     print("✅ 유망 테마 예측 완료")
     print("=" * 50)
@@ -1,6 +1,7 @@
 import { useState, useCallback, useMemo } from "react"
 import type { HistoryIndex, HistoryEntry, GroupedHistory } from "@/types/history"
 import type { StockData } from "@/types/stock"
+import { resolveNewsCorpus } from "@/lib/news"
 
 const INDEX_URL = import.meta.env.BASE_URL + "data/history-index.json"
 
@@ -59,7 +60,7 @@ export function useHistoryData(): UseHistoryDataReturn {
         throw new Error(`히스토리 파일을 찾을 수 없습니다 (${response.status})`)
       }
       const jsonData = await response.json()
-      setSelectedData(jsonData)
+      setSelectedData(resolveNewsCorpus(jsonData))
       setSelectedEntry(entry)
     } catch (err) {
       console.error("Failed to fetch history data:", err)
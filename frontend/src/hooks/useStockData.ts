@@ -1,5 +1,6 @@
 import { useState, useEffect, useCallback, useRef } from "react"
 import type { StockData } from "@/types/stock"
+import { resolveNewsCorpus } from "@/lib/news"
 
 const DATA_URL = import.meta.env.BASE_URL + "data/latest.json"
 const GITHUB_TOKEN = import.meta.env.VITE_GITHUB_TOKEN || ""
@@ -41,7 +42,7 @@ export function useStockData(): UseStockDataReturn {
         throw new Error(`HTTP error! status: ${response.status}`)
       }
       const jsonData = await response.json()
-      setData(jsonData)
+      setData(resolveNewsCorpus(jsonData))
     } catch (err) {
       console.error("Failed to fetch stock data:", err)
       setError("데이터를 불러오는데 실패했습니다.")
@@ -113,7 +114,7 @@ export function useStockData(): UseStockDataReturn {
               const json = await res.json()
               if (json.timestamp && json.timestamp !== currentTimestamp) {
                 if (pollTimer) clearInterval(pollTimer)
-                resolve(json)
+                resolve(resolveNewsCorpus(json))
               }
             } catch {
               // polling 중 에러는 무시하고 계속 시도
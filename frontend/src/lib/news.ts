@@ -0,0 +1,24 @@
+import type { NewsItem, StockData, StockNews } from "@/types/stock"
+
+/**
+ * 공유 뉴스 코퍼스(news_corpus) + 종목별 기사 ID 참조(news[code].ids)를
+ * 컴포넌트가 사용하는 news[code].news 배열 형태로 복원.
+ * 코퍼스가 없는 이전 히스토리 파일은 그대로 반환.
+ */
+export function resolveNewsCorpus(data: StockData): StockData {
+  const corpus = data.news_corpus
+  if (!corpus || !data.news) return data
+
+  const news: Record<string, StockNews> = {}
+  for (const [code, entry] of Object.entries(data.news)) {
+    if (entry.news) {
+      news[code] = entry
+      continue
+    }
+    const items = (entry.ids ?? [])
+      .map((id) => corpus[id])
+      .filter((item): item is NewsItem => Boolean(item))
+    news[code] = { name: entry.name, news: items }
+  }
+  return { ...data, news }
+}
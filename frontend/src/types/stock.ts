@@ -33,6 +33,8 @@ export interface NewsItem {
 export interface StockNews {
   name: string
   news: NewsItem[]
+  /** news_corpus 기사 ID 참조 (resolveNewsCorpus로 news 배열 복원) */
+  ids?: string[]
 }
 
 export interface ExchangeRate {
@@ -146,6 +148,7 @@ export interface StockData {
   fluctuation_direct?: FluctuationData
   history: Record<string, StockHistory>
   news: Record<string, StockNews>
+  news_corpus?: Record<string, NewsItem>
   investor_data?: Record<string, InvestorInfo>
   investor_estimated?: boolean
   theme_analysis?: ThemeAnalysis
@@ -6,8 +6,7 @@ KIS 거래량+등락폭 TOP10 텔레그램 발송
 import argparse
 import json
 import os
-import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Any
 
 from modules.kis_client import KISClient
@@ -15,12 +14,20 @@ from modules.kis_rank import KISRankAPI
 from modules.stock_filter import StockFilter
 from modules.stock_history import StockHistoryAPI
 from modules.naver_news import NaverNewsAPI
+from modules.news_corpus import NewsCorpus
 from modules.telegram import TelegramSender
 from modules.data_exporter import export_for_frontend
 from modules.exchange_rate import ExchangeRateAPI
 from modules.gemini_analyzer import analyze_themes
 from modules.fundamental import FundamentalCollector
+from modules.index_series import get_index_series
+from modules.short_selling import ShortSellingCollector
 from modules.stock_criteria import evaluate_all_stocks
+from modules import llm_cache
+from modules.run_profile import get_run_profile
+
+# 프론트엔드 데이터 디렉토리 (기존 latest.json / history 폴백 조회용)
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "public", "data")
 
 
 def collect_all_stocks(
@@ -120,6 +127,8 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
         skip_investor: 수급 데이터 수집 건너뛰기
         skip_ai: AI 테마 분석 건너뛰기
     """
+    profile = get_run_profile()
+
     print("=" * 60)
     print("  KIS 거래량+등락폭 TOP10 텔레그램 발송")
     print(f"  실행 시간: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
@@ -143,6 +152,8 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
     except Exception as e:
         print(f"  ✗ 환율 조회 실패: {e}")
 
+    profile.checkpoint("1 환율")
+
     # 2. KIS API 연결
     print("\n[2/13] KIS API 연결 중...")
     try:
@@ -159,81 +170,24 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
             pass
         return
 
-    # 2-1. 코스닥 지수 이동평균선 분석 (API 페이지당 50건 제한 → 여러 페이지 조회)
+    profile.checkpoint("2 KIS 연결")
+
+    # 2-1. 코스닥 지수 이동평균선 분석 (지수 저장소에 없는 최근 일봉만 보충)
     kosdaq_index_data = None
     print("\n[2-1/13] 코스닥 지수 이동평균선 분석 중...")
-    for attempt in range(3):
-        try:
-            if attempt > 0:
-                time.sleep(3 * attempt)
-                print(f"  재시도 ({attempt + 1}/3)...")
-
-            all_items = []
-            end_date = datetime.now().strftime("%Y%m%d")
-            for page in range(3):  # 최대 3페이지 (150건)
-                start_date = (datetime.now() - timedelta(days=300)).strftime("%Y%m%d")
-                idx_resp = client.get_index_daily_price(
-                    "2001", start_date=start_date, end_date=end_date
-                )
-                rt_cd = idx_resp.get("rt_cd")
-                if rt_cd != "0":
-                    msg = idx_resp.get("msg1", "알 수 없음")
-                    print(f"  ⚠ 코스닥 지수 API 응답 오류 (rt_cd={rt_cd}, msg={msg})")
-                    break
-                page_items = idx_resp.get("output2", [])
-                if not page_items:
-                    break
-                all_items.extend(page_items)
-                if len(all_items) >= 120:
-                    break
-                # 다음 페이지: 마지막 날짜 하루 전부터
-                last_date = page_items[-1].get("stck_bsop_date", "")
-                if not last_date:
-                    break
-                end_date = (datetime.strptime(last_date, "%Y%m%d") - timedelta(days=1)).strftime("%Y%m%d")
-
-            closes = []
-            for item in all_items:
-                try:
-                    val = float(item.get("bstp_nmix_prpr", 0))
-                    if val > 0:
-                        closes.append(val)
-                except (ValueError, TypeError):
-                    continue
-
-            if len(closes) >= 60:
-                current = closes[0]
-                ma5 = sum(closes[:5]) / 5
-                ma10 = sum(closes[:10]) / 10
-                ma20 = sum(closes[:20]) / 20
-                ma60 = sum(closes[:60]) / 60
-                ma120 = sum(closes[:120]) / 120 if len(closes) >= 120 else 0
-
-                values = [current, ma5, ma10, ma20, ma60]
-                if ma120 > 0:
-                    values.append(ma120)
-                is_aligned = all(values[i] > values[i+1] for i in range(len(values)-1))
-                is_reversed = all(values[i] < values[i+1] for i in range(len(values)-1))
-
-                status = "정배열" if is_aligned else ("역배열" if is_reversed else "혼합")
-                kosdaq_index_data = {
-                    "current": round(current, 2),
-                    "ma5": round(ma5, 2),
-                    "ma10": round(ma10, 2),
-                    "ma20": round(ma20, 2),
-                    "ma60": round(ma60, 2),
-                    "ma120": round(ma120, 2) if ma120 > 0 else 0,
-                    "status": status,
-                }
-                print(f"  ✓ 코스닥 지수: {current:.2f} ({status}) [{len(closes)}일분 데이터]")
-                break
-            else:
-                print(f"  ⚠ 코스닥 지수 데이터 부족 ({len(closes)}일분, 전체 {len(all_items)}건)")
-                break  # 데이터 부족은 재시도해도 동일
-        except Exception as e:
-            print(f"  ⚠ 코스닥 지수 분석 실패: {e}")
-            if attempt == 2:
-                break
+    try:
+        index_series = get_index_series(client)
+        index_series.refresh(("KOSPI", "KOSDAQ"))
+        kosdaq_index_data = index_series.ma_status("KOSDAQ")
+        closes_count = len(index_series.closes("KOSDAQ"))
+        if kosdaq_index_data:
+            print(f"  ✓ 코스닥 지수: {kosdaq_index_data['current']:.2f} ({kosdaq_index_data['status']}) [{closes_count}일분 데이터]")
+        else:
+            print(f"  ⚠ 코스닥 지수 데이터 부족 ({closes_count}일분)")
+    except Exception as e:
+        print(f"  ⚠ 코스닥 지수 분석 실패: {e}")
+
+    profile.checkpoint("2-1 코스닥 지수")
 
     # 3. 거래량 TOP30 조회
     print("\n[3/13] 거래량 TOP30 조회 중...")
@@ -245,6 +199,8 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
         print(f"  ✗ 거래량 조회 실패: {e}")
         return
 
+    profile.checkpoint("3 거래량 TOP30")
+
     # 4. 거래대금 TOP30 조회
     print("\n[4/13] 거래대금 TOP30 조회 중...")
     trading_value_data = {}
@@ -255,6 +211,8 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
     except Exception as e:
         print(f"  ⚠ 거래대금 조회 실패 (빈 데이터로 계속): {e}")
 
+    profile.checkpoint("4 거래대금 TOP30")
+
     # 5. 등락폭 TOP30 조회 (자체 계산)
     print("\n[5/13] 등락폭 TOP30 조회 중...")
     try:
@@ -267,6 +225,8 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
         print(f"  ✗ 등락폭 조회 실패: {e}")
         return
 
+    profile.checkpoint("5 등락폭 TOP30")
+
     # 6. 등락률 전용 API 조회
     print("\n[6/13] 등락률 전용 API 조회 중...")
     fluctuation_direct_data = {}
@@ -279,6 +239,8 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
     except Exception as e:
         print(f"  ⚠ 등락률 전용 API 조회 실패 (빈 데이터로 계속): {e}")
 
+    profile.checkpoint("6 등락률 전용 API")
+
     # 7. 교차 필터링
     print("\n[7/13] 교차 필터링 중...")
     stock_filter = StockFilter()
@@ -305,6 +267,8 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
     )
     print(f"  ✓ 총 {len(all_stocks)}개 종목")
 
+    profile.checkpoint("7 교차 필터링")
+
     # 8. 3일간 등락률 조회
     print("\n[8/13] 3일간 등락률 조회 중...")
     try:
@@ -314,6 +278,8 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
         print(f"  ✗ 등락률 조회 실패: {e}")
         history_data = {}
 
+    profile.checkpoint("8 등락률 히스토리")
+
     # 8-1. 펀더멘탈 데이터 수집 (criteria 평가에 필요하므로 항상 실행)
     fundamental_data = {}
     print("\n[8-1/13] 펀더멘탈 데이터 수집 중...")
@@ -337,43 +303,24 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
     except Exception as e:
         print(f"  \u26a0 펀더멘탈 수집 실패 (빈 데이터로 계속): {e}")
 
+    profile.checkpoint("8-1 펀더멘탈")
+
     # 8-2. 공매도 비중 수집 (펀더멘탈 수집 대상 종목만)
     short_selling_data = {}
     short_target_codes = set(fundamental_data.keys()) if fundamental_data else set()
     if short_target_codes:
         print(f"\n[8-2/13] 공매도 비중 수집 중... ({len(short_target_codes)}개 종목)")
         try:
-            today = datetime.now().strftime("%Y%m%d")
-            target_list = [s for s in all_stocks if s.get("code", "") in short_target_codes]
-            for idx, stock in enumerate(target_list):
-                code = stock.get("code", "")
-                try:
-                    resp = client.get_daily_short_sale(code, today, today)
-                    if resp.get("rt_cd") == "0":
-                        output2 = resp.get("output2", [])
-                        if output2:
-                            ratio_str = output2[0].get("ssts_vol_rlim", "0")
-                            volume_str = output2[0].get("ssts_cntg_qty", "0")
-                            try:
-                                ratio = float(ratio_str)
-                                volume = int(volume_str)
-                                if ratio > 0:
-                                    short_selling_data[code] = {
-                                        "ratio": ratio,
-                                        "volume": volume,
-                                    }
-                            except (ValueError, TypeError):
-                                pass
-                except Exception:
-                    pass
-                if (idx + 1) % 50 == 0 or idx + 1 == len(target_list):
-                    print(f"  진행: {idx + 1}/{len(target_list)}")
+            target_codes = [s.get("code", "") for s in all_stocks if s.get("code", "") in short_target_codes]
+            short_selling_data = ShortSellingCollector(client).collect(target_codes)
             print(f"  ✓ {len(short_selling_data)}개 종목 공매도 데이터 수집 완료")
         except Exception as e:
             print(f"  ⚠ 공매도 수집 실패: {e}")
     else:
         print("\n[8-2/13] 공매도 비중 수집 건너뜀 (펀더멘탈 대상 없음)")
 
+    profile.checkpoint("8-2 공매도")
+
     # 9. 수급(투자자) 데이터 수집
     investor_data = {}
     investor_estimated = False
@@ -389,24 +336,47 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
     else:
         print("\n[9/13] 수급 데이터 수집 건너뜀")
 
-    # 10. AI 테마 분석
+    profile.checkpoint("9 수급")
+
+    # 10. 뉴스 수집 (AI 테마 분석 근거로도 사용)
+    news_data = {}
+    news_corpus = NewsCorpus()
+    if not skip_news:
+        print("\n[10/13] 종목별 뉴스 수집 중...")
+        try:
+            news_api = NaverNewsAPI()
+            news_data = news_api.get_multiple_stocks_news(all_stocks, news_count=3)
+            news_count = sum(1 for v in news_data.values() if v.get("news"))
+            news_corpus = NewsCorpus.from_news_data(news_data)
+            ref_count, unique_count = news_corpus.stats()
+            print(f"  ✓ {news_count}개 종목 뉴스 수집 완료 (기사 {ref_count}건 → 고유 {unique_count}건)")
+        except Exception as e:
+            print(f"  ✗ 뉴스 수집 실패: {e}")
+            news_data = {}
+            news_corpus = NewsCorpus()
+    else:
+        print("\n[10/13] 뉴스 수집 건너뜀")
+
+    profile.checkpoint("10 뉴스")
+
+    # 11. AI 테마 분석
     theme_analysis = None
     if skip_ai:
         # 기존 데이터에서 theme_analysis 보존
         try:
-            existing_path = os.path.join("frontend", "public", "data", "latest.json")
+            existing_path = os.path.join(DATA_DIR, "latest.json")
             if os.path.exists(existing_path):
                 with open(existing_path, "r", encoding="utf-8") as f:
                     existing = json.load(f)
                 theme_analysis = existing.get("theme_analysis")
                 if theme_analysis:
-                    print("\n[10/13] AI 테마 분석 건너뜀 (기존 분석 결과 보존)")
+                    print("\n[11/13] AI 테마 분석 건너뜀 (기존 분석 결과 보존)")
                 else:
-                    print("\n[10/13] AI 테마 분석 건너뜀 (보존할 기존 결과 없음)")
+                    print("\n[11/13] AI 테마 분석 건너뜀 (보존할 기존 결과 없음)")
         except Exception:
-            print("\n[10/13] AI 테마 분석 건너뜀")
+            print("\n[11/13] AI 테마 분석 건너뜀")
     if not skip_ai:
-        print("\n[10/13] AI 테마 분석 중...")
+        print("\n[11/13] AI 테마 분석 중...")
         try:
             stock_context = {
                 "rising": rising_stocks,
@@ -419,6 +389,7 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
                 stock_context,
                 fundamental_data=fundamental_data,
                 investor_data=investor_data,
+                news_corpus=news_corpus,
             )
             if theme_analysis:
                 theme_count = len(theme_analysis.get("themes", []))
@@ -428,11 +399,13 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
         except Exception as e:
             print(f"  ⚠ AI 테마 분석 실패 (건너뜀): {e}")
     else:
-        print("\n[10/13] AI 테마 분석 건너뜀")
+        print("\n[11/13] AI 테마 분석 건너뜀")
+
+    profile.checkpoint("11 AI 테마 분석")
 
-    # 10-1. 종목 선정 기준 평가
+    # 11-1. 종목 선정 기준 평가
     criteria_data = {}
-    print("\n[10-1/13] 종목 선정 기준 평가 중...")
+    print("\n[11-1/13] 종목 선정 기준 평가 중...")
     try:
         criteria_data = evaluate_all_stocks(
             all_stocks=all_stocks,
@@ -447,26 +420,11 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
     except Exception as e:
         print(f"  ⚠ 기준 평가 실패 (빈 데이터로 계속): {e}")
 
-    # 11. 뉴스 수집
-    news_data = {}
-    if not skip_news:
-        print("\n[11/13] 종목별 뉴스 수집 중...")
-        try:
-            news_api = NaverNewsAPI()
-            news_data = news_api.get_multiple_stocks_news(all_stocks, news_count=3)
-            news_count = sum(1 for v in news_data.values() if v.get("news"))
-            print(f"  ✓ {news_count}개 종목 뉴스 수집 완료")
-        except Exception as e:
-            print(f"  ✗ 뉴스 수집 실패: {e}")
-            news_data = {}
-    else:
-        print("\n[11/13] 뉴스 수집 건너뜀")
-
-    # 11-1. 수집 실패 데이터 기존 값 폴백
+    # 11-2. 수집 실패 데이터 기존 값 폴백
     _existing_data = None
     if not exchange_data.get("rates") or kosdaq_index_data is None or theme_analysis is None:
         try:
-            existing_path = os.path.join("frontend", "public", "data", "latest.json")
+            existing_path = os.path.join(DATA_DIR, "latest.json")
             if os.path.exists(existing_path):
                 with open(existing_path, "r", encoding="utf-8") as f:
                     _existing_data = json.load(f)
@@ -490,7 +448,7 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
     # 히스토리에서 테마 분석 폴백 (latest.json에도 없는 경우)
     if theme_analysis is None:
         try:
-            hist_dir = os.path.join("frontend", "public", "data", "history")
+            hist_dir = os.path.join(DATA_DIR, "history")
             if os.path.isdir(hist_dir):
                 for fname in sorted(os.listdir(hist_dir), reverse=True)[:10]:
                     fpath = os.path.join(hist_dir, fname)
@@ -504,11 +462,13 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
         except Exception:
             pass
 
+    profile.checkpoint("11-1 기준 평가 + 폴백")
+
     # 12. 프론트엔드용 데이터 내보내기
     print("\n[12/13] 프론트엔드 데이터 내보내기...")
     try:
         export_path = export_for_frontend(
-            rising_stocks, falling_stocks, history_data, news_data, exchange_data,
+            rising_stocks, falling_stocks, history_data, news_corpus, exchange_data,
             volume_data=volume_data,
             trading_value_data=trading_value_data,
             fluctuation_data=fluctuation_data,
@@ -523,6 +483,8 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
     except Exception as e:
         print(f"  ✗ 데이터 내보내기 실패: {e}")
 
+    profile.checkpoint("12 데이터 내보내기")
+
     # 11. 텔레그램 발송
     print("\n[13/13] 텔레그램 메시지 준비...")
     telegram = TelegramSender()
@@ -663,6 +625,8 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
         else:
             print("  ✗ END 바리케이트 발송 실패")
 
+    profile.checkpoint("13 텔레그램")
+
     # 정상 완료 시 알림 해제
     try:
         from modules.api_health import resolve_key_alert
@@ -670,6 +634,8 @@ def main(test_mode: bool = False, skip_news: bool = False, skip_investor: bool =
     except Exception:
         pass
 
+    profile.report()
+
     print("\n" + "=" * 60)
     print("  완료!")
     print("=" * 60)
@@ -697,6 +663,14 @@ if __name__ == "__main__":
         action="store_true",
         help="AI 테마 분석 건너뛰기",
     )
+    parser.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        help="Gemini 응답 캐시(.cache/llm) 사용 안 함",
+    )
     args = parser.parse_args()
 
+    if args.no_llm_cache:
+        llm_cache.set_enabled(False)
+
     main(test_mode=args.test, skip_news=args.skip_news, skip_investor=args.skip_investor, skip_ai=args.skip_ai)
@@ -5,10 +5,15 @@ Supabase의 theme_predictions에서 active 예측을 조회하고,
 """
 import json
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Tuple
 
-from modules.utils import KST
 from modules.market_hours import KRX_HOLIDAYS_2026
+from modules.index_series import get_index_series
+from modules.price_store import get_price_store
+from modules.theme_registry import get_theme_registry
+from modules.utils import KST
+
+BENCHMARK_INDEX = "KOSPI"
 
 
 def get_active_predictions(client) -> List[Dict]:
@@ -19,8 +24,48 @@ def get_active_predictions(client) -> List[Dict]:
     return response.data or []
 
 
+def fetch_returns_by_period(codes: List[str], starts: Dict[str, str], end: str) -> Tuple[Dict[str, Dict[str, float]], Dict[str, float]]:
+    """가격 저장소를 가장 긴 기간까지 보충한 뒤 기간별 수익률을 저장소에서 계산
+
+    과거 일봉은 .cache/prices.sqlite에 남으므로 다음 실행에서는 비어 있는
+    최근 구간만 백엔드(yfinance 기본)에서 받는다. KOSPI 기준 수익률은 main.py·예측과
+    같은 지수 시계열(index_series)에서 계산하며, 지수 수익률이 없으면 경고 후 0%로 둔다.
+
+    Args:
+        codes: 종목코드 리스트
+        starts: {기간명: 시작일 YYYY-MM-DD}
+        end: 종료일 YYYY-MM-DD
+
+    Returns:
+        ({기간명: {종목코드: 수익률%}}, {기간명: KOSPI 수익률%})
+    """
+    if not starts:
+        return {}, {}
+    store = get_price_store()
+    tickers = list(dict.fromkeys(codes))
+    store.ensure(tickers, min(starts.values()), end)
+    index_series = get_index_series()
+    index_series.refresh((BENCHMARK_INDEX,), start=min(starts.values()), end=end)
+
+    returns_by_period, index_by_period = {}, {}
+    for name, start in starts.items():
+        period = store.returns(tickers, start, end)
+        index_return = index_series.returns((BENCHMARK_INDEX,), start, end).get(BENCHMARK_INDEX)
+        if index_return is None:
+            print(f"  ⚠ {BENCHMARK_INDEX} 기준 수익률 없음 ({name}: {start}~{end}) → 0%로 계산")
+            index_return = 0.0
+        index_by_period[name] = index_return
+        returns_by_period[name] = {code: float(value) for code, value in period.items()}
+
+    longest = max(starts, key=lambda n: len(returns_by_period[n]))
+    missing = [c for c in tickers if c not in returns_by_period[longest]]
+    if missing:
+        print(f"  ⚠ 데이터 미확보 종목 ({len(missing)}건): {', '.join(missing)}")
+    return returns_by_period, index_by_period
+
+
 def fetch_stock_returns(codes: List[str], start: str, end: str) -> Dict:
-    """yfinance로 한국 주식 수익률 조회
+    """한국 주식 수익률 조회 (가격 저장소 경유)
 
     Args:
         codes: 종목코드 리스트 (예: ["005930", "000660"])
@@ -30,56 +75,14 @@ def fetch_stock_returns(codes: List[str], start: str, end: str) -> Dict:
     Returns:
         {code: return_pct} 딕셔너리
     """
-    try:
-        import yfinance as yf
-    except ImportError:
-        print("  ⚠ yfinance 미설치")
-        return {}
-
-    returns = {}
-    missing_codes = []
-    # 코스피(.KS) 먼저 시도, 실패 시 코스닥(.KQ) 시도
-    for code in codes:
-        found = False
-        for suffix in [".KS", ".KQ"]:
-            ticker = f"{code}{suffix}"
-            try:
-                data = yf.download(ticker, start=start, end=end, progress=False)
-                if data.empty or len(data) < 2:
-                    continue
-                close = data["Close"]
-                first_price = float(close.iloc[0])
-                last_price = float(close.iloc[-1])
-                if first_price > 0:
-                    returns[code] = round(((last_price - first_price) / first_price) * 100, 2)
-                    found = True
-                    break
-            except Exception:
-                continue
-        if not found:
-            missing_codes.append(code)
-
-    if missing_codes:
-        print(f"  ⚠ 데이터 미확보 종목 ({len(missing_codes)}건): {', '.join(missing_codes)}")
-
-    return returns
+    returns, _ = fetch_returns_by_period(codes, {"period": start}, end)
+    return returns["period"]
 
 
 def fetch_index_return(start: str, end: str) -> float:
     """KOSPI 지수 수익률 조회"""
-    try:
-        import yfinance as yf
-        data = yf.download("^KS11", start=start, end=end, progress=False)
-        if data.empty or len(data) < 2:
-            return 0.0
-        close = data["Close"]
-        first_val = float(close.iloc[0])
-        last_val = float(close.iloc[-1])
-        if first_val > 0:
-            return round(((last_val - first_val) / first_val) * 100, 2)
-    except Exception:
-        pass
-    return 0.0
+    _, index_return = fetch_returns_by_period([], {"period": start}, end)
+    return index_return["period"]
 
 
 def evaluate_prediction(prediction: Dict, returns: Dict, index_return: float) -> str:
@@ -155,41 +158,55 @@ def update_prediction_status(client, pred_id: int, status: str, performance: Dic
 
 
 def calculate_accuracy_report(client) -> Dict:
-    """신뢰도별/카테고리별 적중률 집계"""
+    """신뢰도별/카테고리별/테마별 적중률 집계
+
+    테마별 집계는 테마 레지스트리 ID 기준이므로 표기가 다른 같은 테마가 합산된다.
+    """
     response = client.table("theme_predictions").select("*").in_(
         "status", ["hit", "missed"]
     ).execute()
 
     data = response.data or []
     if not data:
-        return {"total": 0, "hit": 0, "accuracy": 0.0, "by_confidence": {}, "by_category": {}}
+        return {"total": 0, "hit": 0, "accuracy": 0.0, "by_confidence": {}, "by_category": {}, "by_theme": {}}
 
     total = len(data)
     hits = sum(1 for d in data if d.get("status") == "hit")
 
+    registry = get_theme_registry()
     by_confidence = {}
     by_category = {}
+    by_theme_id = {}
 
     for d in data:
         confidence = d.get("confidence", "N/A")
         category = d.get("category", "N/A")
+        theme_name = d.get("theme_name")
+        theme_id = registry.intern(theme_name) if theme_name else None
         is_hit = d.get("status") == "hit"
 
-        for group, key in [(by_confidence, confidence), (by_category, category)]:
+        for group, key in [(by_confidence, confidence), (by_category, category), (by_theme_id, theme_id)]:
             if key not in group:
                 group[key] = {"total": 0, "hit": 0}
             group[key]["total"] += 1
             if is_hit:
                 group[key]["hit"] += 1
 
-    for group in [by_confidence, by_category]:
+    for group in [by_confidence, by_category, by_theme_id]:
         for v in group.values():
             v["accuracy"] = round(v["hit"] / v["total"] * 100, 1) if v["total"] else 0.0
 
+    # 테마별: 대표 이름으로 표시, 예측 건수 내림차순
+    by_theme = {
+        registry.name(tid) if tid is not None else "N/A": v
+        for tid, v in sorted(by_theme_id.items(), key=lambda item: -item[1]["total"])
+    }
+
     return {
         "total": total,
         "hit": hits,
         "accuracy": round(hits / total * 100, 1) if total else 0.0,
         "by_confidence": by_confidence,
         "by_category": by_category,
+        "by_theme": by_theme,
     }
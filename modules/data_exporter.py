@@ -5,8 +5,11 @@ import json
 import os
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
 
+from modules.news_corpus import NewsCorpus
+from modules.stock_record import json_default
+from modules.theme_matrix import update_theme_history_index
 from modules.utils import KST
 
 # 프로젝트 루트 경로
@@ -30,7 +33,7 @@ def save_history_file(data: Dict[str, Any], history_dir: Path) -> str:
     file_path = history_dir / filename
 
     with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+        json.dump(data, f, ensure_ascii=False, indent=2, default=json_default)
 
     return filename
 
@@ -117,7 +120,7 @@ def export_for_frontend(
     rising_stocks: Dict[str, List[Dict[str, Any]]],
     falling_stocks: Dict[str, List[Dict[str, Any]]],
     history_data: Dict[str, Dict[str, Any]],
-    news_data: Dict[str, Dict[str, Any]],
+    news_data: Union[Dict[str, Dict[str, Any]], NewsCorpus],
     exchange_data: Dict[str, Any] = None,
     output_dir: str = "frontend/public/data",
     save_history: bool = True,
@@ -137,7 +140,8 @@ def export_for_frontend(
         rising_stocks: 상승 종목 {"kospi": [...], "kosdaq": [...]}
         falling_stocks: 하락 종목 {"kospi": [...], "kosdaq": [...]}
         history_data: 3일간 등락률 데이터
-        news_data: 뉴스 데이터
+        news_data: 뉴스 데이터 ({code: {"name", "news"}} 또는 NewsCorpus)
+                   → 공유 코퍼스(news_corpus) + 종목별 기사 ID 참조(news)로 내보냄
         exchange_data: 환율 데이터
         output_dir: 출력 디렉토리
         save_history: 히스토리 파일 저장 여부 (기본 True)
@@ -152,6 +156,11 @@ def export_for_frontend(
     output_path = ROOT_DIR / output_dir
     output_path.mkdir(parents=True, exist_ok=True)
 
+    # 뉴스: 종목 간 중복 기사를 코퍼스로 한 번만 저장
+    if not isinstance(news_data, NewsCorpus):
+        news_data = NewsCorpus.from_news_data(news_data)
+    news_corpus, news_refs = news_data.to_export()
+
     # 데이터 구조화
     data = {
         "timestamp": datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S"),
@@ -169,7 +178,8 @@ def export_for_frontend(
         "fluctuation": _strip_meta(fluctuation_data) if fluctuation_data else None,
         "fluctuation_direct": _strip_meta(fluctuation_direct_data) if fluctuation_direct_data else None,
         "history": history_data,
-        "news": news_data,
+        "news": news_refs,
+        "news_corpus": news_corpus if news_corpus else None,
         "investor_data": investor_data if investor_data else None,
         "investor_estimated": investor_estimated if investor_data else None,
         "theme_analysis": theme_analysis,
@@ -183,7 +193,7 @@ def export_for_frontend(
     # JSON 파일 저장 (latest.json)
     file_path = output_path / "latest.json"
     with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+        json.dump(data, f, ensure_ascii=False, indent=2, default=json_default)
 
     # 히스토리 파일 저장
     if save_history:
@@ -191,5 +201,9 @@ def export_for_frontend(
         save_history_file(data, history_dir)
         cleanup_old_history(history_dir, days=30)
         update_history_index(output_path)
+        # 테마 요약은 히스토리 보관 기간과 무관하게 장기 누적 (모멘텀/로테이션용)
+        themes = (data.get("theme_analysis") or {}).get("themes")
+        if themes:
+            update_theme_history_index(output_path, datetime.now(KST).strftime("%Y-%m-%d"), themes)
 
     return str(file_path)
@@ -2,14 +2,16 @@
 
 3개 에이전트(뉴스/감성, 시장데이터, 종합) + 2-Phase JSON 구조화.
 예측당 총 6회 API 호출 (1 검색 + 1 + 3 voting 검색없음 + 1 JSON).
+Agent 1/2와 voting 3회는 서로 독립이므로 키 풀에 분산하여 동시 실행한다.
 """
-import time
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 
+from modules import llm_cache
+from modules.gemini_pool import get_key_pool
+from modules.gemini_stream import GEMINI_API_URL, GeminiStreamError, generate_text
 from modules.theme_forecast import (
-    GEMINI_API_URL,
-    _extract_text_from_response,
     _call_gemini_phase2,
     _self_consistency_vote,
 )
@@ -18,7 +20,11 @@ from datetime import datetime
 
 
 def _call_agent(prompt: str, api_key: str, use_search: bool = False) -> Optional[str]:
-    """에이전트 API 호출 (텍스트 반환)"""
+    """에이전트 API 호출 (텍스트 반환)
+
+    HTTP 오류·응답 차단은 키 풀이 냉각/키 전환/키 오류 보고를 처리하도록 그대로 전달하고,
+    그 외 오류는 None 반환.
+    """
     url = f"{GEMINI_API_URL}?key={api_key}"
     payload = {
         "contents": [{"parts": [{"text": prompt}]}],
@@ -30,25 +36,19 @@ def _call_agent(prompt: str, api_key: str, use_search: bool = False) -> Optional
     if use_search:
         payload["tools"] = [{"google_search": {}}]
 
-    try:
-        resp = requests.post(url, json=payload, timeout=180)
-        resp.raise_for_status()
-    except requests.exceptions.HTTPError as e:
-        status = e.response.status_code if e.response is not None else 0
-        print(f"    ⚠ 에이전트 호출 실패: {e}")
-        if status in (400, 401, 403):
-            try:
-                from modules.api_health import report_key_failure
-                report_key_failure("GEMINI_API_KEY", "invalid", f"HTTP {status}: {e}")
-            except Exception:
-                pass
-        return None
-    except Exception as e:
-        print(f"    ⚠ 에이전트 호출 실패: {e}")
-        return None
+    def _fetch() -> Optional[str]:
+        try:
+            text = generate_text(api_key, payload)
+        except Exception as e:
+            # 키 풀이 처리할 오류는 그대로 전달
+            if isinstance(e, (requests.exceptions.HTTPError, GeminiStreamError)):
+                raise
+            print(f"    ⚠ 에이전트 호출 실패: {e}")
+            return None
+
+        return text.strip() if text.strip() else None
 
-    text = _extract_text_from_response(resp.json())
-    return text.strip() if text.strip() else None
+    return llm_cache.cached_call(url, payload, _fetch)
 
 
 def agent_news_sentiment(context: str, api_key: str) -> Optional[str]:
@@ -171,64 +171,45 @@ JSON 형식 불필요. 상세한 종합 분석 텍스트를 출력하세요."""
 def run_multi_agent_forecast(context: str, api_keys: List[str]) -> Optional[Dict]:
     """Multi-Agent 오케스트레이터
 
-    1. agent_news_sentiment (1회, Google Search)
-    2. agent_market_data (1회, 검색 없음)
-    3. agent_synthesize (3회 voting, 검색 없음 — Agent 1 결과 재활용)
+    1. agent_news_sentiment (1회, Google Search)  ┐ 동시 실행
+    2. agent_market_data (1회, 검색 없음)          ┘
+    3. agent_synthesize (3회 voting 동시 실행, 검색 없음 — Agent 1 결과 재활용)
     4. _call_gemini_phase2 (1회, JSON 구조화)
     총 6회 API 호출 (Google Search는 Agent 1에서만 1회)
+    모든 호출은 하나의 키 풀을 공유하여 키별 동시 호출 수와 429/503 냉각 상태를 공유한다.
     """
     if not api_keys:
         return None
 
-    # 에이전트별 키 분배 (가용 키가 여러 개면 분산, 아니면 동일 키 재사용)
-    key_agent1 = api_keys[0]
-    key_agent2 = api_keys[1 % len(api_keys)]
-    key_synthesis = api_keys[0]  # Agent 1 완료 후 재사용
-    key_phase2 = api_keys[2 % len(api_keys)]
+    pool = get_key_pool()
+
+    # Step 1+2: 뉴스/감성 에이전트 + 시장 데이터 에이전트 (서로 독립 → 동시 실행)
+    print("    Agent 1(뉴스/감성) + Agent 2(시장 데이터) 동시 실행...")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        future_news = executor.submit(
+            pool.call, lambda key: agent_news_sentiment(context, key), label="Agent 1",
+        )
+        future_market = executor.submit(
+            pool.call, lambda key: agent_market_data(context, key), label="Agent 2",
+        )
+        news_analysis = future_news.result()
+        market_analysis = future_market.result()
 
-    # Step 1: 뉴스/감성 에이전트
-    print("    Agent 1: 뉴스/감성 분석...")
-    news_analysis = agent_news_sentiment(context, key_agent1)
     if not news_analysis:
         print("    ⚠ Agent 1 실패")
         return None
-
-    time.sleep(1)
-
-    # Step 2: 시장 데이터 에이전트
-    print("    Agent 2: 시장 데이터 분석...")
-    market_analysis = agent_market_data(context, key_agent2)
     if not market_analysis:
         print("    ⚠ Agent 2 실패")
         return None
 
-    time.sleep(1)
-
-    # Step 3: 종합 에이전트 (Self-Consistency 3회)
+    # Step 3: 종합 에이전트 (Self-Consistency 3회, 키 풀에 분산)
     print("    Agent 3: 종합 판단 (Self-Consistency 3회)...")
     synthesis_prompt = _build_synthesis_prompt(news_analysis, market_analysis, context)
-    reasoning = _self_consistency_vote(synthesis_prompt, key_synthesis, n_samples=3)
+    reasoning = _self_consistency_vote(synthesis_prompt, n_samples=3, key_pool=pool)
     if not reasoning:
         print("    ⚠ Agent 3 실패")
         return None
 
-    time.sleep(1)
-
-    # Step 4: JSON 구조화 (Phase 2)
+    # Step 4: JSON 구조화 (Phase 2) — 실패 시 풀이 다른 키로 재시도
     print("    Phase 2: JSON 구조화...")
-    result = _call_gemini_phase2(reasoning, key_phase2)
-    if not result:
-        # retry with remaining keys
-        tried = {key_phase2}
-        for fallback_key in api_keys:
-            if fallback_key in tried:
-                continue
-            tried.add(fallback_key)
-            try:
-                result = _call_gemini_phase2(reasoning, fallback_key)
-                if result:
-                    break
-            except Exception:
-                continue
-
-    return result
+    return pool.call(lambda key: _call_gemini_phase2(reasoning, key), label="Phase 2")
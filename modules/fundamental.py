@@ -1,18 +1,122 @@
-"""종목별 펀더멘탈(재무/밸류에이션) 데이터 수집 모듈"""
-
+"""종목별 펀더멘탈(재무/밸류에이션) 데이터 수집 모듈
+
+필드 그룹별로 갱신 주기가 다르다:
+- inquire-price (PER/PBR/EPS/BPS, 시가총액, 프로그램 매매, 52주 고저, 현재가): 장중 변동 → 매 실행 조회
+- financial-ratio (ROE, 부채비율, 영업이익률, 매출액증가율): 분기 실적 기준 → .cache/fundamental_cache.json에
+  저장하고 하루 1회까지만 재조회. 캐시된 결산년월이 이미 최근 분기라면 다음 분기 말까지 새 실적이
+  나올 수 없으므로 FINANCIAL_RATIO_MAX_AGE_DAYS까지 재사용
+"""
+import atexit
+import json
+import os
+import threading
+from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 
+from config.settings import CACHE_DIR
 from modules.kis_client import KISClient
+from modules.run_profile import get_run_profile
+from modules.utils import KST
+from modules.utils import safe_float_or_none as safe_float
 
+FUNDAMENTAL_CACHE_PATH = CACHE_DIR / "fundamental_cache.json"
+FINANCIAL_RATIO_MAX_AGE_DAYS = 7  # 최근 분기 실적이 캐시돼 있어도 정정 공시 반영을 위해 이 기간 후 재조회
+
+# financial-ratio 응답 필드 → 결과 키
+_RATIO_FIELDS = {
+    "roe": "roe_val",
+    "debt_ratio": "lblt_rate",
+    "eps_growth": "grs",
+    "opm": "bsop_prfi_inrt",
+}
+
+
+def _latest_quarter_end(today: datetime) -> str:
+    """오늘 기준 이미 끝난 가장 최근 분기의 결산년월 (YYYYMM)"""
+    month = (today.month - 1) // 3 * 3
+    if month == 0:
+        return f"{today.year - 1}12"
+    return f"{today.year}{month:02d}"
+
+
+class FinancialRatioCache:
+    """종목별 재무비율 캐시
+
+    {code: {"date": "YYYY-MM-DD"(KST 조회일), "period": 결산년월, "roe": ..., "debt_ratio": ..., ...}}
+    """
+
+    def __init__(self, path=FUNDAMENTAL_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._table: Dict[str, Dict[str, Any]] = json.load(f)
+        except (OSError, ValueError):
+            self._table = {}
+
+    def get(self, code: str, now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """재사용 가능한 재무비율 (오늘 조회분, 또는 최근 분기 실적이면서 최대 보존 기간 이내)"""
+        now = now or datetime.now(KST)
+        with self._lock:
+            entry = self._table.get(code)
+        if not entry:
+            return None
+        today = now.strftime("%Y-%m-%d")
+        if entry.get("date") == today:
+            return entry
+        try:
+            age = now.date() - datetime.strptime(entry.get("date", ""), "%Y-%m-%d").date()
+        except ValueError:
+            return None
+        if entry.get("period") and entry["period"] >= _latest_quarter_end(now) \
+                and age <= timedelta(days=FINANCIAL_RATIO_MAX_AGE_DAYS):
+            return entry
+        return None
+
+    def put(self, code: str, period: str, ratios: Dict[str, Any]) -> None:
+        with self._lock:
+            self._table[code] = {"date": datetime.now(KST).strftime("%Y-%m-%d"), "period": period, **ratios}
+            self._dirty = True
+
+    def save(self) -> None:
+        """변경 사항이 있을 때만 저장 (최대 보존 기간이 지난 항목은 정리, 원자적 쓰기)"""
+        cutoff = (datetime.now(KST) - timedelta(days=FINANCIAL_RATIO_MAX_AGE_DAYS)).strftime("%Y-%m-%d")
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {code: entry for code, entry in self._table.items() if entry.get("date", "") >= cutoff}
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"  ⚠ 재무비율 캐시 저장 실패: {e}")
+
+
+_shared_ratio_cache: Optional[FinancialRatioCache] = None
+_shared_ratio_cache_lock = threading.Lock()
 
-from modules.utils import safe_float_or_none as safe_float
+
+def get_financial_ratio_cache() -> FinancialRatioCache:
+    """프로세스 공용 재무비율 캐시 (종료 시 자동 저장)"""
+    global _shared_ratio_cache
+    with _shared_ratio_cache_lock:
+        if _shared_ratio_cache is None:
+            _shared_ratio_cache = FinancialRatioCache()
+            atexit.register(_shared_ratio_cache.save)
+        return _shared_ratio_cache
 
 
 class FundamentalCollector:
     """종목별 펀더멘탈 데이터 수집기"""
 
-    def __init__(self, client: KISClient):
+    def __init__(self, client: KISClient, ratio_cache: Optional[FinancialRatioCache] = None):
         self.client = client
+        self.ratio_cache = ratio_cache or get_financial_ratio_cache()
 
     def calculate_rsi(self, daily_prices: List[Dict], period: int = 14) -> Optional[float]:
         """일봉 종가 데이터에서 RSI(14) 계산 (Wilder's Smoothed RSI)
@@ -70,9 +174,9 @@ class FundamentalCollector:
     def collect_fundamental(self, stock_code: str) -> Dict[str, Any]:
         """단일 종목 펀더멘탈 데이터 수집
 
-        2개 API 호출:
-        1. get_stock_price() -> PER, PBR, EPS, BPS, 시가총액
-        2. get_financial_ratio() -> ROE, 부채비율, 영업이익률(OPM), 매출액증가율
+        API 호출:
+        1. get_stock_price() -> PER, PBR, EPS, BPS, 시가총액 (매 실행)
+        2. get_financial_ratio() -> ROE, 부채비율, 영업이익률(OPM), 매출액증가율 (캐시 미스일 때만)
         + PEG = PER / 매출액증가율 (계산)
         """
         result = {
@@ -128,18 +232,28 @@ class FundamentalCollector:
 
         # 2) financial-ratio -> roe, 부채비율, 영업이익률, 매출액증가율
         #    (profit-ratio 별도 호출 불필요: bsop_prfi_inrt가 이미 포함)
-        try:
-            fin_data = self.client.get_financial_ratio(stock_code)
-            if fin_data.get("rt_cd") == "0":
-                items = fin_data.get("output", [])
-                if items:
-                    latest = items[0]
-                    result["roe"] = safe_float(latest.get("roe_val"))
-                    result["debt_ratio"] = safe_float(latest.get("lblt_rate"))
-                    result["eps_growth"] = safe_float(latest.get("grs"))
-                    result["opm"] = safe_float(latest.get("bsop_prfi_inrt"))
-        except Exception:
-            pass
+        profile = get_run_profile()
+        cached = self.ratio_cache.get(stock_code)
+        if cached is not None:
+            profile.count("fundamental_cache.hit")
+            for key in _RATIO_FIELDS:
+                result[key] = cached.get(key)
+        else:
+            profile.count("fundamental_cache.miss")
+            try:
+                fin_data = self.client.get_financial_ratio(stock_code)
+                if fin_data.get("rt_cd") == "0":
+                    items = fin_data.get("output", [])
+                    latest = items[0] if items else {}
+                    for key, field in _RATIO_FIELDS.items():
+                        result[key] = safe_float(latest.get(field))
+                    self.ratio_cache.put(
+                        stock_code,
+                        latest.get("stac_yymm", ""),
+                        {key: result[key] for key in _RATIO_FIELDS},
+                    )
+            except Exception:
+                pass
 
         # PEG 계산
         if result["per"] and result["eps_growth"] and result["eps_growth"] > 0:
@@ -5,181 +5,143 @@ Google Search grounding을 활용하여 최신 뉴스 기반 시장 테마 분
 """
 import json
 import re
-import time
-import requests
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
-from config.settings import GEMINI_API_KEY_1, GEMINI_API_KEY_2, GEMINI_API_KEY_3, GEMINI_API_KEY_4, GEMINI_API_KEY_5
+from modules import llm_cache
+from modules.gemini_pool import get_api_keys, get_key_pool
+from modules.gemini_stream import GEMINI_API_URL, IncrementalJSONArrayParser, generate_text
+from modules.news_corpus import NewsCorpus
+from modules.prompt_context import (
+    STOCK_CONTEXT_TOKEN_BUDGET, Table, fit_to_budget, fmt_num, fmt_qty,
+    rank_flags, ranking_positions, relevance_score,
+)
 from modules.utils import KST
 
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
-
 
 def _get_api_keys() -> List[str]:
     """사용 가능한 API 키 목록 반환"""
-    keys = [GEMINI_API_KEY_1, GEMINI_API_KEY_2, GEMINI_API_KEY_3, GEMINI_API_KEY_4, GEMINI_API_KEY_5]
-    return [k for k in keys if k]
-
-
-def _build_stock_context(stock_data: Dict[str, Any], fundamental_data: Dict[str, Dict] = None, investor_data: Dict[str, Dict] = None) -> str:
-    """수집된 종목 데이터에서 Gemini 프롬프트용 컨텍스트 생성"""
-    lines = []
-
-    # 상승 TOP10
-    rising_kospi = stock_data.get("rising", {}).get("kospi", [])[:10]
-    rising_kosdaq = stock_data.get("rising", {}).get("kosdaq", [])[:10]
-    if rising_kospi or rising_kosdaq:
-        lines.append("## 상승률 TOP 종목")
-        for s in rising_kospi:
-            lines.append(f"- {s.get('name')}({s.get('code')}) 코스피 +{s.get('change_rate', 0):.2f}% 현재가:{s.get('current_price', 0):,}원 거래량:{s.get('volume', 0):,}")
-        for s in rising_kosdaq:
-            lines.append(f"- {s.get('name')}({s.get('code')}) 코스닥 +{s.get('change_rate', 0):.2f}% 현재가:{s.get('current_price', 0):,}원 거래량:{s.get('volume', 0):,}")
-
-    # 거래량 TOP10
-    vol_kospi = stock_data.get("volume", {}).get("kospi", [])[:20]
-    vol_kosdaq = stock_data.get("volume", {}).get("kosdaq", [])[:20]
-    if vol_kospi or vol_kosdaq:
-        lines.append("\n## 거래량 TOP 종목")
-        for s in vol_kospi:
-            lines.append(f"- {s.get('name')}({s.get('code')}) 코스피 등락:{s.get('change_rate', 0):.2f}% 거래량:{s.get('volume', 0):,}")
-        for s in vol_kosdaq:
-            lines.append(f"- {s.get('name')}({s.get('code')}) 코스닥 등락:{s.get('change_rate', 0):.2f}% 거래량:{s.get('volume', 0):,}")
-
-    # 거래대금 TOP10
-    tv_kospi = stock_data.get("trading_value", {}).get("kospi", [])[:20]
-    tv_kosdaq = stock_data.get("trading_value", {}).get("kosdaq", [])[:20]
-    if tv_kospi or tv_kosdaq:
-        lines.append("\n## 거래대금 TOP 종목")
-        for s in tv_kospi:
-            tv = s.get("trading_value", 0)
-            tv_str = f"{tv / 100_000_000:,.0f}억원" if tv else "N/A"
-            lines.append(f"- {s.get('name')}({s.get('code')}) 코스피 등락:{s.get('change_rate', 0):.2f}% 거래대금:{tv_str}")
-        for s in tv_kosdaq:
-            tv = s.get("trading_value", 0)
-            tv_str = f"{tv / 100_000_000:,.0f}억원" if tv else "N/A"
-            lines.append(f"- {s.get('name')}({s.get('code')}) 코스닥 등락:{s.get('change_rate', 0):.2f}% 거래대금:{tv_str}")
-
-    # 등락률 TOP10
+    return get_api_keys()
+
+
+def _build_stock_context(
+    stock_data: Dict[str, Any],
+    fundamental_data: Dict[str, Dict] = None,
+    investor_data: Dict[str, Dict] = None,
+    token_budget: int = STOCK_CONTEXT_TOKEN_BUDGET,
+) -> str:
+    """수집된 종목 데이터에서 Gemini 프롬프트용 컨텍스트 생성
+
+    랭킹·밸류에이션·수급·프로그램 매매를 종목당 한 줄의 압축 테이블로 합치고,
+    토큰 예산을 넘으면 관련도가 낮은 종목부터 제외한다.
+    """
+    fundamental_data = fundamental_data or {}
+    investor_data = investor_data or {}
+    positions = ranking_positions(stock_data)
+
+    # 종목코드 → 기본 정보 (랭킹 목록에서 처음 등장한 값 사용, 거래대금은 거래대금 목록 우선)
+    info: Dict[str, Dict[str, Any]] = {}
     fluc = stock_data.get("fluctuation", {})
-    fluc_kospi_up = fluc.get("kospi_up", [])[:20]
-    fluc_kosdaq_up = fluc.get("kosdaq_up", [])[:20]
-    if fluc_kospi_up or fluc_kosdaq_up:
-        lines.append("\n## 등락률 상승 TOP 종목")
-        for s in fluc_kospi_up:
-            lines.append(f"- {s.get('name')}({s.get('code')}) 코스피 +{s.get('change_rate', 0):.2f}% 현재가:{s.get('current_price', 0):,}원")
-        for s in fluc_kosdaq_up:
-            lines.append(f"- {s.get('name')}({s.get('code')}) 코스닥 +{s.get('change_rate', 0):.2f}% 현재가:{s.get('current_price', 0):,}원")
-    # 거래대금+상승률 교차 필터 (거래대금 순서 기준, 등락률 상승 TOP에도 포함된 종목)
-    fluc_up_codes = set(
-        s.get("code", "") for s in fluc.get("kospi_up", []) + fluc.get("kosdaq_up", [])
-    )
-    tv_all_kospi = stock_data.get("trading_value", {}).get("kospi", [])
-    tv_all_kosdaq = stock_data.get("trading_value", {}).get("kosdaq", [])
-
-    cross_kospi_up = [s for s in tv_all_kospi if s.get("code", "") in fluc_up_codes][:10]
-    cross_kosdaq_up = [s for s in tv_all_kosdaq if s.get("code", "") in fluc_up_codes][:10]
-    if cross_kospi_up or cross_kosdaq_up:
-        lines.append("\n## 거래대금+상승률 교차 종목 (대금 순)")
-        for s in cross_kospi_up:
-            tv = s.get("trading_value", 0)
-            tv_str = f"{tv / 100_000_000:,.0f}억원" if tv else "N/A"
-            lines.append(f"- {s.get('name')}({s.get('code')}) 코스피 등락:+{s.get('change_rate', 0):.2f}% 거래대금:{tv_str}")
-        for s in cross_kosdaq_up:
-            tv = s.get("trading_value", 0)
-            tv_str = f"{tv / 100_000_000:,.0f}억원" if tv else "N/A"
-            lines.append(f"- {s.get('name')}({s.get('code')}) 코스닥 등락:+{s.get('change_rate', 0):.2f}% 거래대금:{tv_str}")
-
-    # 종목코드 → 종목명 매핑 구성 (펀더멘탈/수급 섹션에서 공용)
-    code_to_name = {}
-    all_sections = [
-        stock_data.get("rising", {}),
-        stock_data.get("falling", {}),
-        stock_data.get("volume", {}),
-        stock_data.get("trading_value", {}),
-    ]
-    fluc_data = stock_data.get("fluctuation", {})
-    for section in all_sections:
-        for market_stocks in section.values():
-            if isinstance(market_stocks, list):
-                for s in market_stocks:
-                    c = s.get("code", "")
-                    if c:
-                        code_to_name[c] = s.get("name", c)
+    sources = []
+    for group in ("trading_value", "rising", "volume", "falling"):
+        for market, label in (("kospi", "코스피"), ("kosdaq", "코스닥")):
+            sources.append((label, (stock_data.get(group) or {}).get(market, [])))
     for key in ("kospi_up", "kospi_down", "kosdaq_up", "kosdaq_down"):
-        for s in fluc_data.get(key, []):
-            c = s.get("code", "")
-            if c:
-                code_to_name[c] = s.get("name", c)
-
-    # 펀더멘탈 데이터 섹션
-    if fundamental_data:
-        lines.append("\n## 종목별 밸류에이션/재무 지표")
-        for code, f in fundamental_data.items():
-            name = code_to_name.get(code, code)
-            parts = []
-            if f.get("per") is not None:
-                parts.append(f"PER:{f['per']}")
-            if f.get("pbr") is not None:
-                parts.append(f"PBR:{f['pbr']}")
-            if f.get("eps") is not None:
-                parts.append(f"EPS:{f['eps']:,.0f}원")
-            if f.get("market_cap") is not None:
-                parts.append(f"시총:{f['market_cap']:,.0f}억")
-            if f.get("roe") is not None:
-                parts.append(f"ROE:{f['roe']}%")
-            if f.get("opm") is not None:
-                parts.append(f"OPM:{f['opm']}%")
-            if f.get("debt_ratio") is not None:
-                parts.append(f"부채비율:{f['debt_ratio']}%")
-            if f.get("peg") is not None:
-                parts.append(f"PEG:{f['peg']}")
-            if f.get("rsi") is not None:
-                parts.append(f"RSI:{f['rsi']:.1f}")
-            if parts:
-                lines.append(f"- {name}({code}): {' | '.join(parts)}")
-
-    # 외국인/기관 수급 데이터 섹션
-    if investor_data:
-        lines.append("\n## 종목별 외국인/기관 수급 동향")
-        for code, inv in investor_data.items():
-            name = code_to_name.get(code, code)
-            parts = []
-            foreign = inv.get("foreign_net")
-            institution = inv.get("institution_net")
-            individual = inv.get("individual_net")
-            if foreign is not None and foreign != 0:
-                sign = "+" if foreign > 0 else ""
-                parts.append(f"외국인:{sign}{foreign:,}주")
-            if institution is not None and institution != 0:
-                sign = "+" if institution > 0 else ""
-                parts.append(f"기관:{sign}{institution:,}주")
-            if individual is not None and individual != 0:
-                sign = "+" if individual > 0 else ""
-                parts.append(f"개인:{sign}{individual:,}주")
-            if parts:
-                lines.append(f"- {name}({code}): {' | '.join(parts)}")
-
-    # 프로그램 매매 데이터 섹션 (fundamental_data에서 추출)
-    if fundamental_data:
-        pgtr_lines = []
-        for code, f in fundamental_data.items():
-            pgtr = f.get("pgtr_ntby_qty")
-            if pgtr is not None and pgtr != 0:
-                name = code_to_name.get(code, code)
-                sign = "+" if pgtr > 0 else ""
-                label = "순매수" if pgtr > 0 else "순매도"
-                pgtr_lines.append(f"- {name}({code}): 프로그램 {label} {sign}{pgtr:,}주")
-        if pgtr_lines:
-            lines.append("\n## 종목별 프로그램 매매 동향")
-            lines.extend(pgtr_lines)
-
+        sources.append(("코스피" if key.startswith("kospi") else "코스닥", fluc.get(key, [])))
+    for label, stocks in sources:
+        for s in stocks:
+            code = s.get("code", "")
+            if code and code not in info:
+                info[code] = {**s, "market_label": label}
+
+    codes = [c for c in info if c in positions]
+    codes += [c for c in list(fundamental_data) + list(investor_data) if c not in codes]
+    if not codes:
+        return ""
+
+    table = Table(
+        "종목 데이터",
+        ["종목", "코드", "시장", "등락%", "현재가", "거래량", "대금억", "순위",
+         "PER", "PBR", "ROE", "OPM", "부채", "PEG", "RSI", "시총억", "외인", "기관", "개인", "프로그램"],
+        legend=(
+            "순위=랭킹별 순위(대=거래대금, 상=상승률, 량=거래량, 률=등락률 상승, 하=하락률 / 시장별), "
+            "ROE·OPM·부채=%, 외인·기관·개인·프로그램=순매수 수량(주, 만=1만주), -=데이터 없음"
+        ),
+    )
+    for code in codes:
+        s = info.get(code, {})
+        f = fundamental_data.get(code, {})
+        inv = investor_data.get(code, {})
+        pos = positions.get(code, {})
+        tv = s.get("trading_value")
+        table.add(
+            relevance_score(pos, has_fundamental=bool(f)),
+            [
+                s.get("name") or inv.get("name") or code,
+                code,
+                s.get("market_label"),
+                f"{s['change_rate']:+.2f}" if s.get("change_rate") is not None else None,
+                s.get("current_price"),
+                s.get("volume"),
+                f"{tv / 100_000_000:.0f}" if tv else None,
+                rank_flags(pos),
+                fmt_num(f.get("per")),
+                fmt_num(f.get("pbr")),
+                fmt_num(f.get("roe")),
+                fmt_num(f.get("opm")),
+                fmt_num(f.get("debt_ratio")),
+                fmt_num(f.get("peg")),
+                fmt_num(f.get("rsi")),
+                fmt_num(f.get("market_cap"), 0),
+                fmt_qty(inv.get("foreign_net")),
+                fmt_qty(inv.get("institution_net")),
+                fmt_qty(inv.get("individual_net")),
+                fmt_qty(f.get("pgtr_ntby_qty")),
+            ],
+        )
+
+    # 거래대금+상승률 교차 종목은 대장주 판단의 1차 근거이므로 별도 요약 (대금 순)
+    fluc_up_codes = {s.get("code", "") for s in fluc.get("kospi_up", []) + fluc.get("kosdaq_up", [])}
+    cross = []
+    for market in ("kospi", "kosdaq"):
+        tv_list = (stock_data.get("trading_value") or {}).get(market, [])
+        cross += [f"{s.get('name')}({s.get('code')})" for s in tv_list if s.get("code", "") in fluc_up_codes][:10]
+    cross_text = f"## 거래대금+상승률 교차 종목 (대금 순)\n{', '.join(cross)}" if cross else ""
+
+    return fit_to_budget([cross_text, table], token_budget)
+
+
+def _build_news_context(stock_data: Dict[str, Any], news_corpus: NewsCorpus, limit: int = 60) -> str:
+    """수집된 뉴스 코퍼스에서 헤드라인 섹션 생성 (여러 종목이 공유하는 기사 우선)"""
+    # 프롬프트에 포함된 종목 순서(상승 → 하락 → 거래대금 → 거래량)를 우선순위로 사용
+    codes: List[str] = []
+    for group, markets in (("rising", ("kospi", "kosdaq")), ("falling", ("kospi", "kosdaq")),
+                           ("trading_value", ("kospi", "kosdaq")), ("volume", ("kospi", "kosdaq"))):
+        for market in markets:
+            for stock in (stock_data.get(group) or {}).get(market, [])[:10]:
+                code = stock.get("code")
+                if code and code not in codes:
+                    codes.append(code)
+
+    items = news_corpus.headlines(codes, limit=limit)
+    if not items:
+        return ""
+
+    lines = ["\n## 수집된 종목 뉴스 헤드라인 (네이버 뉴스, 최근 7일)"]
+    for article, names in items:
+        date = article.get("pubDate", "")
+        link = article.get("originallink") or article.get("link", "")
+        lines.append(f"- [{', '.join(names)}] {article.get('title', '')} ({date}) {link}")
     return "\n".join(lines)
 
 
-def _build_prompt(stock_context: str) -> str:
+def _build_prompt(stock_context: str, has_news: bool = False) -> str:
     """Gemini 프롬프트 생성"""
     today = datetime.now(KST).strftime("%Y년 %m월 %d일")
+    news_guide = (
+        "- 위 '수집된 종목 뉴스 헤드라인'을 뉴스 근거로 우선 활용하고 (URL 그대로 사용), 부족한 부분만 Google Search로 보완\n"
+        if has_news else ""
+    )
     return f"""당신은 한국 주식시장 전문 애널리스트입니다. 오늘은 {today}입니다.
 
 아래는 오늘 한국 주식시장에서 수집된 실시간 종목 데이터입니다:
@@ -191,7 +153,7 @@ def _build_prompt(stock_context: str) -> str:
 
 ### 데이터 활용 방법
 - 위에 제공된 종목 데이터(등락률, 거래대금, 거래량, 밸류에이션, 수급, 프로그램 매매)를 1차 근거로 사용
-- Google Search로 각 종목의 최신 뉴스를 검색하여 테마 연관성 확인 (반드시 오늘 {today} 기준)
+{news_guide}- Google Search로 각 종목의 최신 뉴스를 검색하여 테마 연관성 확인 (반드시 오늘 {today} 기준)
 - Google Search로 "{{종목명}} 실적" 키워드를 검색하여 최신 실적 정보 보완
 - 과거 학습 데이터가 아닌 Google Search를 통해 실시간 뉴스를 확인할 것
 
@@ -275,36 +237,34 @@ def _call_gemini(prompt: str, api_key: str) -> Optional[Dict]:
         },
     }
 
-    resp = requests.post(url, json=payload, timeout=120)
-    resp.raise_for_status()
-
-    data = resp.json()
-    candidates = data.get("candidates", [])
-    if not candidates:
-        return None
+    def _fetch() -> Optional[Dict]:
+        # 테마 객체가 완성되는 즉시 진행 로그 출력 (스트리밍)
+        parser = IncrementalJSONArrayParser(
+            ("themes",), on_item=lambda _, theme: print(f"    ↳ 테마 수신: {theme.get('theme_name', '?')}"),
+        )
+        text = generate_text(api_key, payload, on_text=parser.feed)
+        if not text.strip():
+            return None
 
-    content = candidates[0].get("content", {})
-    parts = content.get("parts", [])
-
-    # 텍스트 파트 결합
-    text = ""
-    for part in parts:
-        if "text" in part:
-            text += part["text"]
-
-    if not text.strip():
-        return None
+        return _extract_json(text)
 
-    return _extract_json(text)
+    # 같은 입력의 재실행은 LLM 캐시 결과 사용
+    return llm_cache.cached_call(url, payload, _fetch)
 
 
-def analyze_themes(stock_data: Dict[str, Any], fundamental_data: Dict[str, Dict] = None, investor_data: Dict[str, Dict] = None) -> Optional[Dict]:
+def analyze_themes(
+    stock_data: Dict[str, Any],
+    fundamental_data: Dict[str, Dict] = None,
+    investor_data: Dict[str, Dict] = None,
+    news_corpus: NewsCorpus = None,
+) -> Optional[Dict]:
     """수집된 종목 데이터로 AI 테마 분석 수행
 
     Args:
         stock_data: rising, falling, volume, trading_value 등 수집 데이터
         fundamental_data: {종목코드: {"per": ..., "pbr": ..., ...}} 펀더멘탈 데이터 (프로그램 매매 포함)
         investor_data: {종목코드: {"foreign_net": ..., "institution_net": ..., ...}} 수급 데이터
+        news_corpus: 이미 수집한 뉴스 코퍼스 (있으면 헤드라인을 프롬프트 근거로 포함)
 
     Returns:
         분석 결과 dict 또는 실패 시 None
@@ -319,47 +279,21 @@ def analyze_themes(stock_data: Dict[str, Any], fundamental_data: Dict[str, Dict]
         print("  ⚠ 분석할 종목 데이터가 없습니다")
         return None
 
-    prompt = _build_prompt(stock_context)
-
-    max_retries_per_key = 3
-
-    for key_idx, api_key in enumerate(api_keys):
-        for attempt in range(max_retries_per_key):
-            try:
-                print(f"  Gemini API 호출 중... (키 {key_idx + 1}/{len(api_keys)}, 시도 {attempt + 1}/{max_retries_per_key})")
-                result = _call_gemini(prompt, api_key)
-                if result:
-                    now = datetime.now(KST)
-                    return {
-                        "analyzed_at": now.strftime("%Y-%m-%d %H:%M:%S"),
-                        "analysis_date": now.strftime("%Y년 %m월 %d일"),
-                        "market_summary": result.get("market_summary", ""),
-                        "themes": result.get("themes", []),
-                    }
-                print("  ⚠ Gemini 응답이 비어있습니다")
-            except requests.exceptions.HTTPError as e:
-                status = e.response.status_code if e.response is not None else 0
-                if status in (429, 503):
-                    if attempt < max_retries_per_key - 1:
-                        wait = 2 ** (attempt + 1)
-                        print(f"  ⚠ API 제한 ({status}), {wait}초 후 재시도...")
-                        time.sleep(wait)
-                        continue
-                    else:
-                        print(f"  ⚠ 키 {key_idx + 1} 재시도 소진, 다음 키로 전환")
-                        break
-                else:
-                    print(f"  ✗ Gemini API 오류 ({status}): {e}")
-                    return None
-            except json.JSONDecodeError as e:
-                print(f"  ⚠ Gemini 응답 JSON 파싱 실패: {e}")
-                if attempt < max_retries_per_key - 1:
-                    time.sleep(2)
-                    continue
-                break
-            except Exception as e:
-                print(f"  ✗ Gemini API 호출 실패: {e}")
-                return None
+    news_context = _build_news_context(stock_data, news_corpus) if news_corpus else ""
+    prompt = _build_prompt(stock_context + news_context, has_news=bool(news_context))
+
+    # 키 선택/냉각/재시도는 공용 키 풀이 담당 (키당 최대 3회 상당)
+    pool = get_key_pool()
+    print(f"  Gemini API 호출 중... (키 {len(pool)}개 풀)")
+    result = pool.call(lambda key: _call_gemini(prompt, key), max_attempts=len(pool) * 3, label="테마 분석")
+    if result:
+        now = datetime.now(KST)
+        return {
+            "analyzed_at": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "analysis_date": now.strftime("%Y년 %m월 %d일"),
+            "market_summary": result.get("market_summary", ""),
+            "themes": result.get("themes", []),
+        }
 
     print("  ✗ 모든 Gemini API 키로 분석 실패")
     return None
@@ -0,0 +1,384 @@
+"""
+Gemini API 키 풀
+
+GEMINI_API_KEY_01..05를 하나의 풀로 묶어 여러 스레드가 동시에 호출할 때
+- 키별 동시 호출 수 제한 (max_concurrency_per_key)
+- 429/503 발생 시 해당 키 냉각(cooldown) 상태를 모든 호출자가 공유
+- 실패 시 다른 키로 재시도
+를 담당한다.
+
+키 선택: 진행 중 호출이 적은 키 → 건강 점수(최근 429/503 횟수, 응답 지연 EWMA)가
+좋은 키 → 오늘 사용량이 적은 키 순. 키별 상태(지연, 제한 이력, 냉각 만료 시각,
+일일 호출 수)는 .cache/gemini_key_pool.json에 저장되어 다음 실행에서도 이어진다.
+모든 Gemini 호출부는 get_key_pool()로 같은 풀을 공유한다.
+"""
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, TypeVar
+
+import requests
+
+from config.settings import (
+    CACHE_DIR,
+    GEMINI_API_KEY_1, GEMINI_API_KEY_2, GEMINI_API_KEY_3, GEMINI_API_KEY_4, GEMINI_API_KEY_5,
+)
+from modules.gemini_stream import GeminiStreamError
+from modules.utils import KST
+
+T = TypeVar("T")
+
+# 키 상태 판정용 HTTP 상태 코드
+THROTTLE_STATUSES = (429, 503)
+SERVER_ERROR_STATUSES = (500, 502, 504)
+INVALID_KEY_STATUSES = (401, 403)
+BAD_REQUEST_STATUS = 400
+TRANSPORT_FAILURE_STATUS = -1  # 연결/타임아웃/스트림 실패 (HTTP 상태 없음)
+
+KEY_POOL_STATE_PATH = CACHE_DIR / "gemini_key_pool.json"
+THROTTLE_WINDOW_SEC = 3600  # 건강 점수에 반영할 429/503 이력 기간
+LATENCY_EWMA_ALPHA = 0.3
+# 키당 일일 호출 상한 (0이면 제한 없음) — 무료 티어 RPD에 맞춰 설정
+DAILY_LIMIT_PER_KEY = int(os.getenv("GEMINI_DAILY_LIMIT_PER_KEY", "0") or 0)
+
+
+class NoKeyAvailableError(RuntimeError):
+    """대기 시간 내에 사용할 수 있는 키가 없음"""
+
+
+def _fingerprint(key: str) -> str:
+    """상태 파일용 키 식별자 (키 원문은 저장하지 않음)"""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class _KeyState:
+    __slots__ = (
+        "index", "key", "in_flight", "cooldown_until", "throttle_streak", "invalid",
+        "latency_ewma", "throttle_times", "daily_date", "daily_count",
+    )
+
+    def __init__(self, index: int, key: str):
+        self.index = index
+        self.key = key
+        self.in_flight = 0
+        self.cooldown_until = 0.0  # epoch 초 (실행 간 유지)
+        self.throttle_streak = 0
+        self.invalid = False
+        self.latency_ewma: Optional[float] = None
+        self.throttle_times: List[float] = []
+        self.daily_date = ""
+        self.daily_count = 0
+
+    def recent_throttles(self, now: float) -> int:
+        return sum(1 for t in self.throttle_times if now - t <= THROTTLE_WINDOW_SEC)
+
+    def health_penalty(self, now: float) -> float:
+        """낮을수록 건강 (최근 제한 1회 = 지연 20초 상당)"""
+        latency = self.latency_ewma if self.latency_ewma is not None else 0.0
+        return self.recent_throttles(now) * 20.0 + latency
+
+    def to_dict(self) -> Dict:
+        return {
+            "cooldown_until": self.cooldown_until,
+            "throttle_streak": self.throttle_streak,
+            "latency_ewma": self.latency_ewma,
+            "throttle_times": self.throttle_times[-20:],
+            "daily_date": self.daily_date,
+            "daily_count": self.daily_count,
+        }
+
+    def load_dict(self, data: Dict, now: float):
+        self.cooldown_until = float(data.get("cooldown_until", 0.0))
+        self.throttle_streak = int(data.get("throttle_streak", 0))
+        self.latency_ewma = data.get("latency_ewma")
+        self.throttle_times = [t for t in data.get("throttle_times", []) if now - t <= THROTTLE_WINDOW_SEC]
+        self.daily_date = data.get("daily_date", "")
+        self.daily_count = int(data.get("daily_count", 0))
+
+
+class GeminiKeyPool:
+    """스레드 안전 Gemini 키 풀"""
+
+    def __init__(
+        self,
+        api_keys: List[str],
+        max_concurrency_per_key: int = 2,
+        base_cooldown: float = 4.0,
+        max_cooldown: float = 60.0,
+        max_wait: float = 120.0,
+        daily_limit: int = DAILY_LIMIT_PER_KEY,
+        state_path=None,
+    ):
+        """
+        Args:
+            api_keys: 사용 가능한 API 키 목록
+            max_concurrency_per_key: 키당 동시 호출 수 상한
+            base_cooldown: 첫 429/503 시 냉각 시간 (초), 연속 발생 시 2배씩 증가
+            max_cooldown: 냉각 시간 상한 (초)
+            max_wait: 키 확보 최대 대기 시간 (초)
+            daily_limit: 키당 일일 호출 상한 (0이면 제한 없음)
+            state_path: 키 상태 저장 경로 (None이면 저장하지 않음)
+        """
+        self._states = [_KeyState(i, k) for i, k in enumerate([k for k in api_keys if k])]
+        self.max_concurrency_per_key = max(1, max_concurrency_per_key)
+        self.base_cooldown = base_cooldown
+        self.max_cooldown = max_cooldown
+        self.max_wait = max_wait
+        self.daily_limit = daily_limit
+        self.state_path = state_path
+        self._cond = threading.Condition()
+        if state_path is not None:
+            self._load_state()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                saved = json.load(f).get("keys", {})
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for st in self._states:
+            data = saved.get(_fingerprint(st.key))
+            if data:
+                st.load_dict(data, now)
+
+    def save(self):
+        """키 상태 저장 (실행 간 냉각/사용량/지연 이력 유지)"""
+        if self.state_path is None:
+            return
+        with self._cond:
+            payload = {
+                "updated_at": datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S"),
+                "keys": {_fingerprint(st.key): st.to_dict() for st in self._states},
+            }
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"  ⚠ Gemini 키 상태 저장 실패: {e}")
+
+    def summary(self) -> List[Dict]:
+        """키별 상태 요약 (로그/리포트용)"""
+        now = time.time()
+        with self._cond:
+            return [
+                {
+                    "key": f"{st.index + 1}",
+                    "today": st.daily_count if st.daily_date == self._today() else 0,
+                    "latency": round(st.latency_ewma, 1) if st.latency_ewma is not None else None,
+                    "throttles_1h": st.recent_throttles(now),
+                    "cooling": max(0.0, round(st.cooldown_until - now, 1)),
+                    "invalid": st.invalid,
+                }
+                for st in self._states
+            ]
+
+    @staticmethod
+    def _today() -> str:
+        return datetime.now(KST).strftime("%Y-%m-%d")
+
+    def _quota_left(self, st: _KeyState, today: str) -> bool:
+        if not self.daily_limit:
+            return True
+        used = st.daily_count if st.daily_date == today else 0
+        return used < self.daily_limit
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def label(self, key: str) -> str:
+        """로그용 키 라벨 (키 원문 노출 방지)"""
+        for st in self._states:
+            if st.key == key:
+                return f"키 {st.index + 1}/{len(self._states)}"
+        return "키 ?"
+
+    def _usable(self, exclude: Iterable[str], today: str) -> List[_KeyState]:
+        return [
+            st for st in self._states
+            if not st.invalid and st.key not in exclude and self._quota_left(st, today)
+        ]
+
+    def _pick(self, exclude: Iterable[str], now: float) -> Optional[_KeyState]:
+        """즉시 사용 가능한 키 중 부하 → 건강 점수 → 오늘 사용량 순으로 최적 키"""
+        today = self._today()
+        candidates = [
+            st for st in self._usable(exclude, today)
+            if st.cooldown_until <= now and st.in_flight < self.max_concurrency_per_key
+        ]
+        if not candidates:
+            return None
+        return min(
+            candidates,
+            key=lambda st: (
+                st.in_flight,
+                st.health_penalty(now),
+                st.daily_count if st.daily_date == today else 0,
+                st.index,
+            ),
+        )
+
+    def acquire(self, exclude: Iterable[str] = ()) -> str:
+        """키 확보 (모든 키가 냉각/포화 상태면 대기)
+
+        Raises:
+            NoKeyAvailableError: 사용 가능한 키가 없거나 max_wait 초과
+        """
+        exclude = set(exclude)
+        deadline = time.time() + self.max_wait
+        with self._cond:
+            while True:
+                now = time.time()
+                st = self._pick(exclude, now)
+                if st is not None:
+                    st.in_flight += 1
+                    today = self._today()
+                    if st.daily_date != today:
+                        st.daily_date, st.daily_count = today, 0
+                    st.daily_count += 1
+                    return st.key
+
+                usable = self._usable(exclude, self._today())
+                if not usable or now >= deadline:
+                    raise NoKeyAvailableError("사용 가능한 Gemini API 키가 없습니다")
+                # 가장 빨리 풀리는 냉각 시점 또는 다른 호출 완료까지 대기
+                next_ready = min(
+                    (s.cooldown_until for s in usable if s.cooldown_until > now),
+                    default=now + 1.0,
+                )
+                self._cond.wait(timeout=max(0.05, min(next_ready, deadline) - now))
+
+    def release(self, key: str, status: Optional[int] = None, latency: Optional[float] = None) -> None:
+        """키 반환 + 결과 반영
+
+        Args:
+            status: 실패 HTTP 상태 코드 (성공이면 None, 전송 실패는 TRANSPORT_FAILURE_STATUS -
+                냉각도 연속 제한 초기화도 하지 않고 지연 시간도 반영하지 않음)
+            latency: 호출 소요 시간 (초, 성공 시 지연 EWMA에 반영)
+        """
+        with self._cond:
+            for st in self._states:
+                if st.key != key:
+                    continue
+                st.in_flight = max(0, st.in_flight - 1)
+                now = time.time()
+                if status in THROTTLE_STATUSES:
+                    cooldown = min(self.max_cooldown, self.base_cooldown * (2 ** st.throttle_streak))
+                    st.throttle_streak += 1
+                    st.throttle_times.append(now)
+                    st.cooldown_until = max(st.cooldown_until, now + cooldown)
+                    print(f"    ⚠ {self.label(key)} API 제한 ({status}), {cooldown:.0f}초 냉각")
+                elif status in INVALID_KEY_STATUSES:
+                    st.invalid = True
+                elif status is None:
+                    st.throttle_streak = 0
+                    if latency is not None:
+                        st.latency_ewma = latency if st.latency_ewma is None else (
+                            LATENCY_EWMA_ALPHA * latency + (1 - LATENCY_EWMA_ALPHA) * st.latency_ewma
+                        )
+                break
+            self._cond.notify_all()
+
+    @contextmanager
+    def lease(self, exclude: Iterable[str] = ()):
+        """with pool.lease() as key: ... — HTTP 오류 상태와 지연 시간은 자동으로 풀에 반영
+
+        연결/타임아웃 오류와 스트림 실패는 성공으로 치지 않고 전송 실패로 반환한다.
+        """
+        key = self.acquire(exclude)
+        status = None
+        started = time.monotonic()
+        try:
+            yield key
+        except requests.exceptions.HTTPError as e:
+            status = e.response.status_code if e.response is not None else TRANSPORT_FAILURE_STATUS
+            raise
+        except (requests.exceptions.RequestException, GeminiStreamError):
+            status = TRANSPORT_FAILURE_STATUS
+            raise
+        finally:
+            latency = time.monotonic() - started if status is None else None
+            self.release(key, status, latency)
+
+    def call(
+        self,
+        fn: Callable[[str], Optional[T]],
+        max_attempts: Optional[int] = None,
+        retry_empty: bool = True,
+        label: str = "",
+    ) -> Optional[T]:
+        """fn(key)를 실행하고 429/503/5xx 또는 빈 응답이면 다른 키로 재시도
+
+        잘못된 키(401/403)는 풀에서 제외하고 api_health에 보고한다.
+        400은 요청 자체의 문제이므로 보고 후 즉시 None 반환.
+        모든 시도가 실패하면 None 반환.
+        """
+        attempts = max_attempts or max(2, len(self._states) * 2)
+        tried: List[str] = []
+        prefix = f"{label} " if label else ""
+        for _ in range(attempts):
+            # 모든 키를 한 번씩 시도했으면 다시 전체 키를 대상으로 (냉각은 풀이 관리)
+            exclude = tried if len(set(tried)) < len(self._states) else ()
+            try:
+                with self.lease(exclude) as key:
+                    tried.append(key)
+                    result = fn(key)
+            except NoKeyAvailableError as e:
+                print(f"    ✗ {prefix}{e}")
+                return None
+            except GeminiStreamError as e:
+                # 프롬프트 차단/안전 종료는 키를 바꿔도 같은 결과
+                print(f"    ✗ {prefix}{e}")
+                return None
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else 0
+                if status in THROTTLE_STATUSES or status in SERVER_ERROR_STATUSES:
+                    if status in SERVER_ERROR_STATUSES:
+                        print(f"    ⚠ {prefix}서버 오류 ({status}), 다른 키로 재시도")
+                    continue
+                print(f"    ✗ {prefix}Gemini API 오류 ({status}): {e}")
+                if status in INVALID_KEY_STATUSES or status == BAD_REQUEST_STATUS:
+                    try:
+                        from modules.api_health import report_key_failure
+                        report_key_failure("GEMINI_API_KEY", "invalid", f"HTTP {status}: {e}")
+                    except Exception:
+                        pass
+                if status in INVALID_KEY_STATUSES:
+                    continue
+                return None
+            except Exception as e:
+                print(f"    ⚠ {prefix}호출 실패: {e}")
+                continue
+
+            if result or not retry_empty:
+                return result
+            print(f"    ⚠ {prefix}응답이 비어있습니다, 다른 키로 재시도")
+        return None
+
+
+_shared_pool: Optional[GeminiKeyPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_api_keys() -> List[str]:
+    """설정된 Gemini API 키 목록"""
+    keys = [GEMINI_API_KEY_1, GEMINI_API_KEY_2, GEMINI_API_KEY_3, GEMINI_API_KEY_4, GEMINI_API_KEY_5]
+    return [k for k in keys if k]
+
+
+def get_key_pool() -> GeminiKeyPool:
+    """프로세스 공용 키 풀 (첫 호출 시 저장된 상태 로드, 종료 시 자동 저장)"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = GeminiKeyPool(get_api_keys(), state_path=KEY_POOL_STATE_PATH)
+            atexit.register(_shared_pool.save)
+        return _shared_pool
@@ -0,0 +1,216 @@
+"""
+Gemini 스트리밍 호출 (streamGenerateContent, SSE)
+
+generateContent는 응답 전체가 완성될 때까지 블로킹하므로 전체 타임아웃(120~180초)이
+긴 사고(thinking) 실행을 끊거나, 죽은 연결을 늦게 감지한다. 스트리밍 경로는:
+- 타임아웃을 "마지막 청크 이후 무응답 시간"(idle) 기준으로 적용
+- 사고 요약(includeThoughts)도 수신하여 긴 사고 중에도 연결 생존을 확인
+- 차단(blockReason)/안전 종료(finishReason) 등 조기 실패를 즉시 감지
+- 응답 텍스트를 증분 JSON 파서에 흘려 테마 객체가 완성되는 즉시 콜백
+
+GEMINI_STREAM=off 이면 기존 generateContent 블로킹 호출을 사용한다.
+"""
+import json
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+GEMINI_MODEL_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash"
+# 블로킹 generateContent 엔드포인트 (LLM 캐시 키로도 사용)
+GEMINI_API_URL = f"{GEMINI_MODEL_URL}:generateContent"
+
+STREAM_ENABLED = os.getenv("GEMINI_STREAM", "on").lower() not in ("off", "0", "false")
+# 연결 수립 타임아웃 / 청크 간 무응답 허용 시간 (초)
+CONNECT_TIMEOUT_SEC = 15
+IDLE_TIMEOUT_SEC = int(os.getenv("GEMINI_IDLE_TIMEOUT_SEC", "90") or 90)
+# 블로킹 모드 전체 타임아웃 (GEMINI_STREAM=off)
+BLOCKING_TIMEOUT_SEC = 180
+
+# 정상 종료로 보지 않는 finishReason
+_FAILED_FINISH_REASONS = {"SAFETY", "RECITATION", "BLOCKLIST", "PROHIBITED_CONTENT", "SPII", "MALFORMED_FUNCTION_CALL"}
+
+
+class GeminiStreamError(Exception):
+    """응답 차단/비정상 종료 등 재시도해도 같은 결과가 예상되는 스트림 실패"""
+
+
+def sanitize_json(text: str) -> str:
+    """Gemini가 반환한 비표준 JSON 정리 (trailing comma, 주석 제거)"""
+    # 한 줄 주석 제거 (// ...)
+    text = re.sub(r'//[^\n]*', '', text)
+    # trailing comma 제거: ,} 또는 ,]
+    text = re.sub(r',\s*([}\]])', r'\1', text)
+    return text
+
+
+def _with_thought_summaries(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """사고 예산이 있는 요청은 사고 요약도 스트리밍하도록 설정 (idle 타임아웃 keepalive 역할)"""
+    config = payload.get("generationConfig") or {}
+    thinking = config.get("thinkingConfig")
+    if not thinking or thinking.get("thinkingBudget") == 0 or "includeThoughts" in thinking:
+        return payload
+    return {
+        **payload,
+        "generationConfig": {**config, "thinkingConfig": {**thinking, "includeThoughts": True}},
+    }
+
+
+def _iter_sse_events(resp: requests.Response) -> Iterable[Dict[str, Any]]:
+    """SSE 응답에서 data: JSON 이벤트 순회"""
+    data_lines: List[str] = []
+    for raw in resp.iter_lines(decode_unicode=True):
+        if raw is None:
+            continue
+        line = raw.rstrip("\r")
+        if not line:
+            if data_lines:
+                yield json.loads("\n".join(data_lines))
+                data_lines = []
+            continue
+        if line.startswith("data:"):
+            data_lines.append(line[5:].lstrip())
+    if data_lines:
+        yield json.loads("\n".join(data_lines))
+
+
+def _chunk_text(event: Dict[str, Any]) -> str:
+    """이벤트에서 본문 텍스트 추출 (사고 파트 제외) - 차단/비정상 종료 시 예외"""
+    block = (event.get("promptFeedback") or {}).get("blockReason")
+    if block:
+        raise GeminiStreamError(f"프롬프트 차단: {block}")
+    candidates = event.get("candidates") or []
+    if not candidates:
+        return ""
+    candidate = candidates[0]
+    finish = candidate.get("finishReason")
+    if finish in _FAILED_FINISH_REASONS:
+        raise GeminiStreamError(f"응답 비정상 종료: {finish}")
+    return "".join(
+        part.get("text", "")
+        for part in (candidate.get("content") or {}).get("parts", [])
+        if not part.get("thought")
+    )
+
+
+def generate_text(
+    api_key: str,
+    payload: Dict[str, Any],
+    on_text: Optional[Callable[[str], None]] = None,
+    idle_timeout: float = IDLE_TIMEOUT_SEC,
+) -> str:
+    """Gemini 호출 후 응답 본문 텍스트 반환 (사고 파트 제외)
+
+    Args:
+        api_key: Gemini API 키
+        payload: generateContent 요청 본문
+        on_text: 본문 텍스트 청크 수신 콜백 (증분 파서 연결용)
+        idle_timeout: 청크 간 최대 무응답 시간(초) - 초과 시 requests 예외
+
+    Raises:
+        requests.exceptions.HTTPError: HTTP 오류 (키 풀이 상태 코드로 처리)
+        GeminiStreamError: 프롬프트 차단/비정상 종료
+    """
+    if not STREAM_ENABLED:
+        resp = requests.post(
+            f"{GEMINI_API_URL}?key={api_key}", json=payload, timeout=BLOCKING_TIMEOUT_SEC,
+        )
+        resp.raise_for_status()
+        text = _chunk_text(resp.json())
+        if text and on_text:
+            on_text(text)
+        return text
+
+    # requests의 read 타임아웃은 소켓 읽기 단위로 적용되므로 곧 idle 타임아웃이 된다
+    resp = requests.post(
+        f"{GEMINI_MODEL_URL}:streamGenerateContent?alt=sse&key={api_key}",
+        json=_with_thought_summaries(payload),
+        stream=True,
+        timeout=(CONNECT_TIMEOUT_SEC, idle_timeout),
+    )
+    with resp:
+        resp.raise_for_status()
+        chunks: List[str] = []
+        for event in _iter_sse_events(resp):
+            text = _chunk_text(event)
+            if text:
+                chunks.append(text)
+                if on_text:
+                    on_text(text)
+    return "".join(chunks)
+
+
+class IncrementalJSONArrayParser:
+    """스트리밍 텍스트에서 지정한 키의 JSON 배열 원소(객체)를 완성되는 즉시 추출
+
+    예: keys=("themes",) 이면 '"themes": [ {...}, {...} ]'의 각 객체가 닫히는 시점에
+    on_item("themes", obj)를 호출한다. 코드 펜스나 앞뒤 설명 텍스트는 무시한다.
+    """
+
+    def __init__(self, keys: Iterable[str], on_item: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        self.keys = set(keys)
+        self.on_item = on_item
+        self.items: List[Tuple[str, Dict[str, Any]]] = []
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._last_string = ""
+        self._string_start = 0
+        self._pending_key: Optional[str] = None
+        self._array_key: Optional[str] = None
+        self._array_depth = 0
+        self._item_start: Optional[int] = None
+
+    def feed(self, text: str) -> None:
+        self._buf += text
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = buf[self._string_start:i]
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif ch == ":":
+                self._pending_key = self._last_string
+            elif ch in "{[":
+                self._depth += 1
+                if ch == "[" and self._array_key is None and self._pending_key in self.keys:
+                    self._array_key = self._pending_key
+                    self._array_depth = self._depth
+                elif ch == "{" and self._array_key and self._depth == self._array_depth + 1:
+                    self._item_start = i
+                self._pending_key = None
+            elif ch in "}]":
+                if ch == "}" and self._item_start is not None and self._depth == self._array_depth + 1:
+                    self._emit(buf[self._item_start:i + 1])
+                    self._item_start = None
+                elif ch == "]" and self._array_key and self._depth == self._array_depth:
+                    self._array_key = None
+                self._depth -= 1
+            elif ch == ",":
+                self._pending_key = None
+            i += 1
+        self._pos = i
+
+    def _emit(self, raw: str) -> None:
+        for candidate in (raw, sanitize_json(raw)):
+            try:
+                obj = json.loads(candidate)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(obj, dict):
+                self.items.append((self._array_key, obj))
+                if self.on_item:
+                    self.on_item(self._array_key, obj)
+            return
@@ -0,0 +1,174 @@
+"""
+지수 일봉 시계열 서비스 (KOSPI / KOSDAQ / KIS 업종지수)
+
+지수 일봉은 공용 price_store(.cache/prices.sqlite)에 종목과 같은 테이블로 저장하고
+KIS 업종 기간별 시세로 저장소에 없는 최신 구간만 보충한다. 이동평균/배열 상태/구간
+수익률을 같은 저장소에서 계산하므로 main.py(코스닥 지수 MA), 예측 컨텍스트(KOSPI/KOSDAQ
+MA), 백테스트(KOSPI 기준 수익률)가 하나의 지수 소스를 공유한다.
+
+- 지수 이름(INDEX_CODES) 또는 KIS 업종코드(예: "0028")로 지정
+- KOSPI/KOSDAQ은 "^KS11"/"^KQ11" 키, 그 외 업종은 "U:<업종코드>" 키로 저장
+- 지수 키는 저장소 기본 백엔드와 무관하게 KIS 백엔드로 보충하되, KIS 인증 정보가 없는
+  실행 환경(백테스트·예측 워크플로 등)에서는 yfinance ^KS11/^KQ11로 대체 (업종지수는 건너뜀)
+- refresh()는 첫 지수를 단독으로 보충해 토큰 발급을 한 번만 일으킨 뒤 나머지를 병렬 실행
+  (KISClient 공용 호출 간격 제한 적용)
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from modules.price_store import (
+    KIS_INDEX_PREFIX,
+    KOSDAQ_INDEX,
+    KOSPI_INDEX,
+    KISBackend,
+    PriceBackend,
+    PriceStore,
+    YFinanceBackend,
+    get_price_store,
+)
+from modules.utils import KST
+
+# KIS 업종코드 (업종 기간별 시세 FID_INPUT_ISCD)
+INDEX_CODES = {
+    "KOSPI": "0001",
+    "KOSDAQ": "1001",
+    "KOSPI200": "2001",
+}
+_STORE_CODES = {"0001": KOSPI_INDEX, "1001": KOSDAQ_INDEX}
+
+MA_PERIODS = (5, 10, 20, 60, 120)
+MIN_BARS = 60  # 이보다 적으면 배열 상태를 판정하지 않음
+INDEX_LOOKBACK_DAYS = 300  # MA120 계산에 필요한 달력일 (약 200거래일)
+
+
+def store_code(index: str) -> str:
+    """지수 이름/업종코드 → 가격 저장소 코드"""
+    kis_code = INDEX_CODES.get(index.upper(), index)
+    return _STORE_CODES.get(kis_code, f"{KIS_INDEX_PREFIX}{kis_code}")
+
+
+def moving_average_status(closes: List[float]) -> Optional[Dict[str, Any]]:
+    """최신순 종가 → 현재가, MA5/10/20/60/120, 배열 상태 (정배열/역배열/혼합)
+
+    MA120은 120일분이 없으면 0으로 두고 배열 판정에서 제외한다.
+    """
+    if len(closes) < MIN_BARS:
+        return None
+    current = closes[0]
+    mas = {p: (sum(closes[:p]) / p if len(closes) >= p else 0) for p in MA_PERIODS}
+    values = [current] + [mas[p] for p in MA_PERIODS if mas[p] > 0]
+    is_aligned = all(values[i] > values[i + 1] for i in range(len(values) - 1))
+    is_reversed = all(values[i] < values[i + 1] for i in range(len(values) - 1))
+    status = "정배열" if is_aligned else ("역배열" if is_reversed else "혼합")
+    result = {"current": round(current, 2)}
+    for p in MA_PERIODS:
+        result[f"ma{p}"] = round(mas[p], 2) if mas[p] > 0 else 0
+    result["status"] = status
+    return result
+
+
+class IndexSeries:
+    """지수 일봉 보충 + 이동평균/수익률 조회 (계산 결과는 refresh 전까지 메모)"""
+
+    def __init__(self, client=None, store: Optional[PriceStore] = None,
+                 lookback_days: int = INDEX_LOOKBACK_DAYS, max_workers: int = 3):
+        self.store = store or get_price_store()
+        self.backend: PriceBackend = KISBackend(client)
+        self.lookback_days = lookback_days
+        self.max_workers = max_workers
+        self._status: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def use_client(self, client) -> None:
+        """보충에 쓸 KISClient 지정 (미지정 상태로 먼저 만들어진 공용 인스턴스용)"""
+        if client is None:
+            return
+        with self._lock:
+            if not isinstance(self.backend, KISBackend):
+                self.backend = KISBackend(client)
+            elif self.backend._client is None:
+                self.backend._client = client
+
+    def _resolve_backend(self) -> PriceBackend:
+        """KISClient를 만들 수 없으면(인증 정보 없음) yfinance 백엔드로 전환"""
+        with self._lock:
+            if isinstance(self.backend, KISBackend):
+                try:
+                    self.backend.client
+                except ValueError as e:
+                    print(f"  ⚠ KIS 클라이언트 생성 불가 ({e}) → yfinance 지수(^KS11/^KQ11)로 대체")
+                    self.backend = YFinanceBackend()
+            return self.backend
+
+    def _window(self) -> tuple:
+        now = datetime.now(KST)
+        return (now - timedelta(days=self.lookback_days)).strftime("%Y-%m-%d"), now.strftime("%Y-%m-%d")
+
+    def refresh(self, indices: Iterable[str] = ("KOSPI", "KOSDAQ"),
+                start: Optional[str] = None, end: Optional[str] = None) -> None:
+        """지수별로 저장소에 없는 구간(보통 최근 1~2일)만 병렬 보충 (기본 구간: 최근 lookback_days)"""
+        codes = list(dict.fromkeys(store_code(i) for i in indices))
+        default_start, default_end = self._window()
+        start, end = start or default_start, end or default_end
+        backend = self._resolve_backend()
+        if isinstance(backend, KISBackend):
+            # 첫 호출이 토큰을 발급/로드하도록 단독 실행한 뒤 나머지를 병렬 보충
+            head, rest = codes[:1], codes[1:]
+            for code in head:
+                self.store.ensure([code], start, end, backend=backend)
+            if rest:
+                with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(rest)))) as executor:
+                    list(executor.map(lambda code: self.store.ensure([code], start, end, backend=backend), rest))
+        else:
+            skipped = [c for c in codes if c.startswith(KIS_INDEX_PREFIX)]
+            if skipped:
+                print(f"  ⚠ yfinance에 없는 업종지수 보충 생략: {', '.join(skipped)}")
+            targets = [c for c in codes if c not in skipped]
+            if targets:
+                self.store.ensure(targets, start, end, backend=backend)
+        with self._lock:
+            for code in codes:
+                self._status.pop(code, None)
+
+    def closes(self, index: str, start: Optional[str] = None, end: Optional[str] = None) -> List[float]:
+        """종가 목록 (최신순)"""
+        code = store_code(index)
+        default_start, default_end = self._window()
+        frame = self.store.frame([code], start or default_start, end or default_end)
+        if frame.empty or code not in frame:
+            return []
+        return [float(v) for v in frame[code].dropna().iloc[::-1]]
+
+    def ma_status(self, index: str) -> Optional[Dict[str, Any]]:
+        """현재가 + 이동평균 + 배열 상태 (데이터가 MIN_BARS 미만이면 None)"""
+        code = store_code(index)
+        with self._lock:
+            if code in self._status:
+                return self._status[code]
+        status = moving_average_status(self.closes(index))
+        with self._lock:
+            self._status[code] = status
+        return status
+
+    def returns(self, indices: Iterable[str], start: str, end: str) -> Dict[str, float]:
+        """구간 첫 종가 대비 마지막 종가 수익률(%) - {지수 이름/코드: 수익률}"""
+        indices = list(indices)
+        series = self.store.returns([store_code(i) for i in indices], start, end)
+        return {i: float(series[store_code(i)]) for i in indices if store_code(i) in series}
+
+
+_shared_series: Optional[IndexSeries] = None
+_shared_series_lock = threading.Lock()
+
+
+def get_index_series(client=None) -> IndexSeries:
+    """프로세스 공용 지수 시계열 서비스 (client 미지정 시 보충할 때 KISClient 생성)"""
+    global _shared_series
+    with _shared_series_lock:
+        if _shared_series is None:
+            _shared_series = IndexSeries(client)
+        else:
+            _shared_series.use_client(client)
+        return _shared_series
@@ -0,0 +1,185 @@
+"""
+장중 증분 재예측용 변화 감지
+
+아침 예측 시점의 시장 스냅샷(거래대금 상위 종목, 수급 방향, 섹터 로테이션 국면)을
+theme-forecast.json의 "intraday_baseline"에 저장해 두고, 장중 재예측 때 현재
+스냅샷과 비교하여 달라진 부분만 추린다. 변화가 없으면 LLM 호출을 건너뛰고,
+변화가 있으면 변화분 + 아침 예측 요약만 작은 프롬프트로 보내 테마 단위로 패치한다.
+"""
+from typing import Any, Dict, List, Optional
+
+from modules.theme_registry import get_theme_registry
+
+# 스냅샷에 포함할 시장별 거래대금 상위 종목 수
+BASELINE_TV_TOP = 10
+# 순위 변동으로 보고할 최소 순위 차이
+RANK_SHIFT_MIN = 3
+
+# 변화 유형 표시명
+DELTA_LABELS = {
+    "new_leaders": "신규 진입",
+    "dropped_leaders": "이탈",
+    "rank_shifts": "순위 급변",
+    "investor_flips": "수급 전환",
+    "phase_changes": "국면 변화",
+}
+
+
+def _sign(value: Optional[float]) -> int:
+    if not value:
+        return 0
+    return 1 if value > 0 else -1
+
+
+def build_snapshot(
+    latest_data: Dict[str, Any],
+    rotation_data: Optional[List[Dict]] = None,
+    leader_codes: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """변화 비교용 시장 스냅샷
+
+    Args:
+        latest_data: latest.json 데이터
+        rotation_data: 섹터 로테이션 분석 결과
+        leader_codes: 수급 방향을 추적할 추가 종목 (아침 예측 대장주)
+    """
+    tv_top: Dict[str, Dict[str, Any]] = {}
+    for market, label in (("kospi", "코스피"), ("kosdaq", "코스닥")):
+        stocks = (latest_data.get("trading_value") or {}).get(market, [])[:BASELINE_TV_TOP]
+        for rank, s in enumerate(stocks, 1):
+            code = s.get("code")
+            if code:
+                tv_top[code] = {"name": s.get("name", code), "market": label, "rank": rank}
+
+    investor_data = latest_data.get("investor_data") or {}
+    investor: Dict[str, Dict[str, int]] = {}
+    for code in list(tv_top) + list(leader_codes or []):
+        inv = investor_data.get(code)
+        if inv:
+            investor[code] = {
+                "foreign": _sign(inv.get("foreign_net")),
+                "institution": _sign(inv.get("institution_net")),
+            }
+
+    rotation = {r["theme_name"]: r.get("phase", "") for r in (rotation_data or []) if r.get("theme_name")}
+
+    return {
+        "collected_at": latest_data.get("timestamp", ""),
+        "tv_top": tv_top,
+        "investor": investor,
+        "rotation": rotation,
+    }
+
+
+def forecast_leader_codes(themes: List[Dict[str, Any]]) -> List[str]:
+    """예측 테마 목록의 대장주 종목코드"""
+    return [s.get("code") for t in themes for s in t.get("leader_stocks", []) if s.get("code")]
+
+
+def diff_snapshots(baseline: Dict[str, Any], current: Dict[str, Any], names: Optional[Dict[str, str]] = None) -> Dict[str, List]:
+    """아침 스냅샷 대비 변화분
+
+    Returns:
+        {"new_leaders", "dropped_leaders", "rank_shifts", "investor_flips", "phase_changes"}
+    """
+    names = dict(names or {})
+    base_top = baseline.get("tv_top") or {}
+    cur_top = current.get("tv_top") or {}
+    for top in (base_top, cur_top):
+        for code, info in top.items():
+            names.setdefault(code, info.get("name", code))
+
+    new_leaders = [{"code": c, **cur_top[c]} for c in cur_top if c not in base_top]
+    dropped = [{"code": c, **base_top[c]} for c in base_top if c not in cur_top]
+    rank_shifts = [
+        {"code": c, "name": cur_top[c]["name"], "market": cur_top[c]["market"],
+         "from": base_top[c]["rank"], "to": cur_top[c]["rank"]}
+        for c in cur_top
+        if c in base_top and abs(cur_top[c]["rank"] - base_top[c]["rank"]) >= RANK_SHIFT_MIN
+    ]
+
+    flips = []
+    base_inv = baseline.get("investor") or {}
+    for code, cur in (current.get("investor") or {}).items():
+        before = base_inv.get(code)
+        if not before:
+            continue
+        for who, label in (("foreign", "외국인"), ("institution", "기관")):
+            if before.get(who, 0) != cur.get(who, 0) and cur.get(who, 0) != 0:
+                flips.append({"code": code, "name": names.get(code, code), "investor": label,
+                              "from": before.get(who, 0), "to": cur.get(who, 0)})
+
+    base_rot = baseline.get("rotation") or {}
+    phase_changes = [
+        {"theme_name": name, "from": base_rot.get(name, "없음"), "to": phase}
+        for name, phase in (current.get("rotation") or {}).items()
+        if base_rot.get(name) != phase
+    ]
+
+    return {
+        "new_leaders": new_leaders,
+        "dropped_leaders": dropped,
+        "rank_shifts": rank_shifts,
+        "investor_flips": flips,
+        "phase_changes": phase_changes,
+    }
+
+
+def has_changes(delta: Dict[str, List]) -> bool:
+    return any(delta.values())
+
+
+def format_delta(delta: Dict[str, List]) -> str:
+    """프롬프트용 변화분 텍스트"""
+    def _dir(sign: int) -> str:
+        return {1: "순매수", -1: "순매도"}.get(sign, "중립")
+
+    lines = []
+    if delta.get("new_leaders"):
+        lines.append("## 거래대금 상위 신규 진입")
+        lines.extend(f"- {s['name']}({s['code']}) {s['market']} {s['rank']}위" for s in delta["new_leaders"])
+    if delta.get("dropped_leaders"):
+        lines.append("## 거래대금 상위 이탈")
+        lines.extend(f"- {s['name']}({s['code']}) {s['market']} (아침 {s['rank']}위)" for s in delta["dropped_leaders"])
+    if delta.get("rank_shifts"):
+        lines.append("## 거래대금 순위 급변")
+        lines.extend(f"- {s['name']}({s['code']}) {s['market']} {s['from']}위 → {s['to']}위" for s in delta["rank_shifts"])
+    if delta.get("investor_flips"):
+        lines.append("## 수급 방향 전환")
+        lines.extend(
+            f"- {f['name']}({f['code']}) {f['investor']} {_dir(f['from'])} → {_dir(f['to'])}"
+            for f in delta["investor_flips"]
+        )
+    if delta.get("phase_changes"):
+        lines.append("## 섹터 로테이션 국면 변화")
+        lines.extend(f"- {p['theme_name']}: {p['from']} → {p['to']}" for p in delta["phase_changes"])
+    return "\n".join(lines)
+
+
+def apply_patch(themes: List[Dict[str, Any]], patch: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """아침 today 테마 목록에 LLM 패치 적용 (언급되지 않은 테마는 그대로 유지)
+
+    테마명 표기가 조금 달라도 테마 레지스트리 ID로 매칭한다.
+
+    patch 형식:
+        {"updates": [{"theme_name", "action": "keep|update|drop", 변경할 필드...}],
+         "new_themes": [테마 객체, ...]}
+    """
+    registry = get_theme_registry()
+    updates = {registry.intern(u["theme_name"]): u for u in patch.get("updates", []) if u.get("theme_name")}
+    patched = []
+    for theme in themes:
+        update = updates.get(registry.intern(theme.get("theme_name", "")))
+        if not update or update.get("action", "keep") == "keep":
+            patched.append(theme)
+            continue
+        if update.get("action") == "drop":
+            continue
+        fields = {k: v for k, v in update.items() if k not in ("theme_name", "action") and v not in (None, "", [])}
+        patched.append({**theme, **fields})
+
+    existing = {registry.intern(t.get("theme_name", "")) for t in patched}
+    for theme in patch.get("new_themes", []):
+        if theme.get("theme_name") and registry.intern(theme["theme_name"]) not in existing:
+            patched.append(theme)
+    return patched
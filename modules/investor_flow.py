@@ -0,0 +1,140 @@
+"""
+수급(외국인/기관 순매수) 수집기
+
+장중에는 국내기관·외국인 매매종목 가집계(FHPTJ04400000)를 시장 × 투자자 × 순매수/순매도
+상위 조합으로 몇 번만 호출해 시장 전체 순위에서 종목별 값을 채우고, 순위에 없는 종목만
+종목별 추정 API(HHPTJ04160200)로 보충한다. 두 API 모두 같은 장중 가집계 입력을 누계한
+값이라 섞어 써도 기준이 같다.
+
+장 마감 후 확정치(FHKST01010900)는 시장 전체 순위 API가 없어 종목별로 조회한다.
+
+- 종목별 조회는 ThreadPoolExecutor로 병렬 실행 (KISClient 공용 호출 간격 제한 적용)
+- 순위 적중/종목별 보충 건수는 run_profile 카운터(investor_flow.bulk/fallback)로 기록
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from modules.run_profile import get_run_profile
+from modules.utils import safe_int
+
+INVESTOR_RANK_MARKETS = ("0001", "1001")  # 코스피, 코스닥
+INVESTOR_RANK_INVESTORS = ("1", "2")      # 외국인, 기관계
+INVESTOR_RANK_SORTS = ("0", "1")          # 순매수 상위, 순매도 상위
+INVESTOR_WORKERS = 4
+
+
+def _flow(name: str, foreign_net, institution_net, individual_net=None) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "foreign_net": safe_int(foreign_net),
+        "institution_net": safe_int(institution_net),
+        "individual_net": None if individual_net is None else safe_int(individual_net),
+    }
+
+
+class InvestorFlowCollector:
+    """시장 전체 가집계 순위 → 종목별 보충 순서로 수급 데이터 수집"""
+
+    def __init__(self, client, max_workers: int = INVESTOR_WORKERS):
+        self.client = client
+        self.max_workers = max_workers
+
+    # ── 시장 전체 순위 (장중 가집계) ──
+
+    def fetch_rankings(self) -> Dict[str, Dict[str, Any]]:
+        """가집계 순위 전체 → {code: 순위 행} (여러 순위에 나온 종목은 같은 값이므로 첫 행 사용)"""
+        jobs = [
+            (market, investor, sort)
+            for market in INVESTOR_RANK_MARKETS
+            for investor in INVESTOR_RANK_INVESTORS
+            for sort in INVESTOR_RANK_SORTS
+        ]
+
+        def work(job: Tuple[str, str, str]) -> List[Dict[str, Any]]:
+            try:
+                resp = self.client.get_foreign_institution_total(*job)
+            except Exception as e:
+                print(f"  ⚠ 가집계 순위 조회 실패 {job}: {e}")
+                return []
+            if resp.get("rt_cd") != "0":
+                return []
+            return resp.get("output", []) or []
+
+        rows: Dict[str, Dict[str, Any]] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for items in executor.map(work, jobs):
+                for item in items:
+                    code = item.get("mksc_shrn_iscd", "")
+                    if code and code not in rows:
+                        rows[code] = item
+        return rows
+
+    # ── 종목별 조회 ──
+
+    def _fetch_estimate(self, code: str, name: str) -> Optional[Dict[str, Any]]:
+        resp = self.client.get_investor_trend_estimate(code)
+        if resp.get("rt_cd") != "0":
+            return None
+        output2 = resp.get("output2", [])
+        if not output2:
+            return None
+        # bsop_hour_gb가 가장 큰(최신) 행
+        latest = max(output2, key=lambda x: x.get("bsop_hour_gb", ""))
+        return _flow(name, latest.get("frgn_fake_ntby_qty", 0), latest.get("orgn_fake_ntby_qty", 0))
+
+    def _fetch_confirmed(self, code: str, name: str) -> Optional[Dict[str, Any]]:
+        resp = self.client.get_stock_investor(code)
+        if resp.get("rt_cd") != "0":
+            return None
+        output = resp.get("output", [])
+        if not output:
+            return None
+        today = output[0]  # 당일 데이터 (첫 번째 항목)
+        return _flow(name, today.get("frgn_ntby_qty", 0), today.get("orgn_ntby_qty", 0),
+                     today.get("prsn_ntby_qty", 0))
+
+    def _fetch_each(self, targets: List[Tuple[str, str]], estimated: bool) -> Dict[str, Dict[str, Any]]:
+        fetch = self._fetch_estimate if estimated else self._fetch_confirmed
+        label = "추정 수급" if estimated else "투자자 데이터"
+
+        def work(target: Tuple[str, str]) -> Tuple[str, Optional[Dict[str, Any]]]:
+            code, name = target
+            try:
+                return code, fetch(code, name)
+            except Exception as e:
+                print(f"  ⚠ {name}({code}) {label} 조회 실패: {e}")
+                return code, None
+
+        result = {}
+        if targets:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for code, flow in executor.map(work, targets):
+                    if flow:
+                        result[code] = flow
+        return result
+
+    # ── 수집 ──
+
+    def collect(self, stocks: Iterable[Dict], estimated: bool) -> Dict[str, Dict[str, Any]]:
+        """{종목코드: {"name", "foreign_net", "institution_net", "individual_net"}}
+
+        estimated=True(장중)면 가집계 순위를 먼저 쓰고 빠진 종목만 종목별 추정 API로 보충,
+        False면 종목별 확정 API로 조회 (개인 순매수 포함)
+        """
+        targets = list({s.get("code", ""): s.get("name", "") for s in stocks if s.get("code")}.items())
+        result: Dict[str, Dict[str, Any]] = {}
+        if estimated:
+            rankings = self.fetch_rankings()
+            for code, name in targets:
+                row = rankings.get(code)
+                if row is not None:
+                    result[code] = _flow(name, row.get("frgn_ntby_qty", 0), row.get("orgn_ntby_qty", 0))
+            missing = [(code, name) for code, name in targets if code not in result]
+            profile = get_run_profile()
+            profile.count("investor_flow.bulk", len(result))
+            profile.count("investor_flow.fallback", len(missing))
+            print(f"  ✓ 가집계 순위: {len(rankings)}종목 중 {len(result)}종목 적중, {len(missing)}종목 개별 조회")
+        else:
+            missing = targets
+        result.update(self._fetch_each(missing, estimated))
+        return result
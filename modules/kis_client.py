@@ -8,6 +8,8 @@
 - 토큰은 24시간 유효하므로, 캐시된 토큰을 최대한 재사용합니다.
 - 토큰이 만료되어도 먼저 사용을 시도하고, 실패 시에만 재발급합니다.
 - 로컬과 GitHub Actions 간 토큰 공유를 위해 Supabase를 사용합니다.
+- 같은 실행 안에서 단계별로 반복되는 시세 GET 요청(같은 tr_id + 파라미터)은
+  응답을 재사용합니다 (KIS_QUOTE_CACHE_TTL_SEC, 적중/미스는 run_profile 카운터).
 """
 import json
 import time
@@ -15,7 +17,7 @@ import threading
 import requests
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 import sys
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -24,8 +26,12 @@ from config.settings import (
     KIS_APP_KEY,
     KIS_APP_SECRET,
     KIS_BASE_URL,
+    KIS_LIVE_BASE_URL,
+    KIS_QUOTE_CACHE_TTL_SEC,
     ROOT_DIR,
 )
+from modules.kis_recorder import get_kis_recorder
+from modules.run_profile import get_run_profile
 from modules.supabase_client import (
     get_kis_credentials_from_supabase,
     get_kis_token_from_supabase,
@@ -57,9 +63,12 @@ class KISClient:
         # Supabase에서 KIS API 키 조회 시도, 없으면 환경변수 사용
         self._load_credentials()
         self.base_url = KIS_BASE_URL
+        # 로컬 대역 서버(KIS_BASE_URL 재지정) 사용 시 실제 토큰 캐시/Supabase를 건드리지 않음
+        self.standin = self.base_url != KIS_LIVE_BASE_URL
+        self._recorder = get_kis_recorder()
 
         # 토큰 캐시 파일 경로
-        self._token_cache_path = ROOT_DIR / ".kis_token_cache.json"
+        self._token_cache_path = ROOT_DIR / (".kis_token_cache.standin.json" if self.standin else ".kis_token_cache.json")
         self._access_token: Optional[str] = None
         self._token_expires_at: Optional[datetime] = None
         self._token_issued_at: Optional[datetime] = None
@@ -69,6 +78,12 @@ class KISClient:
         self._last_request_time = 0.0
         self._min_interval = 0.05  # 1/20 = 50ms
 
+        # 시세 응답 캐시: (tr_id, 정규화 파라미터) → (저장 시각, 응답)
+        # TTL None이면 클라이언트 수명 동안 유지, 0이면 사용 안 함
+        self._quote_cache_ttl: Optional[float] = float(KIS_QUOTE_CACHE_TTL_SEC) if KIS_QUOTE_CACHE_TTL_SEC else None
+        self._quote_cache: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+        self._quote_cache_lock = threading.Lock()
+
         self._validate_credentials()
         self._load_cached_token()
 
@@ -95,6 +110,10 @@ class KISClient:
 
     def _load_cached_token(self) -> bool:
         """캐시된 토큰 로드 (Supabase 우선, 로컬 파일 폴백)"""
+        if self.standin:
+            print(f"[KIS] 로컬 대역 서버 사용: {self.base_url}")
+            return self._load_token_from_file()
+
         # 1. Supabase에서 토큰 로드 시도
         if self._load_token_from_supabase():
             return True
@@ -183,8 +202,9 @@ class KISClient:
 
     def _save_token_cache(self):
         """토큰 캐시 저장 (Supabase + 로컬 파일)"""
-        # 1. Supabase에 저장 (다른 환경과 공유)
-        self._save_token_to_supabase()
+        # 1. Supabase에 저장 (다른 환경과 공유, 대역 서버 토큰은 제외)
+        if not self.standin:
+            self._save_token_to_supabase()
 
         # 2. 로컬 파일에도 저장 (오프라인 폴백)
         self._save_token_to_file()
@@ -373,6 +393,26 @@ class KISClient:
             "custtype": "P",  # 개인
         }
 
+    def _quote_cache_key(self, method: str, tr_id: str, params: Optional[Dict[str, Any]], tr_cont: str) -> Optional[Tuple]:
+        """캐시 대상(연속조회가 아닌 GET)이면 키 반환 - 파라미터 이름 대소문자/값 타입 차이는 무시"""
+        if self._quote_cache_ttl == 0 or method.upper() != "GET" or tr_cont:
+            return None
+        return (tr_id, tuple(sorted((str(k).lower(), str(v)) for k, v in (params or {}).items())))
+
+    def _quote_cache_get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        with self._quote_cache_lock:
+            entry = self._quote_cache.get(key)
+            if entry is not None and self._quote_cache_ttl is not None \
+                    and time.monotonic() - entry[0] > self._quote_cache_ttl:
+                del self._quote_cache[key]
+                entry = None
+        get_run_profile().count("kis_quote_cache.hit" if entry else "kis_quote_cache.miss")
+        return entry[1] if entry else None
+
+    def clear_quote_cache(self) -> None:
+        with self._quote_cache_lock:
+            self._quote_cache.clear()
+
     def request(
         self,
         method: str,
@@ -386,7 +426,14 @@ class KISClient:
         """API 요청 실행
 
         토큰 만료로 401 에러 발생 시 자동으로 토큰 재발급 후 재시도합니다.
+        성공(rt_cd "0")한 시세 GET 응답은 캐시되어 같은 요청에 그대로 반환됩니다 (읽기 전용으로 사용).
         """
+        cache_key = self._quote_cache_key(method, tr_id, params, tr_cont)
+        if cache_key is not None and _retry:
+            cached = self._quote_cache_get(cache_key)
+            if cached is not None:
+                return cached
+
         # Rate limiting 적용 (초당 최대 20건)
         with self._rate_lock:
             now = time.time()
@@ -399,6 +446,7 @@ class KISClient:
         headers = self._get_headers(tr_id, tr_cont)
 
         try:
+            started = time.perf_counter()
             if method.upper() == "GET":
                 response = requests.get(url, headers=headers, params=params, timeout=30)
             else:
@@ -413,6 +461,11 @@ class KISClient:
 
             response.raise_for_status()
             data = response.json()
+            if self._recorder:
+                self._recorder.record(
+                    method, path, tr_id, params if method.upper() == "GET" else body, data,
+                    status=response.status_code, elapsed_ms=(time.perf_counter() - started) * 1000, tr_cont=tr_cont,
+                )
 
             # 응답 본문에서 토큰 만료 확인 (HTTP 200이지만 rt_cd가 실패인 경우)
             if _retry and data.get("rt_cd") != "0":
@@ -422,6 +475,9 @@ class KISClient:
                     self._refresh_token()
                     return self.request(method, path, tr_id, params, body, tr_cont, _retry=False)
 
+            if cache_key is not None and data.get("rt_cd") == "0":
+                with self._quote_cache_lock:
+                    self._quote_cache[cache_key] = (time.monotonic(), data)
             return data
 
         except requests.exceptions.HTTPError as e:
@@ -496,6 +552,31 @@ class KISClient:
         params = {"MKSC_SHRN_ISCD": stock_code}
         return self.request("GET", path, tr_id, params=params)
 
+    def get_foreign_institution_total(
+        self,
+        market_code: str = "0000",
+        investor: str = "0",
+        sort: str = "0",
+    ) -> Dict[str, Any]:
+        """국내기관·외국인 매매종목 가집계 (시장 전체 순매수/순매도 상위)
+
+        Args:
+            market_code: 0000 전체, 0001 코스피, 1001 코스닥
+            investor: 0 전체, 1 외국인, 2 기관계, 3 기타
+            sort: 0 순매수 상위, 1 순매도 상위
+        """
+        path = "/uapi/domestic-stock/v1/quotations/foreign-institution-total"
+        tr_id = "FHPTJ04400000"
+        params = {
+            "FID_COND_MRKT_DIV_CODE": "V",
+            "FID_COND_SCR_DIV_CODE": "16449",
+            "FID_INPUT_ISCD": market_code,
+            "FID_DIV_CLS_CODE": "0",  # 수량 기준
+            "FID_RANK_SORT_CLS_CODE": sort,
+            "FID_ETC_CLS_CODE": investor,
+        }
+        return self.request("GET", path, tr_id, params=params)
+
     def get_stock_daily_price(
         self,
         stock_code: str,
@@ -7,12 +7,16 @@
 from typing import Dict, Any, List, Tuple
 from datetime import datetime
 
+from modules.investor_flow import InvestorFlowCollector
 from modules.kis_client import KISClient
 from modules.market_hours import is_market_hours
-
-
+from modules.security_master import get_security_master
+from modules.stock_record import StockRecord, ranked
 from modules.utils import safe_int, safe_float
 
+# _collect_extended_stocks sort_field(KIS 원본 필드) → StockRecord 속성
+_SORT_ATTRS = {"acml_vol": "volume", "acml_tr_pbmn": "trading_value"}
+
 
 class KISRankAPI:
     """순위분석 API"""
@@ -23,70 +27,66 @@ class KISRankAPI:
             client: KIS 클라이언트 (없으면 새로 생성)
         """
         self.client = client or KISClient()
-        # blng_cls_code별 _collect_extended_stocks 결과 캐시
+        # blng_cls_code별 _collect_extended_stocks 결과 캐시 (파싱된 레코드)
         # 동일 blng_cls_code는 시장 무관하게 같은 데이터를 반환하므로 1회만 호출
-        self._extended_stocks_cache: Dict[str, List[Dict[str, Any]]] = {}
-
-    def _determine_market(self, code: str) -> str:
-        """종목코드로 시장 구분
-
-        한국거래소 종목코드 규칙:
-        - KOSPI: 주로 0~2로 시작하는 6자리 (예: 005930 삼성전자)
-        - KOSDAQ: 주로 3~4로 시작하는 6자리 (예: 373220 LG에너지솔루션은 예외)
-        - ETN: Q로 시작 (예: Q530036)
-        - ETF: 6자리, 1~2로 시작 (예: 114800 KODEX인버스)
-
-        Note: 완벽하지 않으므로 참고용으로만 사용
-        """
-        if not code:
-            return "UNKNOWN"
-
-        # ETN은 Q로 시작
-        if code.startswith("Q"):
-            return "ETN"
-
-        # 6자리 숫자인 경우
-        if len(code) == 6 and code.isdigit():
-            first_digit = code[0]
-            # 3, 4로 시작하면 대체로 KOSDAQ
-            if first_digit in ("3", "4"):
-                return "KOSDAQ"
-            # 나머지는 KOSPI (ETF 포함)
-            return "KOSPI"
-
-        return "UNKNOWN"
-
-    def _is_etf_or_etn(self, code: str, name: str) -> bool:
-        """ETF/ETN 여부 판단
+        self._extended_stocks_cache: Dict[str, List[StockRecord]] = {}
+        # 시장/ETF 분류는 종목 마스터 O(1) 조회 (미등록 코드만 코드 규칙 추정)
+        # 장기 실행 프로세스(API 서버)에서 날짜가 바뀌었으면 다시 받음 (오늘 받았으면 no-op)
+        self.master = get_security_master()
+        self.master.refresh()
+        # 수급: 장중 가집계 순위 일괄 조회 + 종목별 보충
+        self.investor_flow = InvestorFlowCollector(self.client)
+
+    def _to_record(self, stock: Dict[str, Any], code_field: str = "mksc_shrn_iscd") -> StockRecord:
+        """API 원본 행 → StockRecord (rank는 조회 결과마다 ranked() 뷰로 부여)"""
+        code = stock.get(code_field, "")
+        name = stock.get("hts_kor_isnm", "")
+        market, is_etf = self.master.classify(code, name)
+        return StockRecord(
+            code=code,
+            name=name,
+            current_price=safe_int(stock.get("stck_prpr", 0)),
+            change_rate=safe_float(stock.get("prdy_ctrt", 0)),
+            change_price=safe_int(stock.get("prdy_vrss", 0)),
+            volume=safe_int(stock.get("acml_vol", 0)),
+            volume_rate=safe_float(stock.get("vol_inrt", 0)),
+            trading_value=safe_int(stock.get("acml_tr_pbmn", 0)),
+            market=market,
+            is_etf=is_etf,
+        )
 
-        Args:
-            code: 종목코드
-            name: 종목명
+    def _to_fluctuation_record(self, stock: Dict[str, Any]) -> StockRecord:
+        """등락률순위 전용 API 원본 행 → StockRecord (방향/연속 상승·하락일 포함)
 
-        Returns:
-            ETF/ETN이면 True
+        전용 API는 stck_shrn_iscd 필드 사용 (거래량 API는 mksc_shrn_iscd)
         """
-        # ETN은 Q로 시작
-        if code.startswith("Q"):
-            return True
-
-        # 종목명에 ETF 운용사 키워드 포함
-        etf_keywords = [
-            "KODEX", "TIGER", "KBSTAR", "ARIRANG", "HANARO",
-            "SOL", "KINDEX", "KOSEF", "ACE", "PLUS", "RISE",
-            "ETN", "ETF", "선물", "인버스", "레버리지",
-            "채권", "국채", "회사채", "액티브",
-        ]
-        for keyword in etf_keywords:
-            if keyword in name:
-                return True
+        record = self._to_record(stock, code_field="stck_shrn_iscd")
+        record["direction"] = "UP" if record.change_rate > 0 else "DOWN"
+        record["consecutive_up_days"] = safe_int(stock.get("stck_up_days", 0))
+        record["consecutive_down_days"] = safe_int(stock.get("stck_down_days", 0))
+        return record
 
-        # 특수 코드 형태 (0000XX 등)
-        if code.startswith("0000") or code.startswith("00"):
-            if not code[2:].isdigit():  # 0000D0 같은 형태
-                return True
-
-        return False
+    def _select(
+        self,
+        records: List[StockRecord],
+        market: str,
+        limit: int,
+        exclude_etf: bool,
+    ) -> List[Any]:
+        """ETF/ETN·시장 필터 후 상위 limit개를 순위 뷰로 반환 (레코드 복사 없음)"""
+        market_upper = market.upper()
+        selected = []
+        for record in records:
+            # ETF/ETN 제외 필터
+            if exclude_etf and record.is_etf:
+                continue
+            # 시장 필터링
+            if market_upper in ("KOSPI", "KOSDAQ") and record.market != market_upper:
+                continue
+            selected.append(ranked(record, len(selected) + 1))
+            if len(selected) >= limit:
+                break
+        return selected
 
     def _fetch_volume_rank_raw(
         self,
@@ -137,7 +137,7 @@ class KISRankAPI:
         self,
         blng_cls_code: str = "0",
         sort_field: str = "acml_vol",
-    ) -> List[Dict[str, Any]]:
+    ) -> List[StockRecord]:
         """가격대별 분할 조회로 확장된 종목 수집 (캐시 적용)
 
         KIS API는 1회 최대 30개만 반환하므로,
@@ -149,15 +149,15 @@ class KISRankAPI:
             sort_field: 정렬 기준 필드 ("acml_vol": 거래량, "acml_tr_pbmn": 거래대금)
 
         Returns:
-            중복 제거된 전체 종목 리스트 (sort_field 기준 정렬)
+            중복 제거된 전체 종목 레코드 리스트 (sort_field 기준 정렬)
         """
+        sort_attr = _SORT_ATTRS[sort_field]
+
         # 캐시 히트: 동일 blng_cls_code 데이터 재사용
         if blng_cls_code in self._extended_stocks_cache:
             cached = self._extended_stocks_cache[blng_cls_code]
-            # sort_field만 다를 수 있으므로 복사 후 재정렬
-            result = list(cached)
-            result.sort(key=lambda x: safe_int(x.get(sort_field, 0)), reverse=True)
-            return result
+            # sort_field만 다를 수 있으므로 리스트만 복사 후 재정렬 (레코드는 공유)
+            return sorted(cached, key=lambda x: getattr(x, sort_attr), reverse=True)
 
         # 세분화된 가격대 (15개 구간 → 최대 450개 종목 수집 가능)
         price_ranges = [
@@ -187,12 +187,12 @@ class KISRankAPI:
                 code = stock.get("mksc_shrn_iscd", "")
                 if code and code not in seen_codes:
                     seen_codes.add(code)
-                    all_stocks.append(stock)
+                    all_stocks.append(self._to_record(stock))
 
-        # 캐시 저장 (정렬 전 원본)
+        # 캐시 저장 (정렬 전 순서)
         self._extended_stocks_cache[blng_cls_code] = list(all_stocks)
 
-        all_stocks.sort(key=lambda x: safe_int(x.get(sort_field, 0)), reverse=True)
+        all_stocks.sort(key=lambda x: getattr(x, sort_attr), reverse=True)
 
         return all_stocks
 
@@ -219,48 +219,12 @@ class KISRankAPI:
         """
         # ETF 제외 시 확장 조회 사용 (더 많은 종목 필요)
         if extended and exclude_etf:
-            stocks = self._collect_extended_stocks()
+            records = self._collect_extended_stocks()
         else:
-            stocks = self._fetch_volume_rank_raw()
+            records = [self._to_record(stock) for stock in self._fetch_volume_rank_raw()]
 
-        # 결과 정리 및 필터링
-        parsed = []
-        for stock in stocks:
-            code = stock.get("mksc_shrn_iscd", "")
-            name = stock.get("hts_kor_isnm", "")
-            stock_market = self._determine_market(code)
-            is_etf = self._is_etf_or_etn(code, name)
-
-            # ETF/ETN 제외 필터
-            if exclude_etf and is_etf:
-                continue
-
-            # 시장 필터링
-            market_upper = market.upper()
-            if market_upper != "ALL":
-                if market_upper == "KOSPI" and stock_market not in ("KOSPI",):
-                    continue
-                if market_upper == "KOSDAQ" and stock_market != "KOSDAQ":
-                    continue
-
-            parsed.append({
-                "rank": len(parsed) + 1,
-                "code": code,
-                "name": name,
-                "current_price": safe_int(stock.get("stck_prpr", 0)),
-                "change_rate": safe_float(stock.get("prdy_ctrt", 0)),
-                "change_price": safe_int(stock.get("prdy_vrss", 0)),
-                "volume": safe_int(stock.get("acml_vol", 0)),
-                "volume_rate": safe_float(stock.get("vol_inrt", 0)),
-                "trading_value": safe_int(stock.get("acml_tr_pbmn", 0)),
-                "market": stock_market,
-                "is_etf": is_etf,
-            })
-
-            if len(parsed) >= limit:
-                break
-
-        return parsed
+        # 결과 필터링 + 순위 부여
+        return self._select(records, market, limit, exclude_etf)
 
     def get_fluctuation_rank(
         self,
@@ -302,15 +266,9 @@ class KISRankAPI:
             # 음수 등락률만 필터링
             sorted_data = [s for s in sorted_data if s["change_rate"] < 0]
 
-        # 순위 재계산 및 방향 추가
-        result = []
-        for idx, stock in enumerate(sorted_data[:limit]):
-            stock_copy = stock.copy()
-            stock_copy["rank"] = idx + 1
-            stock_copy["direction"] = direction.upper()
-            result.append(stock_copy)
-
-        return result
+        # 순위 재계산 및 방향 추가 (레코드 복사 없이 뷰로)
+        direction_upper = direction.upper()
+        return [ranked(stock, idx + 1, direction_upper) for idx, stock in enumerate(sorted_data[:limit])]
 
     def get_top30_by_volume(
         self,
@@ -386,47 +344,13 @@ class KISRankAPI:
             거래대금 순위 종목 리스트 (get_volume_rank()와 동일한 출력 구조)
         """
         if extended and exclude_etf:
-            stocks = self._collect_extended_stocks(
+            records = self._collect_extended_stocks(
                 blng_cls_code="3", sort_field="acml_tr_pbmn"
             )
         else:
-            stocks = self._fetch_volume_rank_raw(blng_cls_code="3")
+            records = [self._to_record(stock) for stock in self._fetch_volume_rank_raw(blng_cls_code="3")]
 
-        parsed = []
-        for stock in stocks:
-            code = stock.get("mksc_shrn_iscd", "")
-            name = stock.get("hts_kor_isnm", "")
-            stock_market = self._determine_market(code)
-            is_etf = self._is_etf_or_etn(code, name)
-
-            if exclude_etf and is_etf:
-                continue
-
-            market_upper = market.upper()
-            if market_upper != "ALL":
-                if market_upper == "KOSPI" and stock_market != "KOSPI":
-                    continue
-                if market_upper == "KOSDAQ" and stock_market != "KOSDAQ":
-                    continue
-
-            parsed.append({
-                "rank": len(parsed) + 1,
-                "code": code,
-                "name": name,
-                "current_price": safe_int(stock.get("stck_prpr", 0)),
-                "change_rate": safe_float(stock.get("prdy_ctrt", 0)),
-                "change_price": safe_int(stock.get("prdy_vrss", 0)),
-                "volume": safe_int(stock.get("acml_vol", 0)),
-                "volume_rate": safe_float(stock.get("vol_inrt", 0)),
-                "trading_value": safe_int(stock.get("acml_tr_pbmn", 0)),
-                "market": stock_market,
-                "is_etf": is_etf,
-            })
-
-            if len(parsed) >= limit:
-                break
-
-        return parsed
+        return self._select(records, market, limit, exclude_etf)
 
     def get_top30_by_trading_value(
         self,
@@ -512,55 +436,18 @@ class KISRankAPI:
         """
         raw_stocks = self._fetch_fluctuation_rank_raw()
 
-        parsed = []
+        # 방향 필터링 (prdy_ctrt 부호 기준)
+        direction_upper = direction.upper()
+        records = []
         for stock in raw_stocks:
-            # 전용 API는 stck_shrn_iscd 필드 사용 (거래량 API는 mksc_shrn_iscd)
-            code = stock.get("stck_shrn_iscd", "")
-            name = stock.get("hts_kor_isnm", "")
-            change_rate = safe_float(stock.get("prdy_ctrt", 0))
-            stock_market = self._determine_market(code)
-            is_etf = self._is_etf_or_etn(code, name)
-
-            # ETF/ETN 제외 필터
-            if exclude_etf and is_etf:
+            record = self._to_fluctuation_record(stock)
+            if direction_upper == "UP" and record.change_rate <= 0:
                 continue
-
-            # 시장 필터링
-            market_upper = market.upper()
-            if market_upper != "ALL":
-                if market_upper == "KOSPI" and stock_market != "KOSPI":
-                    continue
-                if market_upper == "KOSDAQ" and stock_market != "KOSDAQ":
-                    continue
-
-            # 방향 필터링 (prdy_ctrt 부호 기준)
-            direction_upper = direction.upper()
-            if direction_upper == "UP" and change_rate <= 0:
+            if direction_upper == "DOWN" and record.change_rate >= 0:
                 continue
-            if direction_upper == "DOWN" and change_rate >= 0:
-                continue
-
-            parsed.append({
-                "rank": len(parsed) + 1,
-                "code": code,
-                "name": name,
-                "current_price": safe_int(stock.get("stck_prpr", 0)),
-                "change_rate": change_rate,
-                "change_price": safe_int(stock.get("prdy_vrss", 0)),
-                "volume": safe_int(stock.get("acml_vol", 0)),
-                "volume_rate": safe_float(stock.get("vol_inrt", 0)),
-                "trading_value": safe_int(stock.get("acml_tr_pbmn", 0)),
-                "market": stock_market,
-                "is_etf": is_etf,
-                "direction": direction_upper,
-                "consecutive_up_days": safe_int(stock.get("stck_up_days", 0)),
-                "consecutive_down_days": safe_int(stock.get("stck_down_days", 0)),
-            })
-
-            if len(parsed) >= limit:
-                break
+            records.append(record)
 
-        return parsed
+        return self._select(records, market, limit, exclude_etf)
 
     def get_top_fluctuation_direct(
         self,
@@ -596,58 +483,24 @@ class KISRankAPI:
         }
 
         for stock in raw_stocks:
-            code = stock.get("stck_shrn_iscd", "")
-            name = stock.get("hts_kor_isnm", "")
-            change_rate = safe_float(stock.get("prdy_ctrt", 0))
-            stock_market = self._determine_market(code)
-            is_etf = self._is_etf_or_etn(code, name)
+            record = self._to_fluctuation_record(stock)
 
-            if exclude_etf and is_etf:
+            if exclude_etf and record.is_etf:
                 continue
 
             # 보합(0%)은 제외
-            if change_rate == 0:
+            if record.change_rate == 0:
                 continue
 
             # 시장 + 방향 결정
-            if stock_market == "KOSPI":
-                market_key = "kospi"
-            elif stock_market == "KOSDAQ":
-                market_key = "kosdaq"
-            else:
+            if record.market not in ("KOSPI", "KOSDAQ"):
                 continue
+            categories[f"{record.market.lower()}_{record.direction.lower()}"].append(record)
 
-            direction_key = "up" if change_rate > 0 else "down"
-            category_key = f"{market_key}_{direction_key}"
-
-            target = categories[category_key]
-            target.append({
-                "rank": len(target) + 1,
-                "code": code,
-                "name": name,
-                "current_price": safe_int(stock.get("stck_prpr", 0)),
-                "change_rate": change_rate,
-                "change_price": safe_int(stock.get("prdy_vrss", 0)),
-                "volume": safe_int(stock.get("acml_vol", 0)),
-                "volume_rate": safe_float(stock.get("vol_inrt", 0)),
-                "trading_value": safe_int(stock.get("acml_tr_pbmn", 0)),
-                "market": stock_market,
-                "is_etf": is_etf,
-                "direction": "UP" if change_rate > 0 else "DOWN",
-                "consecutive_up_days": safe_int(stock.get("stck_up_days", 0)),
-                "consecutive_down_days": safe_int(stock.get("stck_down_days", 0)),
-            })
-
-        # 카테고리별 change_rate 기준 재정렬 + 순위 재할당
-        for key in ("kospi_up", "kosdaq_up"):
-            categories[key].sort(key=lambda x: x["change_rate"], reverse=True)
-            for idx, stock in enumerate(categories[key]):
-                stock["rank"] = idx + 1
-
-        for key in ("kospi_down", "kosdaq_down"):
-            categories[key].sort(key=lambda x: x["change_rate"])
-            for idx, stock in enumerate(categories[key]):
-                stock["rank"] = idx + 1
+        # 카테고리별 change_rate 기준 재정렬 + 순위 부여
+        for key, items in categories.items():
+            items.sort(key=lambda x: x.change_rate, reverse=key.endswith("_up"))
+            categories[key] = [ranked(record, idx + 1) for idx, record in enumerate(items)]
 
         return {
             **categories,
@@ -657,10 +510,7 @@ class KISRankAPI:
         }
 
     def get_investor_data(self, stocks: List[Dict]) -> Dict[str, Dict]:
-        """여러 종목의 투자자(수급) 데이터 일괄 조회
-
-        KIS API FHKST01010900을 종목별로 호출하여
-        외국인/기관 순매수 데이터를 수집
+        """여러 종목의 확정 투자자(수급) 데이터 조회 (FHKST01010900 종목별 병렬 호출)
 
         Args:
             stocks: 종목 리스트 [{"code": "...", "name": "...", ...}, ...]
@@ -668,63 +518,13 @@ class KISRankAPI:
         Returns:
             {종목코드: {"name", "foreign_net", "institution_net", "individual_net"}, ...}
         """
-        import time
-
-        path = "/uapi/domestic-stock/v1/quotations/inquire-investor"
-        tr_id = "FHKST01010900"
-
-        result = {}
-        total = len(stocks)
-
-        for idx, stock in enumerate(stocks):
-            code = stock.get("code", "")
-            name = stock.get("name", "")
-
-            if not code:
-                continue
-
-            try:
-                params = {
-                    "FID_COND_MRKT_DIV_CODE": "J",
-                    "FID_INPUT_ISCD": code,
-                }
-
-                response = self.client.request("GET", path, tr_id, params=params)
-
-                if response.get("rt_cd") != "0":
-                    continue
-
-                output = response.get("output", [])
-                if not output:
-                    continue
-
-                # 당일 데이터 (첫 번째 항목)
-                today = output[0]
-                result[code] = {
-                    "name": name,
-                    "foreign_net": safe_int(today.get("frgn_ntby_qty", 0)),
-                    "institution_net": safe_int(today.get("orgn_ntby_qty", 0)),
-                    "individual_net": safe_int(today.get("prsn_ntby_qty", 0)),
-                }
-
-            except Exception as e:
-                print(f"  ⚠ {name}({code}) 투자자 데이터 조회 실패: {e}")
-                continue
-
-            # 진행 상황 출력
-            if (idx + 1) % 10 == 0 or idx + 1 == total:
-                print(f"  진행: {idx + 1}/{total}")
-
-            # API 호출 간격 (Rate limit 방지)
-            time.sleep(0.05)
-
-        return result
+        return self.investor_flow.collect(stocks, estimated=False)
 
     def get_investor_data_estimate(self, stocks: List[Dict]) -> Dict[str, Dict]:
         """장중 외인/기관 추정 수급 데이터 수집
 
-        KIS API HHPTJ04160200을 종목별로 호출하여
-        외국인/기관 추정 순매수 데이터를 수집 (개인 데이터 없음)
+        가집계 순위(FHPTJ04400000)로 채우고 순위에 없는 종목만 HHPTJ04160200 종목별 조회
+        (개인 데이터 없음)
 
         Args:
             stocks: 종목 리스트 [{"code": "...", "name": "...", ...}, ...]
@@ -732,55 +532,12 @@ class KISRankAPI:
         Returns:
             {종목코드: {"name", "foreign_net", "institution_net", "individual_net": None}, ...}
         """
-        import time
-
-        result = {}
-        total = len(stocks)
-
-        for idx, stock in enumerate(stocks):
-            code = stock.get("code", "")
-            name = stock.get("name", "")
-
-            if not code:
-                continue
-
-            try:
-                response = self.client.get_investor_trend_estimate(code)
-
-                if response.get("rt_cd") != "0":
-                    continue
-
-                output2 = response.get("output2", [])
-                if not output2:
-                    continue
-
-                # bsop_hour_gb가 가장 큰(최신) 행 추출
-                latest = max(output2, key=lambda x: x.get("bsop_hour_gb", ""))
-
-                result[code] = {
-                    "name": name,
-                    "foreign_net": safe_int(latest.get("frgn_fake_ntby_qty", 0)),
-                    "institution_net": safe_int(latest.get("orgn_fake_ntby_qty", 0)),
-                    "individual_net": None,
-                }
-
-            except Exception as e:
-                print(f"  ⚠ {name}({code}) 추정 수급 조회 실패: {e}")
-                continue
-
-            # 진행 상황 출력
-            if (idx + 1) % 10 == 0 or idx + 1 == total:
-                print(f"  진행: {idx + 1}/{total}")
-
-            # API 호출 간격 (Rate limit 방지)
-            time.sleep(0.05)
-
-        return result
+        return self.investor_flow.collect(stocks, estimated=True)
 
     def get_investor_data_auto(self, stocks: List[Dict]) -> Tuple[Dict[str, Dict], bool]:
         """장중/장외 자동 전환 수급 데이터 수집
 
-        장중(09:00~15:30)이면 추정 API, 장외면 확정 API 호출
+        장중(09:00~15:30)이면 추정(가집계) 데이터, 장외면 확정 API 호출
 
         Args:
             stocks: 종목 리스트
@@ -789,13 +546,10 @@ class KISRankAPI:
             (data_dict, is_estimated) 튜플
         """
         if is_market_hours():
-            print("[수급] 장중 → 추정 데이터(HHPTJ04160200) 사용")
-            data = self.get_investor_data_estimate(stocks)
-            return data, True
-        else:
-            print("[수급] 장외 → 확정 데이터(FHKST01010900) 사용")
-            data = self.get_investor_data(stocks)
-            return data, False
+            print("[수급] 장중 → 추정 데이터(FHPTJ04400000 가집계 순위 + HHPTJ04160200) 사용")
+            return self.get_investor_data_estimate(stocks), True
+        print("[수급] 장외 → 확정 데이터(FHKST01010900) 사용")
+        return self.get_investor_data(stocks), False
 
 
 def test_rank_api():
@@ -0,0 +1,114 @@
+"""
+KIS API 호출 기록/재생용 fixture 번들
+
+KIS_RECORD_DIR를 설정하고 파이프라인을 실행하면 KISClient.request의 모든 응답이
+<KIS_RECORD_DIR>/kis-<시각>.jsonl 한 파일(번들)에 한 줄씩 기록된다.
+    {"method", "path", "tr_id", "tr_cont", "params", "status", "elapsed_ms", "response"}
+
+기록된 번들은 api/kis_standin.py(로컬 KIS 대역 서버)가 그대로 재생하므로,
+실시간 KIS(초당 호출 제한, 1일 1회 토큰, 장중에만 의미 있는 데이터) 없이
+같은 거래일을 반복 재현하며 성능을 측정할 수 있다.
+"""
+import atexit
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import KIS_RECORD_DIR
+from modules.utils import KST
+
+# 재생 매칭 키: (path, tr_id, tr_cont, 정렬된 params JSON)
+RequestKey = Tuple[str, str, str, str]
+
+
+def request_key(path: str, tr_id: str, params: Optional[Dict[str, Any]] = None, tr_cont: str = "") -> RequestKey:
+    """요청 식별 키 (파라미터 순서·타입 차이 무시)"""
+    canonical = json.dumps({k: str(v) for k, v in (params or {}).items()}, sort_keys=True, ensure_ascii=False)
+    return path, tr_id, tr_cont or "", canonical
+
+
+class KISRecorder:
+    """KISClient.request 응답을 JSONL 번들로 기록 (스레드 안전, 줄 단위 즉시 기록)"""
+
+    def __init__(self, record_dir):
+        self.record_dir = Path(record_dir)
+        self.record_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(KST).strftime("%Y%m%d-%H%M%S")
+        self.path = self.record_dir / f"kis-{stamp}-{os.getpid()}.jsonl"
+        self._lock = threading.Lock()
+        self._file = open(self.path, "a", encoding="utf-8")
+        self.count = 0
+
+    def record(
+        self,
+        method: str,
+        path: str,
+        tr_id: str,
+        params: Optional[Dict[str, Any]],
+        response: Any,
+        status: int = 200,
+        elapsed_ms: float = 0.0,
+        tr_cont: str = "",
+    ) -> None:
+        line = json.dumps({
+            "method": method.upper(),
+            "path": path,
+            "tr_id": tr_id,
+            "tr_cont": tr_cont or "",
+            "params": params or {},
+            "status": status,
+            "elapsed_ms": round(elapsed_ms, 1),
+            "response": response,
+        }, ensure_ascii=False)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.count += 1
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+                if self.count:
+                    print(f"  ✓ KIS 호출 {self.count}건 기록: {self.path}")
+
+
+def load_bundles(paths: Iterable) -> List[Dict[str, Any]]:
+    """번들 파일(.jsonl) 또는 디렉토리(하위 *.jsonl 전체)에서 기록 항목 로드"""
+    files: List[Path] = []
+    for p in paths:
+        p = Path(p)
+        files.extend(sorted(p.glob("*.jsonl")) if p.is_dir() else [p])
+    entries = []
+    for file_path in files:
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    return entries
+
+
+_shared_recorder: Optional[KISRecorder] = None
+_shared_recorder_lock = threading.Lock()
+
+
+def get_kis_recorder() -> Optional[KISRecorder]:
+    """KIS_RECORD_DIR가 설정된 경우 프로세스 공용 기록기 (미설정 시 None)"""
+    global _shared_recorder
+    if not KIS_RECORD_DIR:
+        return None
+    with _shared_recorder_lock:
+        if _shared_recorder is None:
+            _shared_recorder = KISRecorder(KIS_RECORD_DIR)
+            atexit.register(_shared_recorder.close)
+        return _shared_recorder
@@ -0,0 +1,158 @@
+"""
+Gemini 응답 콘텐츠 주소 캐시 (.cache/llm/)
+
+(모델, generationConfig, 프롬프트 contents, tools, salt)의 해시를 키로
+호출 결과(추출된 텍스트 또는 파싱된 JSON)를 저장한다. 같은 입력의 재실행(후반 단계 실패 후
+재시도, workflow_dispatch 재실행 등)은 API를 다시 호출하지 않는다.
+
+- TTL: LLM_CACHE_TTL_SEC (기본 12시간)
+- 정리: 프로세스당 첫 저장 시 TTL 지난 파일 삭제 + 최신 LLM_CACHE_MAX_FILES개만 유지
+- 우회: 환경변수 LLM_CACHE=off 또는 CLI --no-llm-cache (set_enabled(False))
+- 적중/미스는 run_profile 카운터(llm_cache.hit / llm_cache.miss)에 기록
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from config.settings import CACHE_DIR
+from modules.run_profile import get_run_profile
+
+T = TypeVar("T")
+
+LLM_CACHE_DIR = CACHE_DIR / "llm"
+LLM_CACHE_TTL_SEC = int(os.getenv("LLM_CACHE_TTL_SEC", str(12 * 3600)) or 0)
+LLM_CACHE_MAX_FILES = int(os.getenv("LLM_CACHE_MAX_FILES", "2000") or 0)
+
+_enabled = os.getenv("LLM_CACHE", "on").strip().lower() not in ("0", "off", "false", "no")
+_pruned = False
+_prune_lock = threading.Lock()
+
+
+def set_enabled(enabled: bool) -> None:
+    """캐시 사용 여부 설정 (--no-llm-cache 처리용)"""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def cache_key(url: str, payload: Dict[str, Any], salt: str = "") -> str:
+    """요청 내용 해시 (URL의 ?key= API 키는 제외)"""
+    material = {
+        "model": url.split("?", 1)[0],
+        "contents": payload.get("contents"),
+        "generationConfig": payload.get("generationConfig"),
+        "tools": payload.get("tools"),
+        "salt": salt,
+    }
+    raw = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _path(key: str):
+    return LLM_CACHE_DIR / key[:2] / f"{key}.json"
+
+
+def get(key: str, ttl: Optional[float] = None) -> Optional[Any]:
+    """TTL 이내 캐시 값 반환 (없거나 만료/손상이면 None)"""
+    ttl = LLM_CACHE_TTL_SEC if ttl is None else ttl
+    try:
+        with open(_path(key), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if ttl and time.time() - entry.get("created_at", 0) > ttl:
+        return None
+    return entry.get("value")
+
+
+def prune(ttl: Optional[float] = None, max_files: Optional[int] = None) -> int:
+    """만료 파일과 개수 상한 초과분(오래된 순) 삭제 → 삭제한 파일 수"""
+    ttl = LLM_CACHE_TTL_SEC if ttl is None else ttl
+    max_files = LLM_CACHE_MAX_FILES if max_files is None else max_files
+    entries = []
+    for path in LLM_CACHE_DIR.glob("*/*"):
+        try:
+            entries.append((path.stat().st_mtime, path))
+        except OSError:
+            continue
+    entries.sort(reverse=True)
+
+    now = time.time()
+    kept = removed = 0
+    for mtime, path in entries:
+        expired = path.suffix == ".tmp" or (ttl and now - mtime > ttl)
+        if not expired and not (max_files and kept >= max_files):
+            kept += 1
+            continue
+        try:
+            path.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+def _prune_once() -> None:
+    global _pruned
+    with _prune_lock:
+        if _pruned:
+            return
+        _pruned = True
+    removed = prune()
+    if removed:
+        print(f"  ℹ LLM 캐시 정리: {removed}개 파일 삭제")
+
+
+def put(key: str, value: Any) -> None:
+    """캐시 저장 (원자적 교체, 실패해도 호출 흐름에 영향 없음)"""
+    _prune_once()
+    path = _path(key)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"created_at": time.time(), "value": value}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def cached_call(
+    url: str,
+    payload: Dict[str, Any],
+    compute: Callable[[], Optional[T]],
+    salt: str = "",
+) -> Optional[T]:
+    """캐시를 거치는 Gemini 호출
+
+    compute()의 결과(추출된 텍스트 또는 파싱된 JSON)를 저장한다.
+    None/빈 결과는 저장하지 않으므로 실패한 응답이 재시도를 막지 않는다.
+
+    Args:
+        url: 요청 URL (API 키 포함 가능, 해시에서는 제외)
+        payload: 요청 본문 (해시 대상)
+        compute: 실제 API 호출 + 결과 추출 함수 (HTTP 오류는 그대로 전파)
+        salt: 같은 입력을 독립 샘플로 구분할 때 사용 (Self-Consistency 등)
+    """
+    profile = get_run_profile()
+    if not _enabled:
+        profile.count("llm_cache.bypass")
+        return compute()
+
+    key = cache_key(url, payload, salt)
+    cached = get(key)
+    if cached is not None:
+        profile.count("llm_cache.hit")
+        return cached
+
+    profile.count("llm_cache.miss")
+    value = compute()
+    if value:
+        put(key, value)
+    return value
@@ -1,15 +1,32 @@
 """
 네이버 검색 API를 활용한 종목별 뉴스 수집 모듈
-- Rate limit 대응 (429 에러 시 재시도)
+- Rate limit 대응 (토큰 버킷 공유 + 429 에러 시 재시도)
+- 종목별 병렬 수집
+- 검색 결과 TTL 캐시 (.cache/naver_news_cache.json): TTL 경과 후에는
+  최신순 검색으로 마지막 pubDate 이후 기사만 증분 병합
 """
+import json
+import os
 import requests
 import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Any, Optional
 from html import unescape
 
-from config.settings import NAVER_CLIENT_ID, NAVER_CLIENT_SECRET
+from config.settings import NAVER_CLIENT_ID, NAVER_CLIENT_SECRET, CACHE_DIR
+from modules.rate_limiter import TokenBucket
+
+NEWS_CACHE_PATH = CACHE_DIR / "naver_news_cache.json"
+NEWS_CACHE_TTL_SEC = 3 * 3600  # 이 시간 내 재검색은 API 호출 없이 캐시 사용
+NEWS_CACHE_MAX_AGE_SEC = 7 * 86400  # 뉴스 필터 cutoff(7일)보다 오래된 캐시는 폐기
+
+# 학습된 별칭 테이블 (.cache/news_aliases.json)
+ALIAS_STORE_PATH = CACHE_DIR / "news_aliases.json"
+ALIAS_MIN_CONFIDENCE = 0.15  # 이 이상이면 첫 검색부터 OR 쿼리로 별칭 포함 (20건 중 3회)
+ALIAS_REVERIFY_DAYS = 30  # 마지막 검증 후 이 기간이 지나면 재학습
 
 # 영문 종목명 → 한글 별칭 매핑
 _KNOWN_ALIASES = {
@@ -30,6 +47,87 @@ _ALIAS_STOPWORDS = {
 }
 
 
+class AliasStore:
+    """종목코드별 한글 별칭 테이블 (실행 간 누적)
+
+    {code: {"name": 종목명, "alias": 별칭, "confidence": 0~1, "verified_at": "YYYY-MM-DD"}}
+    _KNOWN_ALIASES 매핑은 confidence 1.0으로 항상 우선한다.
+    path=None이면 디스크를 읽거나 쓰지 않고 실행 중에만 유지한다 (캐시 미사용 모드).
+    """
+
+    def __init__(self, path=ALIAS_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._table: Dict[str, Dict[str, Any]] = {}
+        if path is None:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._table = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    @staticmethod
+    def known_alias(stock_name: str) -> Optional[str]:
+        """하드코딩된 별칭 매핑 조회"""
+        name_lower = stock_name.lower()
+        for eng, kor in _KNOWN_ALIASES.items():
+            if eng in name_lower:
+                return kor
+        return None
+
+    def lookup(self, key: str, stock_name: str) -> Optional[str]:
+        """첫 검색에 바로 사용할 수 있는 별칭 반환 (신뢰도·검증일 조건 충족 시)"""
+        known = self.known_alias(stock_name)
+        if known:
+            return known
+        with self._lock:
+            entry = self._table.get(key)
+        if not entry or entry.get("name") != stock_name:
+            return None
+        if entry.get("confidence", 0) < ALIAS_MIN_CONFIDENCE:
+            return None
+        try:
+            verified = datetime.strptime(entry.get("verified_at", ""), "%Y-%m-%d")
+        except ValueError:
+            return None
+        if datetime.now() - verified > timedelta(days=ALIAS_REVERIFY_DAYS):
+            return None
+        return entry.get("alias")
+
+    def record(self, key: str, stock_name: str, alias: str, confidence: float):
+        """별칭 학습 결과 저장 (같은 별칭이면 신뢰도 이동평균)"""
+        today = datetime.now().strftime("%Y-%m-%d")
+        with self._lock:
+            prev = self._table.get(key)
+            if prev and prev.get("alias") == alias and prev.get("name") == stock_name:
+                confidence = round(0.5 * prev.get("confidence", 0) + 0.5 * confidence, 3)
+            self._table[key] = {
+                "name": stock_name,
+                "alias": alias,
+                "confidence": round(confidence, 3),
+                "verified_at": today,
+            }
+            self._dirty = True
+
+    def save(self):
+        """변경 사항이 있을 때만 디스크에 저장"""
+        with self._lock:
+            if self.path is None or not self._dirty:
+                return
+            payload = dict(self._table)
+            self._dirty = False
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"[WARN] 별칭 테이블 저장 실패: {e}")
+
+
 class NaverNewsAPI:
     """네이버 검색 API를 통한 뉴스 수집"""
 
@@ -39,27 +137,69 @@ class NaverNewsAPI:
         client_secret: Optional[str] = None,
         request_delay: float = 0.1,
         max_retries: int = 3,
+        max_workers: int = 8,
+        use_cache: bool = True,
+        cache_ttl: float = NEWS_CACHE_TTL_SEC,
     ):
         """
         Args:
             client_id: 네이버 API 클라이언트 ID
             client_secret: 네이버 API 클라이언트 시크릿
-            request_delay: 요청 간 딜레이 (초)
+            request_delay: 요청 간 평균 간격 (초) - 워커 전체가 공유하는 토큰 버킷 속도
             max_retries: 최대 재시도 횟수
+            max_workers: 종목별 병렬 수집 워커 수
+            use_cache: 검색 결과 캐시 사용 여부
+            cache_ttl: 캐시 유효 시간 (초)
         """
         self.client_id = client_id or NAVER_CLIENT_ID
         self.client_secret = client_secret or NAVER_CLIENT_SECRET
         self.api_url = "https://openapi.naver.com/v1/search/news.json"
         self.request_delay = request_delay
         self.max_retries = max_retries
-        self._last_request_time = 0
+        self.max_workers = max(1, max_workers)
+        # request_delay <= 0이면 호출 간격 제한 없음 (429 재시도만 적용)
+        self._bucket = TokenBucket(rate=1.0 / request_delay, capacity=5) if request_delay > 0 else None
+
+        # 검색 결과 캐시: {"{sort}|{display}|{query}": {"fetched_at", "last_pub", "items"}}
+        self.use_cache = use_cache
+        self.cache_ttl = cache_ttl
+        self._cache_lock = threading.Lock()
+        self._news_cache: Dict[str, Dict[str, Any]] = self._load_cache() if use_cache else {}
+        self._cache_stats = {"hit": 0, "incremental": 0, "miss": 0}
+        self._aliases = AliasStore(ALIAS_STORE_PATH if use_cache else None)
 
     def _wait_for_rate_limit(self):
-        """Rate limit 대응을 위한 딜레이"""
-        elapsed = time.time() - self._last_request_time
-        if elapsed < self.request_delay:
-            time.sleep(self.request_delay - elapsed)
-        self._last_request_time = time.time()
+        """Rate limit 대응 (모든 워커가 공유하는 토큰 버킷)"""
+        if self._bucket is not None:
+            self._bucket.acquire()
+
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
+        """디스크 캐시 로드 (손상/부재 시 빈 캐시)"""
+        try:
+            with open(NEWS_CACHE_PATH, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        now = time.time()
+        return {
+            k: v for k, v in data.get("queries", {}).items()
+            if now - v.get("fetched_at", 0) < NEWS_CACHE_MAX_AGE_SEC
+        }
+
+    def save_cache(self):
+        """디스크 캐시 저장 (원자적 교체)"""
+        if not self.use_cache:
+            return
+        try:
+            NEWS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+            with self._cache_lock:
+                payload = {"version": 1, "queries": dict(self._news_cache)}
+            tmp_path = NEWS_CACHE_PATH.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp_path, NEWS_CACHE_PATH)
+        except OSError as e:
+            print(f"[WARN] 뉴스 캐시 저장 실패: {e}")
 
     def _clean_html(self, text: str) -> str:
         """HTML 태그 및 특수문자 제거"""
@@ -149,6 +289,9 @@ class NaverNewsAPI:
                 elif response.status_code == 429:
                     wait_time = (2 ** attempt) * 0.5  # 0.5초, 1초, 2초
                     if attempt < self.max_retries - 1:
+                        # 다른 워커도 함께 속도를 낮추도록 버킷에 패널티 부여
+                        if self._bucket is not None:
+                            self._bucket.penalize(wait_time)
                         time.sleep(wait_time)
                         continue
                     else:
@@ -180,22 +323,87 @@ class NaverNewsAPI:
         except Exception:
             return None
 
-    def _get_korean_alias(self, stock_name: str, articles: List[Dict[str, Any]]) -> Optional[str]:
-        """영문 종목명의 한글 별칭 감지
+    def _latest_pub(self, articles: List[Dict[str, Any]]) -> str:
+        """기사 목록 중 가장 최근 pubDate 원문 반환"""
+        latest_raw, latest_dt = "", None
+        for a in articles:
+            dt = self._parse_datetime(a.get("_raw_pubDate", ""))
+            if dt and (latest_dt is None or dt > latest_dt):
+                latest_raw, latest_dt = a["_raw_pubDate"], dt
+        return latest_raw
+
+    def _cached_search(self, query: str, display: int = 20, sort: str = "sim") -> List[Dict[str, Any]]:
+        """캐시를 거치는 뉴스 검색
+
+        1) TTL 이내 캐시 → API 호출 없이 반환
+        2) TTL 경과 캐시 → 최신순 검색 후 마지막 pubDate 이후 + 링크 인덱스에 없는 기사만 앞에 병합
+        3) 캐시 없음 → 일반 검색 후 저장 (빈 결과는 저장하지 않음)
+        """
+        if not self.use_cache:
+            return self.search_news(query, display=display, sort=sort)
+
+        key = f"{sort}|{display}|{query}"
+        with self._cache_lock:
+            entry = self._news_cache.get(key)
+
+        now = time.time()
+        if entry and now - entry["fetched_at"] < self.cache_ttl:
+            with self._cache_lock:
+                self._cache_stats["hit"] += 1
+            return list(entry["items"])
+
+        if entry:
+            fresh = self.search_news(query, display=display, sort="date")
+            if not fresh:
+                # 검색 실패 → 기존 캐시 그대로 사용 (다음 실행에서 재시도)
+                return list(entry["items"])
+            last_dt = self._parse_datetime(entry.get("last_pub", ""))
+            link_index = {a["link"] for a in entry["items"]}
+            new_items = []
+            for a in fresh:
+                if a["link"] in link_index:
+                    continue
+                pub_dt = self._parse_datetime(a.get("_raw_pubDate", ""))
+                if last_dt and pub_dt and pub_dt <= last_dt:
+                    continue
+                new_items.append(a)
+            items = (new_items + entry["items"])[:display * 2]
+            with self._cache_lock:
+                self._cache_stats["incremental"] += 1
+        else:
+            items = self.search_news(query, display=display, sort=sort)
+            with self._cache_lock:
+                self._cache_stats["miss"] += 1
+            if not items:
+                return []
+
+        with self._cache_lock:
+            self._news_cache[key] = {
+                "fetched_at": now,
+                "last_pub": self._latest_pub(items),
+                "items": items,
+            }
+        return list(items)
+
+    def _get_korean_alias(self, stock_name: str, articles: List[Dict[str, Any]]) -> tuple:
+        """영문 종목명의 한글 별칭 감지 → (별칭, 자동 감지 등장 비율)
 
-        1) 알려진 매핑에서 확인
+        1) 알려진 매핑에서 확인 (비율 None - 학습 대상 아님)
         2) 없으면 기사 제목에서 자주 등장하는 한글 단어로 자동 추정
         """
         if not re.search(r'[a-zA-Z]', stock_name):
-            return None
+            return None, None
 
         # 알려진 별칭 확인
-        name_lower = stock_name.lower()
-        for eng, kor in _KNOWN_ALIASES.items():
-            if eng in name_lower:
-                return kor
+        known = AliasStore.known_alias(stock_name)
+        if known:
+            return known, None
+
+        best = self._detect_alias(articles)
+        return best if best else (None, None)
 
-        # 자동 감지: 제목에서 빈도 높은 한글 단어 추출
+    def _detect_alias(self, articles: List[Dict[str, Any]]) -> Optional[tuple]:
+        """기사 제목에서 빈도 높은 한글 단어 추출 → (단어, 등장 비율) 또는 None"""
         word_counts: Dict[str, int] = {}
         for article in articles:
             title = article.get("title", "")
@@ -207,7 +415,7 @@ class NaverNewsAPI:
         if word_counts:
             best_word, best_count = max(word_counts.items(), key=lambda x: x[1])
             if best_count >= 3:
-                return best_word
+                return best_word, best_count / max(len(articles), 1)
 
         return None
 
@@ -236,41 +444,68 @@ class NaverNewsAPI:
         self,
         stock_name: str,
         count: int = 3,
+        code: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         """종목명으로 뉴스 검색 (필터링 파이프라인 적용)
 
-        1) "{종목명} 주가" 정확도순 20개 검색 + 필터링
-        2) 결과 부족 시 한글 별칭으로 재검색
+        1) 학습된 별칭이 있으면 "{종목명} 주가 | {별칭} 주가" OR 쿼리 1회로 검색
+        2) 없으면 "{종목명} 주가" 정확도순 20개 검색 + 필터링,
+           결과 부족 시 자동 감지한 한글 별칭으로 재검색 후 별칭 테이블에 학습
         3) pubDate 내림차순 정렬, 상위 count개 반환
+
+        Args:
+            stock_name: 종목명
+            count: 반환할 뉴스 개수
+            code: 종목코드 (별칭 테이블 키, 없으면 종목명 사용)
         """
         # 공통 필터 설정
         kst = timezone(timedelta(hours=9))
         cutoff = datetime.now(kst) - timedelta(days=7)
         bot_pattern = re.compile(r'주가[,]?\s*\d')
+        alias_key = code or stock_name
+        has_latin = bool(re.search(r'[a-zA-Z]', stock_name))
+
+        learned = self._aliases.lookup(alias_key, stock_name) if has_latin else None
+        if learned and learned != stock_name:
+            # 1. 학습된 별칭: OR 쿼리로 한 번에 검색 (재검색 왕복 없음)
+            raw_results = self._cached_search(f"{stock_name} 주가 | {learned} 주가", display=20, sort="sim")
+            if not raw_results:
+                return []
+            name_variants = [stock_name, learned]
+            filtered = self._filter_articles(raw_results, name_variants, cutoff, bot_pattern)
+
+            # 학습 별칭 재검증: 제목에 여전히 등장하면 검증일 갱신
+            if not AliasStore.known_alias(stock_name):
+                hits = sum(1 for a in raw_results if learned in a.get("title", ""))
+                self._aliases.record(alias_key, stock_name, learned, hits / len(raw_results))
+        else:
+            # 1. 원본 종목명으로 검색
+            raw_results = self._cached_search(f"{stock_name} 주가", display=20, sort="sim")
+            if not raw_results:
+                return []
 
-        # 1. 원본 종목명으로 검색
-        raw_results = self.search_news(f"{stock_name} 주가", display=20, sort="sim")
-        if not raw_results:
-            return []
-
-        # 별칭 감지
-        alias = self._get_korean_alias(stock_name, raw_results)
-        name_variants = [stock_name]
-        if alias and alias != stock_name:
-            name_variants.append(alias)
-
-        # 필터링
-        filtered = self._filter_articles(raw_results, name_variants, cutoff, bot_pattern)
-
-        # 2. 결과 부족 시 한글 별칭으로 재검색
-        if len(filtered) < count and alias and alias != stock_name:
-            alias_raw = self.search_news(f"{alias} 주가", display=20, sort="sim")
-            if alias_raw:
-                alias_filtered = self._filter_articles(alias_raw, name_variants, cutoff, bot_pattern)
-                existing_links = {a["link"] for a in filtered}
-                for a in alias_filtered:
-                    if a["link"] not in existing_links:
-                        filtered.append(a)
+            # 별칭 감지
+            alias, alias_ratio = self._get_korean_alias(stock_name, raw_results)
+            name_variants = [stock_name]
+            if alias and alias != stock_name:
+                name_variants.append(alias)
+
+            # 필터링
+            filtered = self._filter_articles(raw_results, name_variants, cutoff, bot_pattern)
+
+            # 자동 감지 별칭 학습 (다음 실행부터 첫 검색에 포함)
+            if alias_ratio is not None and alias != stock_name:
+                self._aliases.record(alias_key, stock_name, alias, alias_ratio)
+
+            # 2. 결과 부족 시 한글 별칭으로 재검색
+            if len(filtered) < count and alias and alias != stock_name:
+                alias_raw = self._cached_search(f"{alias} 주가", display=20, sort="sim")
+                if alias_raw:
+                    alias_filtered = self._filter_articles(alias_raw, name_variants, cutoff, bot_pattern)
+                    existing_links = {a["link"] for a in filtered}
+                    for a in alias_filtered:
+                        if a["link"] not in existing_links:
+                            filtered.append(a)
 
         # 3. pubDate 내림차순 정렬
         filtered.sort(
@@ -291,33 +526,47 @@ class NaverNewsAPI:
         stocks: List[Dict[str, Any]],
         news_count: int = 3,
     ) -> Dict[str, List[Dict[str, Any]]]:
-        """여러 종목의 뉴스 일괄 수집
+        """여러 종목의 뉴스 일괄 수집 (병렬, 토큰 버킷으로 전체 호출 속도 제한)
 
         Args:
             stocks: 종목 리스트 [{"code": ..., "name": ...}, ...]
             news_count: 종목당 뉴스 개수
 
         Returns:
-            {종목코드: {"name": 종목명, "news": [뉴스리스트]}, ...}
+            {종목코드: {"name": 종목명, "news": [뉴스리스트]}, ...} (입력 순서 유지)
         """
-        result = {}
-        total = len(stocks)
+        targets = [s for s in stocks if s.get("name")]
+        total = len(targets)
+        collected: Dict[str, List[Dict[str, Any]]] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self.get_stock_news, s["name"], news_count, s.get("code") or None): s.get("code", "")
+                for s in targets
+            }
+            for idx, future in enumerate(as_completed(futures), 1):
+                code = futures[future]
+                try:
+                    collected[code] = future.result()
+                except Exception as e:
+                    print(f"[ERROR] 뉴스 수집 실패 ({code}): {e}")
+                    collected[code] = []
+
+                # 진행 상황 표시 (10개마다)
+                if idx % 10 == 0:
+                    print(f"    뉴스 수집 중... ({idx}/{total})")
+
+        self.save_cache()
+        self._aliases.save()
+        if self.use_cache:
+            st = self._cache_stats
+            print(f"    뉴스 캐시: 적중 {st['hit']}, 증분 {st['incremental']}, 신규 {st['miss']}")
 
-        for idx, stock in enumerate(stocks, 1):
+        result = {}
+        for stock in targets:
             code = stock.get("code", "")
-            name = stock.get("name", "")
-
-            if not name:
-                continue
-
-            news = self.get_stock_news(name, count=news_count)
             result[code] = {
-                "name": name,
-                "news": news,
+                "name": stock["name"],
+                "news": collected.get(code, []),
             }
-
-            # 진행 상황 표시 (10개마다)
-            if idx % 10 == 0:
-                print(f"    뉴스 수집 중... ({idx}/{total})")
-
         return result
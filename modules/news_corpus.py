@@ -0,0 +1,131 @@
+"""
+종목 간 공유 뉴스 코퍼스
+
+같은 테마의 상위 종목들은 동일 기사를 중복으로 가져오는 경우가 많다.
+기사를 정규화된 링크(없으면 제목+요약 내용 해시) 기준 ID로 한 번만 저장하고,
+종목별로는 기사 ID 목록만 참조한다.
+
+내보내기 형식:
+    "news_corpus": {기사ID: {"title", "link", "description", "pubDate", "originallink"}}
+    "news": {종목코드: {"name": 종목명, "ids": [기사ID, ...]}}
+"""
+import hashlib
+import re
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 링크 정규화 시 제거할 추적용 쿼리 파라미터
+_TRACKING_PARAMS = {"utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content", "fbclid", "gclid"}
+
+
+def normalize_link(url: str) -> str:
+    """기사 URL 정규화 (스킴/호스트 소문자, 추적 파라미터·fragment·끝 슬래시 제거)"""
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in _TRACKING_PARAMS
+    ))
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https", host, path, query, ""))
+
+
+def _content_key(article: Dict[str, Any]) -> str:
+    """제목+요약 기반 내용 키 (공백/기호 차이 무시)"""
+    text = f"{article.get('title', '')}|{article.get('description', '')}"
+    return re.sub(r"[\W_]+", "", text).lower()
+
+
+def article_id(article: Dict[str, Any]) -> str:
+    """기사 ID: 정규화 링크(원문 링크 우선) 해시, 링크가 없으면 내용 해시"""
+    key = normalize_link(article.get("originallink") or article.get("link") or "")
+    if not key:
+        key = "content:" + _content_key(article)
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+
+class NewsCorpus:
+    """기사 ID → 기사, 종목코드 → 기사 ID 목록"""
+
+    def __init__(self):
+        self.articles: Dict[str, Dict[str, Any]] = {}
+        self.refs: Dict[str, Dict[str, Any]] = {}
+        # 링크는 다르지만 내용이 같은 기사(재전송 등) 병합용 인덱스
+        self._content_index: Dict[str, str] = {}
+
+    @classmethod
+    def from_news_data(cls, news_data: Dict[str, Dict[str, Any]]) -> "NewsCorpus":
+        """get_multiple_stocks_news 결과({code: {"name", "news"}})로 코퍼스 생성"""
+        corpus = cls()
+        for code, entry in (news_data or {}).items():
+            corpus.add_stock_news(code, entry.get("name", ""), entry.get("news", []))
+        return corpus
+
+    def add_article(self, article: Dict[str, Any]) -> str:
+        """기사 추가 (중복이면 기존 ID 반환)"""
+        aid = article_id(article)
+        if aid in self.articles:
+            return aid
+        content_key = _content_key(article)
+        if content_key and content_key in self._content_index:
+            return self._content_index[content_key]
+        self.articles[aid] = {k: v for k, v in article.items() if not k.startswith("_")}
+        if content_key:
+            self._content_index[content_key] = aid
+        return aid
+
+    def add_stock_news(self, code: str, name: str, articles: List[Dict[str, Any]]) -> None:
+        """종목 뉴스 등록 (순서 유지, 종목 내 중복 제거)"""
+        ids: List[str] = []
+        for article in articles or []:
+            aid = self.add_article(article)
+            if aid not in ids:
+                ids.append(aid)
+        self.refs[code] = {"name": name, "ids": ids}
+
+    def stock_news(self, code: str) -> List[Dict[str, Any]]:
+        """종목의 기사 목록 (참조 해제)"""
+        ref = self.refs.get(code)
+        if not ref:
+            return []
+        return [self.articles[aid] for aid in ref["ids"] if aid in self.articles]
+
+    def headlines(self, codes: Optional[List[str]] = None, limit: int = 60) -> List[Tuple[Dict[str, Any], List[str]]]:
+        """기사별 (기사, 관련 종목명 목록) - 여러 종목이 공유하는 기사를 먼저 반환
+
+        Args:
+            codes: 대상 종목코드 (None이면 전체, 순서가 우선순위)
+            limit: 최대 기사 수
+        """
+        target = codes if codes is not None else list(self.refs.keys())
+        linked: Dict[str, List[str]] = {}
+        order: Dict[str, int] = {}
+        for rank, code in enumerate(target):
+            ref = self.refs.get(code)
+            if not ref:
+                continue
+            for aid in ref["ids"]:
+                names = linked.setdefault(aid, [])
+                if ref["name"] not in names:
+                    names.append(ref["name"])
+                order.setdefault(aid, rank)
+        ranked = sorted(linked, key=lambda aid: (-len(linked[aid]), order[aid]))
+        return [(self.articles[aid], linked[aid]) for aid in ranked[:limit] if aid in self.articles]
+
+    def to_export(self) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """(news_corpus, news 참조) 반환 - 참조되는 기사만 포함"""
+        used = {aid for ref in self.refs.values() for aid in ref["ids"]}
+        corpus = {aid: a for aid, a in self.articles.items() if aid in used}
+        refs = {code: {"name": ref["name"], "ids": list(ref["ids"])} for code, ref in self.refs.items()}
+        return corpus, refs
+
+    def stats(self) -> Tuple[int, int]:
+        """(종목별 참조 총합, 고유 기사 수)"""
+        return sum(len(r["ids"]) for r in self.refs.values()), len(self.articles)
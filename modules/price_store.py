@@ -0,0 +1,431 @@
+"""
+로컬 일봉 가격 저장소 (종가/고가/저가 + 지수)
+
+과거 일봉은 바뀌지 않으므로 백테스트·모의투자가 매 실행마다 yfinance/KIS에서 같은
+구간을 다시 받을 필요가 없다. .cache/prices.sqlite에 종목코드별로 클러스터링된
+(code, date) 테이블로 저장하고, 종목별 수집 구간(coverage)을 기록해 두었다가
+요청 구간 중 비어 있는 앞/뒤 구간만 백엔드에서 보충(top-up)한다.
+
+- 지수는 "^KS11"(KOSPI), "^KQ11"(KOSDAQ) 코드로 종목과 같은 테이블에 저장
+  (그 외 KIS 업종지수는 "U:<업종코드>", KIS 백엔드 전용)
+- 오늘 일봉은 장중에 바뀌므로 coverage에 포함하지 않고 매번 다시 받아 덮어쓴다
+- 백엔드: YFinanceBackend(기본), KISBackend, FixtureBackend(오프라인 검증용)
+  PRICE_STORE_BACKEND=yfinance|kis|fixture, PRICE_FIXTURE_PATH=<json>으로 선택
+"""
+import atexit
+import json
+from abc import ABC, abstractmethod
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from config.settings import CACHE_DIR
+from modules.utils import KST
+
+PRICE_STORE_PATH = CACHE_DIR / "prices.sqlite"
+PRICE_STORE_BACKEND = os.getenv("PRICE_STORE_BACKEND", "yfinance").lower()
+PRICE_FIXTURE_PATH = os.getenv("PRICE_FIXTURE_PATH", "")
+
+KOSPI_INDEX = "^KS11"
+KOSDAQ_INDEX = "^KQ11"
+KIS_INDEX_PREFIX = "U:"
+
+YF_SUFFIX_MAP_PATH = CACHE_DIR / "yf_suffix_map.json"
+YF_SUFFIXES = (".KS", ".KQ")  # 코스피 먼저, 코스닥
+
+# 가격 행: (날짜 YYYY-MM-DD, 종가, 고가, 저가)
+PriceRow = Tuple[str, float, Optional[float], Optional[float]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_prices (
+    code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    close REAL NOT NULL,
+    high REAL,
+    low REAL,
+    source TEXT,
+    PRIMARY KEY (code, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    code TEXT PRIMARY KEY,
+    start TEXT NOT NULL,
+    end TEXT NOT NULL
+);
+"""
+
+
+def _shift(date_str: str, days: int) -> str:
+    return (datetime.strptime(date_str, "%Y-%m-%d") + timedelta(days=days)).strftime("%Y-%m-%d")
+
+
+# ── 백엔드 ───────────────────────────────────────────────────
+
+class PriceBackend(ABC):
+    """일봉 공급자 인터페이스"""
+
+    name = "base"
+
+    @abstractmethod
+    def fetch(self, codes: List[str], start: str, end: str) -> Optional[Dict[str, List[PriceRow]]]:
+        """start~end(양끝 포함) 일봉 조회
+
+        Returns:
+            {코드: [PriceRow, ...]} (데이터 없거나 실패한 코드는 생략), 조회 자체가 실패하면 None
+        """
+
+
+def _load_suffix_map() -> Dict[str, str]:
+    """학습된 종목코드 → yfinance 접미어(.KS/.KQ) 매핑"""
+    try:
+        with open(YF_SUFFIX_MAP_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_suffix_map(suffix_map: Dict[str, str]) -> None:
+    try:
+        os.makedirs(os.path.dirname(YF_SUFFIX_MAP_PATH), exist_ok=True)
+        tmp_path = f"{YF_SUFFIX_MAP_PATH}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(suffix_map, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, YF_SUFFIX_MAP_PATH)
+    except OSError as e:
+        print(f"  ⚠ 접미어 매핑 저장 실패: {e}")
+
+
+class YFinanceBackend(PriceBackend):
+    """yfinance 배치 다운로드 (전 종목 + 지수를 한 번에 조회)
+
+    접미어를 모르는 종목은 .KS/.KQ 두 티커를 같은 배치에 넣고, 데이터가 있는 쪽을
+    .cache/yf_suffix_map.json에 기록하여 다음 실행부터는 한 티커만 조회한다.
+    """
+
+    name = "yfinance"
+
+    def fetch(self, codes, start, end):
+        try:
+            import yfinance as yf
+        except ImportError:
+            print("  ⚠ yfinance 미설치")
+            return None
+
+        suffix_map = _load_suffix_map()
+        tickers: Dict[str, List[str]] = {}
+        for code in dict.fromkeys(codes):
+            if code.startswith("^"):
+                tickers[code] = [code]
+            elif code in suffix_map:
+                tickers[code] = [f"{code}{suffix_map[code]}"]
+            else:
+                tickers[code] = [f"{code}{s}" for s in YF_SUFFIXES]
+        all_tickers = [t for ts in tickers.values() for t in ts]
+        if not all_tickers:
+            return {}
+
+        try:
+            # yfinance의 end는 미포함
+            data = yf.download(all_tickers, start=start, end=_shift(end, 1), progress=False, group_by="column")
+        except Exception as e:
+            print(f"  ⚠ yfinance 배치 다운로드 실패: {e}")
+            return None
+        if data is None or data.empty:
+            return {}
+
+        def _field(name):
+            frame = data[name]
+            return frame.to_frame(all_tickers[0]) if not hasattr(frame, "columns") else frame
+
+        close, high, low = _field("Close"), _field("High"), _field("Low")
+        dates = [d.strftime("%Y-%m-%d") for d in close.index]
+
+        result: Dict[str, List[PriceRow]] = {}
+        learned = 0
+        for code, candidates in tickers.items():
+            for ticker in candidates:
+                if ticker not in close.columns:
+                    continue
+                closes = close[ticker].to_numpy()
+                highs = high[ticker].to_numpy() if ticker in high.columns else closes
+                lows = low[ticker].to_numpy() if ticker in low.columns else closes
+                rows = [
+                    (d, float(c), float(h) if h == h else None, float(l) if l == l else None)
+                    for d, c, h, l in zip(dates, closes, highs, lows)
+                    if c == c  # NaN 제외
+                ]
+                if not rows:
+                    continue
+                result[code] = rows
+                if code not in suffix_map and not code.startswith("^"):
+                    suffix_map[code] = ticker[len(code):]
+                    learned += 1
+                break
+
+        if learned:
+            _save_suffix_map(suffix_map)
+        return result
+
+
+class KISBackend(PriceBackend):
+    """KIS 기간별 시세 (종목: 주식 일봉, 지수: 업종 일봉)
+
+    1회 응답 건수 제한(주식 100건, 업종 50건)이 있어 시작일에 닿을 때까지 과거 방향으로 페이지 조회
+    """
+
+    name = "kis"
+    INDEX_CODES = {KOSPI_INDEX: "0001", KOSDAQ_INDEX: "1001"}
+    PAGE_LIMIT = 10
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from modules.kis_client import KISClient
+            self._client = KISClient()
+        return self._client
+
+    def _index_code(self, code: str) -> Optional[str]:
+        if code.startswith(KIS_INDEX_PREFIX):
+            return code[len(KIS_INDEX_PREFIX):]
+        return self.INDEX_CODES.get(code)
+
+    def _fetch_one(self, code: str, start: str, end: str) -> Optional[List[PriceRow]]:
+        index_code = self._index_code(code)
+        is_index = index_code is not None
+        prefix = "bstp_nmix" if is_index else "stck"
+        close_key = f"{prefix}_prpr" if is_index else "stck_clpr"
+        start_ymd = start.replace("-", "")
+        end_ymd = end.replace("-", "")
+        rows: List[PriceRow] = []
+        for _ in range(self.PAGE_LIMIT):
+            if is_index:
+                resp = self.client.get_index_daily_price(index_code, start_date=start_ymd, end_date=end_ymd)
+            else:
+                resp = self.client.get_stock_daily_price(code, start_date=start_ymd, end_date=end_ymd)
+            if resp.get("rt_cd") != "0":
+                print(f"  ⚠ KIS 일봉 조회 실패 ({code}): {resp.get('msg1', '')}")
+                return None
+            items = [i for i in resp.get("output2", []) if i.get("stck_bsop_date")]
+            for item in items:
+                try:
+                    c = float(item.get(close_key) or 0)
+                except (TypeError, ValueError):
+                    continue
+                if c <= 0:
+                    continue
+                d = item["stck_bsop_date"]
+                rows.append((
+                    f"{d[:4]}-{d[4:6]}-{d[6:8]}", c,
+                    float(item.get(f"{prefix}_hgpr") or 0) or None,
+                    float(item.get(f"{prefix}_lwpr") or 0) or None,
+                ))
+            # 최신순 응답 - 가장 오래된 날짜가 시작일보다 뒤면 그 전날까지 다시 조회
+            if not items or items[-1]["stck_bsop_date"] <= start_ymd:
+                break
+            oldest = datetime.strptime(items[-1]["stck_bsop_date"], "%Y%m%d")
+            end_ymd = (oldest - timedelta(days=1)).strftime("%Y%m%d")
+            time.sleep(0.1)
+        return [r for r in rows if start <= r[0] <= end]
+
+    def fetch(self, codes, start, end):
+        """종목별 조회 - 실패한 코드만 결과에서 빠지고 나머지는 그대로 반환"""
+        result: Dict[str, List[PriceRow]] = {}
+        for code in dict.fromkeys(codes):
+            try:
+                rows = self._fetch_one(code, start, end)
+            except Exception as e:
+                print(f"  ⚠ KIS 일봉 조회 실패 ({code}): {e}")
+                continue
+            if rows:
+                result[code] = rows
+        return result
+
+
+class FixtureBackend(PriceBackend):
+    """고정 데이터 백엔드 (네트워크 없이 백테스트·수익률 계산 검증용)
+
+    fixture 형식: {코드: {"YYYY-MM-DD": 종가 | {"close", "high", "low"}}}
+    """
+
+    name = "fixture"
+
+    def __init__(self, fixture=None):
+        if isinstance(fixture, (str, os.PathLike)):
+            with open(fixture, "r", encoding="utf-8") as f:
+                fixture = json.load(f)
+        self.fixture = fixture or {}
+        self.calls: List[Tuple[Tuple[str, ...], str, str]] = []
+
+    def fetch(self, codes, start, end):
+        self.calls.append((tuple(codes), start, end))
+        result: Dict[str, List[PriceRow]] = {}
+        for code in codes:
+            rows = []
+            for d, value in sorted((self.fixture.get(code) or {}).items()):
+                if not start <= d <= end:
+                    continue
+                if isinstance(value, dict):
+                    rows.append((d, float(value["close"]), value.get("high"), value.get("low")))
+                else:
+                    rows.append((d, float(value), None, None))
+            if rows:
+                result[code] = rows
+        return result
+
+
+def make_backend(name: str = PRICE_STORE_BACKEND) -> PriceBackend:
+    if name == "kis":
+        return KISBackend()
+    if name == "fixture":
+        return FixtureBackend(PRICE_FIXTURE_PATH or None)
+    return YFinanceBackend()
+
+
+# ── 저장소 ───────────────────────────────────────────────────
+
+class PriceStore:
+    """SQLite 일봉 저장소 + 증분 보충 + 종목 벡터화 조회"""
+
+    def __init__(self, path=PRICE_STORE_PATH, backend: Optional[PriceBackend] = None):
+        self.path = str(path)
+        self.backend = backend or make_backend()
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ── 쓰기 ──
+
+    def put_rows(self, code: str, rows: Iterable[PriceRow], source: str = "") -> int:
+        rows = [(code, d, c, h, l, source) for d, c, h, l in rows]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO daily_prices (code, date, close, high, low, source) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def put(self, code: str, date: str, close: float, high: float = None, low: float = None, source: str = "") -> None:
+        """단일 일봉 기록 (coverage는 변경하지 않음 - 모의투자 종가 기록용)"""
+        self.put_rows(code, [(date, close, high, low)], source)
+
+    # ── 보충 ──
+
+    def coverage(self, codes: Iterable[str]) -> Dict[str, Tuple[str, str]]:
+        codes = list(dict.fromkeys(codes))
+        if not codes:
+            return {}
+        marks = ",".join("?" * len(codes))
+        with self._lock:
+            rows = self._conn.execute(f"SELECT code, start, end FROM coverage WHERE code IN ({marks})", codes).fetchall()
+        return {code: (start, end) for code, start, end in rows}
+
+    def ensure(self, codes: Iterable[str], start: str, end: str, backend: Optional[PriceBackend] = None) -> int:
+        """start~end 구간 중 저장소에 없는 앞/뒤 구간만 백엔드에서 받아 저장
+
+        같은 누락 구간을 가진 종목끼리 묶어 구간별로 한 번씩만 백엔드를 호출한다.
+        coverage는 백엔드가 행을 돌려준 코드만 갱신한다.
+        backend를 주면 저장소 기본 백엔드 대신 사용한다 (지수는 index_series가 KIS로만 보충).
+
+        Returns:
+            새로 저장한 행 수
+        """
+        backend = backend or self.backend
+        codes = list(dict.fromkeys(codes))
+        covered = self.coverage(codes)
+        gaps: Dict[Tuple[str, str], List[str]] = {}
+        for code in codes:
+            if code not in covered:
+                gaps.setdefault((start, end), []).append(code)
+                continue
+            cov_start, cov_end = covered[code]
+            if start < cov_start:
+                gaps.setdefault((start, _shift(cov_start, -1)), []).append(code)
+            if end > cov_end:
+                gaps.setdefault((_shift(cov_end, 1), end), []).append(code)
+
+        # 오늘 일봉은 확정 전이므로 coverage는 어제까지만 인정
+        settled = _shift(datetime.now(KST).strftime("%Y-%m-%d"), -1)
+        stored = 0
+        for (gap_start, gap_end), gap_codes in gaps.items():
+            fetched = backend.fetch(gap_codes, gap_start, gap_end)
+            if fetched is None:
+                continue
+            for code, rows in fetched.items():
+                stored += self.put_rows(code, rows, backend.name)
+            cov_end = min(gap_end, settled)
+            if cov_end < gap_start:
+                continue
+            # 행을 돌려받은 코드만 수집 구간 인정 (빈 응답/개별 실패 코드는 다음 실행에 다시 조회)
+            with self._lock, self._conn:
+                for code in gap_codes:
+                    if code not in fetched:
+                        continue
+                    prev = covered.get(code)
+                    new = (min(gap_start, prev[0]), max(cov_end, prev[1])) if prev else (gap_start, cov_end)
+                    covered[code] = new
+                    self._conn.execute("INSERT OR REPLACE INTO coverage (code, start, end) VALUES (?, ?, ?)", (code, *new))
+
+        if gaps:
+            print(f"  ✓ 가격 저장소 보충: {sum(len(c) for c in gaps.values())}건 구간 조회, {stored}행 저장 ({backend.name})")
+        return stored
+
+    # ── 조회 ──
+
+    def frame(self, codes: Iterable[str], start: str, end: str, field: str = "close") -> pd.DataFrame:
+        """날짜 × 코드 가격 표 (field: close/high/low)"""
+        if field not in ("close", "high", "low"):
+            raise ValueError(f"지원하지 않는 필드: {field}")
+        codes = list(dict.fromkeys(codes))
+        if not codes:
+            return pd.DataFrame()
+        marks = ",".join("?" * len(codes))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT date, code, {field} FROM daily_prices "
+                f"WHERE code IN ({marks}) AND date BETWEEN ? AND ? ORDER BY date",
+                [*codes, start, end],
+            ).fetchall()
+        if not rows:
+            return pd.DataFrame(columns=codes, dtype=float)
+        long = pd.DataFrame(rows, columns=["date", "code", field])
+        return long.pivot(index="date", columns="code", values=field).astype(float)
+
+    def returns(self, codes: Iterable[str], start: str, end: str) -> pd.Series:
+        """구간 첫 종가 대비 마지막 종가 수익률(%) - 전 종목 벡터 연산
+
+        종가가 2개 미만이거나 첫 종가가 0 이하인 종목은 제외한다.
+        """
+        closes = self.frame(codes, start, end)
+        if closes.empty:
+            return pd.Series(dtype=float)
+        first = closes.bfill().iloc[0]
+        last = closes.ffill().iloc[-1]
+        valid = (closes.count() >= 2) & (first > 0)
+        return (((last - first) / first) * 100).where(valid).dropna().round(2)
+
+
+_shared_store: Optional[PriceStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def get_price_store() -> PriceStore:
+    """프로세스 공용 가격 저장소 (종료 시 연결 정리)"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = PriceStore()
+            atexit.register(_shared_store.close)
+        return _shared_store
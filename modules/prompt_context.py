@@ -0,0 +1,184 @@
+"""
+토큰 예산 기반 프롬프트 컨텍스트 빌더
+
+종목 데이터를 종목당 한 줄의 압축 테이블(파이프 구분 + 헤더 범례)로 인코딩하고,
+관련도(거래대금 순위, 여러 랭킹 동시 포함, 테마 대장주)가 낮은 행부터 제거하여
+지정한 토큰 예산 안에 맞춘다.
+"""
+import math
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# 종목 컨텍스트 기본 토큰 예산 (환경변수로 조정 가능)
+STOCK_CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_STOCK_TOKEN_BUDGET", "6000") or 6000)
+FORECAST_CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_FORECAST_TOKEN_BUDGET", "8000") or 8000)
+
+_HANGUL_RE = re.compile(r"[가-힣ㄱ-ㅎㅏ-ㅣ]")
+
+# 랭킹 목록 약어 (순위 컬럼에서 사용)
+RANK_LABELS = {
+    "rising": "상",
+    "falling": "하",
+    "volume": "량",
+    "trading_value": "대",
+    "fluctuation": "률",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 수 근사치 (한글 1자 ≈ 1토큰, 그 외 4자 ≈ 1토큰)"""
+    if not text:
+        return 0
+    hangul = len(_HANGUL_RE.findall(text))
+    return hangul + math.ceil((len(text) - hangul) / 4)
+
+
+def fmt_qty(value: Optional[float]) -> str:
+    """수량 압축 표기 (만 단위, 부호 포함)"""
+    if value is None:
+        return "-"
+    if value == 0:
+        return "0"
+    if abs(value) >= 10_000:
+        return f"{value / 10_000:+.1f}만"
+    return f"{int(value):+d}"
+
+
+def fmt_num(value: Optional[float], digits: int = 1) -> str:
+    """일반 숫자 표기 (None → -)"""
+    if value is None:
+        return "-"
+    if isinstance(value, float) and not value.is_integer():
+        return f"{value:.{digits}f}"
+    return f"{int(value)}"
+
+
+class Table:
+    """관련도 점수를 가진 행들의 압축 테이블 섹션"""
+
+    def __init__(self, title: str, columns: Sequence[str], legend: str = "", min_rows: int = 0):
+        """
+        Args:
+            title: 섹션 제목 ("## " 접두어 없이)
+            columns: 컬럼명
+            legend: 컬럼 약어 설명 (헤더 아래 한 줄)
+            min_rows: 예산 초과 시에도 유지할 상위 행 수
+        """
+        self.title = title
+        self.columns = list(columns)
+        self.legend = legend
+        self.min_rows = min_rows
+        self.rows: List[Tuple[float, List[str]]] = []
+
+    def add(self, score: float, values: Iterable[Any]) -> None:
+        self.rows.append((score, ["-" if v is None or v == "" else str(v) for v in values]))
+
+    def sorted_rows(self) -> List[Tuple[float, List[str]]]:
+        """관련도 내림차순 (동점이면 추가 순서 유지)"""
+        return sorted(self.rows, key=lambda r: -r[0])
+
+    @staticmethod
+    def render_row(values: List[str]) -> str:
+        return "|".join(values)
+
+    def render(self, keep: Optional[int] = None) -> str:
+        rows = self.sorted_rows()
+        if keep is not None:
+            rows = rows[:keep]
+        if not rows:
+            return ""
+        lines = [f"\n## {self.title}"]
+        if self.legend:
+            lines.append(f"범례: {self.legend}")
+        lines.append(self.render_row(self.columns))
+        lines.extend(self.render_row(values) for _, values in rows)
+        return "\n".join(lines)
+
+
+def fit_to_budget(blocks: Sequence[Any], budget_tokens: int) -> str:
+    """고정 텍스트 블록과 Table을 순서대로 이어 붙이고, 예산 초과 시 저관련도 행부터 제거
+
+    Args:
+        blocks: str(항상 유지) 또는 Table
+        budget_tokens: 전체 토큰 예산
+    """
+    tables = [b for b in blocks if isinstance(b, Table)]
+    keep = {id(t): len(t.rows) for t in tables}
+
+    def _render() -> str:
+        parts = []
+        for b in blocks:
+            text = b.render(keep[id(b)]) if isinstance(b, Table) else b
+            if text:
+                parts.append(text)
+        return "\n".join(parts).strip("\n")
+
+    total = estimate_tokens(_render())
+    if total <= budget_tokens:
+        return _render()
+
+    # 모든 테이블의 제거 가능 행을 관련도 오름차순으로 모아 한 행씩 제거
+    removable = []
+    for t in tables:
+        for rank, (score, values) in enumerate(t.sorted_rows()):
+            if rank >= t.min_rows:
+                removable.append((score, -rank, t, values))
+    removable.sort(key=lambda r: (r[0], r[1]))
+
+    for score, _, table, values in removable:
+        if total <= budget_tokens:
+            break
+        keep[id(table)] -= 1
+        total -= estimate_tokens(Table.render_row(values)) + 1
+
+    return _render()
+
+
+def ranking_positions(stock_data: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """종목코드 → {랭킹 목록: 순위(1부터)}"""
+    positions: Dict[str, Dict[str, int]] = {}
+
+    def _mark(label: str, stocks: List[Dict[str, Any]]):
+        for idx, s in enumerate(stocks, 1):
+            code = s.get("code")
+            if code:
+                positions.setdefault(code, {}).setdefault(label, idx)
+
+    for label in ("rising", "falling", "volume", "trading_value"):
+        for market in ("kospi", "kosdaq"):
+            _mark(label, (stock_data.get(label) or {}).get(market, []))
+    fluc = stock_data.get("fluctuation") or {}
+    for key in ("kospi_up", "kosdaq_up"):
+        _mark("fluctuation", fluc.get(key, []))
+    return positions
+
+
+def relevance_score(positions: Dict[str, int], is_leader: bool = False, has_fundamental: bool = False) -> float:
+    """관련도 점수: 거래대금 순위 > 상승률 순위 > 거래량/등락률 순위, 교차 포함·대장주 가산"""
+    score = 0.0
+    tv = positions.get("trading_value")
+    if tv:
+        score += 3.0 * max(0, 31 - tv) / 30
+    rising = positions.get("rising")
+    if rising:
+        score += 2.0 * max(0, 11 - rising) / 10
+    for label in ("volume", "fluctuation"):
+        rank = positions.get(label)
+        if rank:
+            score += 1.0 * max(0, 21 - rank) / 20
+    # 여러 랭킹 동시 포함 가산 (거래대금+상승률 교차는 추가 가산)
+    score += 0.5 * max(0, len(positions) - 1)
+    if tv and positions.get("fluctuation"):
+        score += 2.0
+    if is_leader:
+        score += 3.0
+    if has_fundamental:
+        score += 0.5
+    return score
+
+
+def rank_flags(positions: Dict[str, int]) -> str:
+    """순위 컬럼 문자열 (예: 대3 상1 량5)"""
+    order = ("trading_value", "rising", "volume", "fluctuation", "falling")
+    return " ".join(f"{RANK_LABELS[k]}{positions[k]}" for k in order if k in positions) or "-"
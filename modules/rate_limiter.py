@@ -0,0 +1,50 @@
+"""
+스레드 안전 토큰 버킷 Rate Limiter
+- 여러 워커 스레드가 하나의 외부 API 쿼터를 공유할 때 사용
+"""
+import threading
+import time
+
+
+class TokenBucket:
+    """토큰 버킷 방식 호출 제한
+
+    rate개/초로 토큰이 채워지고 최대 capacity개까지 누적된다.
+    acquire()는 토큰이 생길 때까지 호출 스레드를 대기시킨다.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        """
+        Args:
+            rate: 초당 허용 호출 수
+            capacity: 순간 허용 버스트 크기
+        """
+        if rate <= 0:
+            raise ValueError("rate는 0보다 커야 합니다.")
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0):
+        """토큰 확보 (부족하면 대기)"""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def penalize(self, seconds: float):
+        """429 등 서버 측 제한 응답 시 모든 워커를 잠시 멈추게 함"""
+        with self._lock:
+            self._refill()
+            self._tokens -= seconds * self.rate
@@ -0,0 +1,82 @@
+"""
+실행 프로파일 (단계별 소요 시간 + 카운터)
+
+main.py / forecast_main.py 실행 중 단계 경과 시간과 외부 호출 통계
+(LLM 캐시 적중, API 호출 수 등)를 모아 실행 종료 시 한 번에 출력한다.
+"""
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+
+class RunProfile:
+    """스레드 안전 실행 프로파일"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self._last_checkpoint = self.started_at
+        self.stages: List[Tuple[str, float]] = []
+        self.counters: "OrderedDict[str, float]" = OrderedDict()
+
+    def count(self, name: str, value: float = 1) -> None:
+        """카운터 증가 (예: "llm_cache.hit")"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def checkpoint(self, name: str) -> None:
+        """직전 checkpoint 이후 경과 시간을 name 단계로 기록"""
+        now = time.monotonic()
+        with self._lock:
+            self.stages.append((name, now - self._last_checkpoint))
+            self._last_checkpoint = now
+
+    @contextmanager
+    def stage(self, name: str):
+        """with 블록 소요 시간을 단계로 기록"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages.append((name, time.monotonic() - started))
+                self._last_checkpoint = time.monotonic()
+
+    def snapshot(self) -> Dict:
+        """현재까지의 프로파일 (벤치마크/리포트용)"""
+        with self._lock:
+            return {
+                "total_sec": round(time.monotonic() - self.started_at, 3),
+                "stages": [{"name": n, "sec": round(s, 3)} for n, s in self.stages],
+                "counters": dict(self.counters),
+            }
+
+    def report(self) -> None:
+        """콘솔 출력"""
+        snap = self.snapshot()
+        print("\n[실행 프로파일]")
+        print(f"  총 소요: {snap['total_sec']:.1f}초")
+        for st in snap["stages"]:
+            print(f"  - {st['name']}: {st['sec']:.1f}초")
+        if snap["counters"]:
+            print("  카운터:")
+            for name, value in snap["counters"].items():
+                shown = f"{value:.2f}" if isinstance(value, float) and not value.is_integer() else f"{int(value)}"
+                print(f"  - {name}: {shown}")
+
+
+_profile = RunProfile()
+
+
+def get_run_profile() -> RunProfile:
+    """프로세스 공용 실행 프로파일"""
+    return _profile
+
+
+def reset_run_profile() -> RunProfile:
+    """새 실행 프로파일로 교체 (벤치마크 반복 실행용)"""
+    global _profile
+    _profile = RunProfile()
+    return _profile
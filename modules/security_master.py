@@ -0,0 +1,291 @@
+"""
+종목 마스터 (코드 → 시장, ETF/ETN 여부, 업종, 상장주식수)
+
+KIS가 매일 배포하는 종목 마스터 파일(kospi_code.mst / kosdaq_code.mst)을 하루 한 번
+받아 .cache/security_master.sqlite에 저장하고, 프로세스당 한 번 메모리 dict로 올려
+시장/ETF 분류를 O(1) 조회로 처리한다. 순위 API(최대 30건)와 무관하게 전 종목
+유니버스(universe())도 여기서 정의한다.
+
+- 마스터에 없는 코드(당일 신규 상장 등)나 다운로드 실패 시에는 종목코드/종목명
+  규칙 추정(_guess_market, _guess_is_etf)으로 대체하고 결과를 메모해 둔다
+- KIS_MASTER_URL을 빈 값으로 두면 다운로드 없이 기존 캐시만 사용
+
+    python -m modules.security_master --refresh
+    python -m modules.security_master --universe KOSPI,KOSDAQ
+"""
+import argparse
+import atexit
+import io
+import os
+import sqlite3
+import sys
+import threading
+import zipfile
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import requests
+
+from config.settings import CACHE_DIR, KIS_MASTER_URL
+from modules.utils import KST
+
+SECURITY_MASTER_PATH = CACHE_DIR / "security_master.sqlite"
+
+
+class _Layout(NamedTuple):
+    """마스터 파일 한 줄의 뒷부분(고정폭 ASCII) 필드 위치"""
+
+    filename: str
+    tail: int           # 줄 끝(개행 제외)에서부터의 고정폭 영역 길이
+    halted: int         # 거래정지 여부 (Y/N)
+    listed_shares: Tuple[int, int]
+
+
+# KIS 샘플 파서(kis_kospi_code_mst.py / kis_kosdaq_code_mst.py)의 field_specs 기준
+# 앞부분: 단축코드(9) + 표준코드(12) + 한글명(가변), 뒷부분 첫 필드: 그룹코드(2), 시가총액규모(1), 지수업종 대분류(4)
+MASTER_LAYOUTS = {
+    "KOSPI": _Layout("kospi_code.mst", 227, 60, (113, 128)),
+    "KOSDAQ": _Layout("kosdaq_code.mst", 221, 55, (108, 123)),
+}
+
+# 증권 그룹코드: ST 주권, FS 외국주권, EF ETF, EN ETN, FE 해외ETF, EW ELW, RT 리츠, BC 수익증권 ...
+ETF_GROUPS = frozenset({"EF", "EN", "FE"})
+STOCK_GROUPS = frozenset({"ST", "FS"})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS securities (
+    code TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    market TEXT NOT NULL,
+    security_group TEXT NOT NULL,
+    sector TEXT,
+    listed_shares INTEGER,
+    halted INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class Security(NamedTuple):
+    code: str
+    name: str
+    market: str
+    security_group: str
+    sector: str
+    listed_shares: Optional[int]
+    halted: bool
+
+    @property
+    def is_etf(self) -> bool:
+        return self.security_group in ETF_GROUPS
+
+
+# ── 코드 규칙 추정 (마스터 미등록 코드용) ─────────────────────
+
+_ETF_KEYWORDS = (
+    "KODEX", "TIGER", "KBSTAR", "ARIRANG", "HANARO",
+    "SOL", "KINDEX", "KOSEF", "ACE", "PLUS", "RISE",
+    "ETN", "ETF", "선물", "인버스", "레버리지",
+    "채권", "국채", "회사채", "액티브",
+)
+
+
+def _guess_market(code: str) -> str:
+    """종목코드 규칙으로 시장 추정 (ETN: Q 시작, KOSDAQ: 주로 3~4 시작, 나머지 KOSPI)"""
+    if not code:
+        return "UNKNOWN"
+    if code.startswith("Q"):
+        return "ETN"
+    if len(code) == 6 and code.isdigit():
+        return "KOSDAQ" if code[0] in ("3", "4") else "KOSPI"
+    return "UNKNOWN"
+
+
+def _guess_is_etf(code: str, name: str) -> bool:
+    """종목코드/종목명 키워드로 ETF/ETN 여부 추정"""
+    if code.startswith("Q"):
+        return True
+    if any(keyword in name for keyword in _ETF_KEYWORDS):
+        return True
+    # 특수 코드 형태 (0000D0 등)
+    return code.startswith("00") and not code[2:].isdigit()
+
+
+# ── 마스터 파일 파싱 ───────────────────────────────────────────
+
+def parse_master(raw: bytes, market: str) -> List[Security]:
+    """.mst 파일 내용 → Security 목록 (cp949, 줄 끝 고정폭 영역은 ASCII)"""
+    layout = MASTER_LAYOUTS[market]
+    start, end = layout.listed_shares
+    securities = []
+    for line in raw.decode("cp949", errors="replace").splitlines():
+        if len(line) <= layout.tail + 9:
+            continue
+        head, tail = line[:-layout.tail], line[-layout.tail:]
+        code = head[0:9].strip()
+        if not code:
+            continue
+        shares = tail[start:end].strip()
+        securities.append(Security(
+            code=code,
+            name=head[21:].strip(),
+            market=market,
+            security_group=tail[0:2],
+            sector=tail[3:7].strip(),
+            listed_shares=int(shares) if shares.isdigit() else None,
+            halted=tail[layout.halted] == "Y",
+        ))
+    return securities
+
+
+def download_master(market: str, base_url: str = KIS_MASTER_URL, timeout: int = 30) -> List[Security]:
+    filename = MASTER_LAYOUTS[market].filename
+    response = requests.get(f"{base_url}/{filename}.zip", timeout=timeout)
+    response.raise_for_status()
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        return parse_master(archive.read(filename), market)
+
+
+# ── 마스터 저장소 ───────────────────────────────────────────────
+
+class SecurityMaster:
+    """SQLite 종목 마스터 + 메모리 조회 테이블"""
+
+    def __init__(self, path=SECURITY_MASTER_PATH, base_url: str = KIS_MASTER_URL):
+        self.path = str(path)
+        self.base_url = base_url
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._by_code: Optional[Dict[str, Security]] = None
+        self._guessed: Dict[Tuple[str, str], Tuple[str, bool]] = {}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @property
+    def fetched_date(self) -> str:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'fetched_date'").fetchone()
+        return row[0] if row else ""
+
+    def replace_all(self, securities: Iterable[Security], fetched_date: str) -> int:
+        rows = [
+            (s.code, s.name, s.market, s.security_group, s.sector, s.listed_shares, int(s.halted))
+            for s in securities
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM securities")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO securities "
+                "(code, name, market, security_group, sector, listed_shares, halted) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fetched_date', ?)", (fetched_date,))
+            self._by_code = None
+        return len(rows)
+
+    def refresh(self, force: bool = False) -> bool:
+        """오늘(KST) 받은 마스터가 없으면 KOSPI/KOSDAQ 파일을 다시 받아 교체
+
+        한 시장이라도 실패하면 기존 마스터를 그대로 둔다.
+        """
+        today = datetime.now(KST).strftime("%Y-%m-%d")
+        if not self.base_url or (not force and self.fetched_date == today):
+            return False
+        securities: List[Security] = []
+        try:
+            for market in MASTER_LAYOUTS:
+                securities.extend(download_master(market, self.base_url))
+        except (requests.RequestException, zipfile.BadZipFile, KeyError) as e:
+            print(f"  ⚠ 종목 마스터 다운로드 실패 (기존 마스터 사용): {e}")
+            return False
+        count = self.replace_all(securities, today)
+        print(f"  ✓ 종목 마스터 갱신: {count}종목 ({today})")
+        return True
+
+    def _table(self) -> Dict[str, Security]:
+        if self._by_code is None:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT code, name, market, security_group, sector, listed_shares, halted FROM securities"
+                ).fetchall()
+            self._by_code = {
+                sys.intern(code): Security(code, name, sys.intern(market), sys.intern(group), sector, shares, bool(halted))
+                for code, name, market, group, sector, shares, halted in rows
+            }
+        return self._by_code
+
+    # ── 조회 ──
+
+    def get(self, code: str) -> Optional[Security]:
+        return self._table().get(code)
+
+    def classify(self, code: str, name: str = "") -> Tuple[str, bool]:
+        """(시장, ETF/ETN 여부) - 마스터 조회, 미등록 코드는 코드 규칙 추정"""
+        security = self._table().get(code)
+        if security is not None:
+            return security.market, security.is_etf
+        key = (code, name)
+        guessed = self._guessed.get(key)
+        if guessed is None:
+            guessed = self._guessed[key] = (_guess_market(code), _guess_is_etf(code, name))
+        return guessed
+
+    def universe(
+        self,
+        markets: Iterable[str] = ("KOSPI", "KOSDAQ"),
+        include_etf: bool = False,
+        include_halted: bool = False,
+    ) -> List[str]:
+        """전 종목 유니버스 코드 목록 (기본: 코스피·코스닥 주권, 거래정지 제외)"""
+        markets = {m.upper() for m in markets}
+        return sorted(
+            s.code for s in self._table().values()
+            if s.market in markets
+            and (s.security_group in STOCK_GROUPS or (include_etf and s.is_etf))
+            and (include_halted or not s.halted)
+        )
+
+    def __len__(self) -> int:
+        return len(self._table())
+
+
+_shared_master: Optional[SecurityMaster] = None
+_shared_master_lock = threading.Lock()
+
+
+def get_security_master() -> SecurityMaster:
+    """프로세스 공유 종목 마스터 (첫 호출 시 하루 1회 갱신)"""
+    global _shared_master
+    with _shared_master_lock:
+        if _shared_master is None:
+            _shared_master = SecurityMaster()
+            _shared_master.refresh()
+            atexit.register(_shared_master.close)
+        return _shared_master
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KIS 종목 마스터 갱신/조회")
+    parser.add_argument("--refresh", action="store_true", help="오늘 받은 마스터가 있어도 다시 다운로드")
+    parser.add_argument("--universe", default="", help="유니버스 시장 목록 (예: KOSPI,KOSDAQ)")
+    parser.add_argument("--include-etf", action="store_true")
+    args = parser.parse_args()
+
+    master = SecurityMaster()
+    master.refresh(force=args.refresh)
+    print(f"[종목 마스터] {len(master)}종목 ({master.fetched_date or '미수집'})")
+    if args.universe:
+        codes = master.universe(args.universe.split(","), include_etf=args.include_etf)
+        print(f"  유니버스 {args.universe}: {len(codes)}종목")
+        print("  " + " ".join(codes[:20]) + (" ..." if len(codes) > 20 else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+종목별 공매도 일별추이 수집 + 로컬 시계열 저장소
+
+daily-short-sale API는 기간 조회가 되므로 종목당 한 번 호출로 여러 날을 받는다.
+.cache/short_selling.sqlite에 (code, date) 행으로 쌓아 두고, 종목별로 확정된 마지막
+날짜(coverage) 이후 구간만 다음 실행에서 보충한다. 당일 행은 장 마감 후
+SHORT_SALE_SETTLE_HOUR(KST) 이후에 받은 것만 확정으로 본다.
+
+- 오늘 비중/수량은 저장소의 당일 행에서 읽는다 (당일 행이 없으면 해당 종목 제외)
+- 추세 지표: 최근 5거래일 평균 비중 (avg_ratio_5d)
+- 종목별 조회는 ThreadPoolExecutor로 병렬 실행 (KISClient 공용 호출 간격 제한 적용)
+"""
+import atexit
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from config.settings import CACHE_DIR
+from modules.utils import KST
+
+SHORT_SALE_STORE_PATH = CACHE_DIR / "short_selling.sqlite"
+SHORT_SALE_WINDOW_DAYS = 30  # 처음 보는 종목의 조회 구간 (달력일, 약 20거래일)
+SHORT_SALE_SETTLE_HOUR = 18  # 이 시각(KST) 이후 받은 당일 행은 확정으로 간주
+SHORT_SALE_WORKERS = 4
+
+# 공매도 행: (날짜 YYYY-MM-DD, 거래량 대비 비중 %, 공매도 체결 수량)
+ShortSaleRow = Tuple[str, float, int]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS short_sales (
+    code TEXT NOT NULL,
+    date TEXT NOT NULL,
+    ratio REAL NOT NULL,
+    volume INTEGER NOT NULL,
+    PRIMARY KEY (code, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    code TEXT PRIMARY KEY,
+    end TEXT NOT NULL
+);
+"""
+
+
+def _iso(date_str: str) -> str:
+    """YYYYMMDD → YYYY-MM-DD"""
+    return f"{date_str[:4]}-{date_str[4:6]}-{date_str[6:8]}"
+
+
+def parse_short_sale_rows(output2: List[Dict[str, Any]]) -> List[ShortSaleRow]:
+    """daily-short-sale output2 → ShortSaleRow 목록 (값이 깨진 행은 제외)"""
+    rows = []
+    for item in output2 or []:
+        date_str = item.get("stck_bsop_date", "")
+        if len(date_str) != 8:
+            continue
+        try:
+            rows.append((_iso(date_str), float(item.get("ssts_vol_rlim", "0")), int(item.get("ssts_cntg_qty", "0"))))
+        except (ValueError, TypeError):
+            continue
+    return rows
+
+
+class ShortSellingStore:
+    """SQLite 공매도 일별 시계열"""
+
+    def __init__(self, path=SHORT_SALE_STORE_PATH):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def put_rows(self, code: str, rows: Iterable[ShortSaleRow], settled_end: Optional[str] = None) -> int:
+        """행 저장 + (주어지면) 확정 구간 끝 갱신"""
+        rows = [(code, d, r, v) for d, r, v in rows]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO short_sales (code, date, ratio, volume) VALUES (?, ?, ?, ?)", rows,
+            )
+            if settled_end:
+                self._conn.execute(
+                    "INSERT INTO coverage (code, end) VALUES (?, ?) "
+                    "ON CONFLICT(code) DO UPDATE SET end = max(end, excluded.end)",
+                    (code, settled_end),
+                )
+        return len(rows)
+
+    def settled(self, codes: Iterable[str]) -> Dict[str, str]:
+        codes = list(dict.fromkeys(codes))
+        if not codes:
+            return {}
+        marks = ",".join("?" * len(codes))
+        with self._lock:
+            rows = self._conn.execute(f"SELECT code, end FROM coverage WHERE code IN ({marks})", codes).fetchall()
+        return dict(rows)
+
+    def series(self, code: str, limit: int = 20) -> List[ShortSaleRow]:
+        """최근 limit개 행 (최신순)"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT date, ratio, volume FROM short_sales WHERE code = ? ORDER BY date DESC LIMIT ?", (code, limit),
+            ).fetchall()
+
+    def features(self, code: str, today: str) -> Optional[Dict[str, Any]]:
+        """오늘 비중/수량 + 5거래일 평균 비중 (오늘 행이 없거나 비중 0이면 None)"""
+        recent = self.series(code, 5)
+        if not recent or recent[0][0] != today or recent[0][1] <= 0:
+            return None
+        return {
+            "ratio": recent[0][1],
+            "volume": recent[0][2],
+            "avg_ratio_5d": round(sum(r for _, r, _ in recent) / len(recent), 2),
+            "days": len(recent),
+        }
+
+
+class ShortSellingCollector:
+    """종목별 공매도 기간 조회 → 저장소 보충 → 오늘 지표 반환"""
+
+    def __init__(self, client, store: Optional[ShortSellingStore] = None,
+                 window_days: int = SHORT_SALE_WINDOW_DAYS, max_workers: int = SHORT_SALE_WORKERS):
+        self.client = client
+        self.store = store or get_short_selling_store()
+        self.window_days = window_days
+        self.max_workers = max_workers
+
+    def _fetch(self, code: str, start: str, end: str) -> Optional[List[ShortSaleRow]]:
+        try:
+            resp = self.client.get_daily_short_sale(code, start.replace("-", ""), end.replace("-", ""))
+        except Exception:
+            return None
+        if resp.get("rt_cd") != "0":
+            return None
+        return parse_short_sale_rows(resp.get("output2", []))
+
+    def collect(self, codes: Iterable[str], now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+        """확정 구간 이후만 조회해 저장하고 {code: {"ratio", "volume", "avg_ratio_5d", "days"}} 반환"""
+        now = now or datetime.now(KST)
+        codes = [c for c in dict.fromkeys(codes) if c]
+        today = now.strftime("%Y-%m-%d")
+        settle_end = today if now.hour >= SHORT_SALE_SETTLE_HOUR else (now - timedelta(days=1)).strftime("%Y-%m-%d")
+        window_start = (now - timedelta(days=self.window_days)).strftime("%Y-%m-%d")
+
+        settled = self.store.settled(codes)
+        jobs: List[Tuple[str, str]] = []
+        for code in codes:
+            prev_end = settled.get(code)
+            start = window_start
+            if prev_end:
+                start = max(start, (datetime.strptime(prev_end, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d"))
+            if start <= today:
+                jobs.append((code, start))
+
+        def work(job: Tuple[str, str]) -> Tuple[str, Optional[List[ShortSaleRow]]]:
+            code, start = job
+            return code, self._fetch(code, start, today)
+
+        stored = failed = 0
+        if jobs:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for code, rows in executor.map(work, jobs):
+                    if rows is None:
+                        failed += 1
+                        continue
+                    stored += self.store.put_rows(code, rows, settled_end=settle_end)
+
+        print(f"  ✓ 공매도 일별추이: {len(jobs)}종목 조회 ({len(codes) - len(jobs)}종목 저장분 재사용), "
+              f"{stored}행 저장" + (f", {failed}종목 실패" if failed else ""))
+
+        result = {}
+        for code in codes:
+            features = self.store.features(code, today)
+            if features:
+                result[code] = features
+        return result
+
+
+_shared_store: Optional[ShortSellingStore] = None
+_shared_store_lock = threading.Lock()
+
+
+def get_short_selling_store() -> ShortSellingStore:
+    """프로세스 공용 공매도 저장소"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = ShortSellingStore()
+            atexit.register(_shared_store.close)
+        return _shared_store
@@ -362,8 +362,9 @@ SHORT_SELLING_WARNING_THRESHOLD = 5.0  # 5% 이상이면 경고
 def check_short_selling(
     short_ratio: Optional[float] = None,
     short_volume: Optional[int] = None,
+    avg_ratio_5d: Optional[float] = None,
 ) -> Dict[str, Any]:
-    """공매도 비중 경고 (전체 거래량 대비 5% 이상이면 경고)"""
+    """공매도 비중 경고 (전체 거래량 대비 5% 이상이면 경고, 5거래일 평균 비중은 사유에 병기)"""
     result = {"met": False, "warning": True, "reason": None}
     if short_ratio is not None and short_ratio >= SHORT_SELLING_WARNING_THRESHOLD:
         result["met"] = True
@@ -372,6 +373,8 @@ def check_short_selling(
             result["reason"] += f" | 공매도 수량 {short_volume:,}주"
     elif short_ratio is not None and short_ratio > 0:
         result["reason"] = f"공매도 비중 {short_ratio:.1f}% (정상 범위)"
+    if result["reason"] and avg_ratio_5d is not None:
+        result["reason"] += f" | 5일 평균 {avg_ratio_5d:.1f}%"
     return result
 
 
@@ -482,7 +485,7 @@ def evaluate_stock_criteria(
         fundamental: 펀더멘탈 데이터 (w52_hgpr, pgtr_ntby_qty, hts_avls 등)
         investor_info: 수급 데이터 (foreign_net, institution_net)
         trading_value_top30_codes: 거래대금 TOP30 종목코드 집합
-        short_selling_info: 공매도 데이터 (ratio, volume)
+        short_selling_info: 공매도 데이터 (ratio, volume, avg_ratio_5d)
 
     Returns:
         9개 기준 평가 결과 dict
@@ -500,6 +503,7 @@ def evaluate_stock_criteria(
 
     short_ratio = short_selling_info.get("ratio") if short_selling_info else None
     short_volume = short_selling_info.get("volume") if short_selling_info else None
+    short_avg_5d = short_selling_info.get("avg_ratio_5d") if short_selling_info else None
 
     ma_result = check_ma_alignment(current_price, daily_prices)
     ma_values = ma_result.get("ma_values", {})
@@ -517,7 +521,7 @@ def evaluate_stock_criteria(
         "program_trading": check_program_trading(pgtr),
         "top30_trading_value": check_top30_trading_value(stock.get("code", ""), trading_value_top30_codes),
         "market_cap": check_market_cap(market_cap),
-        "short_selling": check_short_selling(short_ratio, short_volume),
+        "short_selling": check_short_selling(short_ratio, short_volume, short_avg_5d),
         "overheating": check_overheating(current_price, change_rate, volume_rate, rsi, ma_values),
         "reverse_alignment": check_reverse_alignment(current_price, ma_values),
     }
@@ -3,6 +3,8 @@
 """
 from typing import Dict, List, Any
 
+from modules.stock_record import ranked
+
 
 class StockFilter:
     """거래량과 등락률 데이터를 교차 필터링하여 상위 종목 추출"""
@@ -35,11 +37,11 @@ class StockFilter:
         # 등락률 TOP30 종목 코드 집합
         fluctuation_codes = self._get_stock_codes(fluctuation_stocks)
 
-        # 거래량 순위 기준으로 순회하며 교집합 추출 (원본 보존을 위해 복사)
+        # 거래량 순위 기준으로 순회하며 교집합 추출 (원본 보존: 복사 대신 순위 뷰)
         result = []
         for stock in volume_stocks:
             if stock["code"] in fluctuation_codes:
-                result.append({**stock, "rank": len(result) + 1})
+                result.append(ranked(stock, len(result) + 1))
                 if len(result) >= limit:
                     break
 
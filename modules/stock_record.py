@@ -0,0 +1,156 @@
+"""
+순위 종목 레코드 - 파이프라인 단계 간 공유하는 경량 종목 행
+
+kis_rank가 만드는 순위 행은 12~15개 키의 dict였고, 시장/방향별 재정렬과
+교차 필터(stock_filter)를 거칠 때마다 rank만 바꾸려고 dict 전체를 복사했다.
+
+- StockRecord: __slots__ 기반 종목 행 (code/name/market/direction 문자열 intern)
+- RankView: 레코드를 복사하지 않고 rank(와 direction)만 덮어쓰는 뷰
+
+둘 다 Mapping이라 기존 dict 사용처(stock["code"], stock.get(...), {**stock})는
+그대로 동작한다. JSON 경계(data_exporter, api/server)에서는 json_default로
+한 번만 dict로 변환한다.
+"""
+import sys
+from collections.abc import Mapping, MutableMapping
+from typing import Any, Dict, Iterator, Optional
+
+# 키 순서 = 기존 dict 행의 키 순서 (JSON 출력 동일 유지)
+STOCK_FIELDS = (
+    "rank",
+    "code",
+    "name",
+    "current_price",
+    "change_rate",
+    "change_price",
+    "volume",
+    "volume_rate",
+    "trading_value",
+    "market",
+    "is_etf",
+    "direction",
+    "consecutive_up_days",
+    "consecutive_down_days",
+)
+_FIELD_SET = frozenset(STOCK_FIELDS)
+_INTERNED = ("code", "name", "market", "direction")
+_MISSING = object()
+
+
+class StockRecord(MutableMapping):
+    """순위 종목 행 (설정된 필드만 키로 노출, 그 외 키는 _extra에 보관)"""
+
+    __slots__ = STOCK_FIELDS + ("_extra",)
+
+    def __init__(self, **fields: Any):
+        self._extra: Optional[Dict[str, Any]] = None
+        for key, value in fields.items():
+            self[key] = value
+
+    def __getitem__(self, key: str) -> Any:
+        if key in _FIELD_SET:
+            value = getattr(self, key, _MISSING)
+            if value is not _MISSING:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in _FIELD_SET:
+            if key in _INTERNED and isinstance(value, str):
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in STOCK_FIELDS:
+            if getattr(self, key, _MISSING) is not _MISSING:
+                yield key
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"StockRecord({self.to_json()!r})"
+
+    def copy(self) -> "StockRecord":
+        return StockRecord(**self.to_json())
+
+    def to_json(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self}
+
+
+class RankView(Mapping):
+    """레코드의 rank/direction만 바꿔 보여주는 읽기 전용 뷰 (복사 없음)"""
+
+    __slots__ = ("record", "rank", "direction")
+
+    def __init__(self, record: StockRecord, rank: int, direction: Optional[str] = None):
+        self.record = record
+        self.rank = rank
+        self.direction = sys.intern(direction) if direction else None
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "rank":
+            return self.rank
+        if key == "direction" and self.direction is not None:
+            return self.direction
+        return self.record[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield "rank"
+        has_direction = False
+        for key in self.record:
+            if key == "rank":
+                continue
+            has_direction = has_direction or key == "direction"
+            yield key
+        if self.direction is not None and not has_direction:
+            yield "direction"
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"RankView({self.to_json()!r})"
+
+    def to_json(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self}
+
+
+def ranked(stock: Mapping, rank: int, direction: Optional[str] = None) -> Mapping:
+    """stock을 rank(, direction) 순위로 보는 뷰 - 뷰의 뷰는 원본 레코드를 바로 가리킨다
+
+    dict 행(JSON에서 읽은 과거 데이터 등)은 기존처럼 복사본을 돌려준다.
+    """
+    if isinstance(stock, RankView):
+        return RankView(stock.record, rank, direction or stock.direction)
+    if isinstance(stock, StockRecord):
+        return RankView(stock, rank, direction)
+    if direction:
+        return {**stock, "rank": rank, "direction": direction}
+    return {**stock, "rank": rank}
+
+
+def json_default(obj: Any) -> Any:
+    """json.dump(s)의 default 훅 - StockRecord/RankView를 dict로 변환"""
+    if isinstance(obj, (StockRecord, RankView)):
+        return obj.to_json()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
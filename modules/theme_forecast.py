@@ -6,32 +6,29 @@
 """
 import json
 import re
-import time
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 
-from config.settings import GEMINI_API_KEY_1, GEMINI_API_KEY_2, GEMINI_API_KEY_3, GEMINI_API_KEY_4, GEMINI_API_KEY_5
+from modules import llm_cache
+from modules.gemini_pool import GeminiKeyPool, get_api_keys, get_key_pool
+from modules.gemini_stream import GEMINI_API_URL, IncrementalJSONArrayParser, generate_text, sanitize_json
+from modules.intraday_delta import (
+    DELTA_LABELS, apply_patch, build_snapshot, diff_snapshots, forecast_leader_codes, format_delta, has_changes,
+)
+from modules.theme_registry import get_theme_registry, normalize_key
+from modules.prompt_context import (
+    FORECAST_CONTEXT_TOKEN_BUDGET, Table, fit_to_budget, fmt_qty, relevance_score,
+)
 from modules.utils import KST
 
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
 ROOT_DIR = Path(__file__).parent.parent
 
 
 def _get_api_keys() -> List[str]:
     """사용 가능한 API 키 목록 반환"""
-    keys = [GEMINI_API_KEY_1, GEMINI_API_KEY_2, GEMINI_API_KEY_3, GEMINI_API_KEY_4, GEMINI_API_KEY_5]
-    return [k for k in keys if k]
-
-
-def _sanitize_json(text: str) -> str:
-    """Gemini가 반환한 비표준 JSON 정리 (trailing comma, 주석 제거)"""
-    # 한 줄 주석 제거 (// ...)
-    text = re.sub(r'//[^\n]*', '', text)
-    # trailing comma 제거: ,} 또는 ,]
-    text = re.sub(r',\s*([}\]])', r'\1', text)
-    return text
+    return get_api_keys()
 
 
 def _extract_json(text: str) -> Optional[Dict]:
@@ -57,7 +54,7 @@ def _extract_json(text: str) -> Optional[Dict]:
             pass
         # sanitize 후 재시도
         try:
-            return json.loads(_sanitize_json(raw))
+            return json.loads(sanitize_json(raw))
         except json.JSONDecodeError:
             continue
 
@@ -65,7 +62,7 @@ def _extract_json(text: str) -> Optional[Dict]:
 
 
 def _call_gemini(prompt: str, api_key: str) -> Optional[Dict]:
-    """Gemini API 호출 (Google Search grounding)"""
+    """Gemini API 호출 (Google Search grounding, 결과는 LLM 캐시에 저장)"""
     url = f"{GEMINI_API_URL}?key={api_key}"
     payload = {
         "contents": [{"parts": [{"text": prompt}]}],
@@ -78,42 +75,34 @@ def _call_gemini(prompt: str, api_key: str) -> Optional[Dict]:
         },
     }
 
-    resp = requests.post(url, json=payload, timeout=180)
-    resp.raise_for_status()
+    def _fetch() -> Optional[Dict]:
+        parser = _forecast_stream_parser()
+        text = generate_text(api_key, payload, on_text=parser.feed)
+        if not text.strip():
+            return None
 
-    data = resp.json()
-    candidates = data.get("candidates", [])
-    if not candidates:
-        return None
+        return _extract_json(text)
 
-    content = candidates[0].get("content", {})
-    parts = content.get("parts", [])
+    return llm_cache.cached_call(url, payload, _fetch)
 
-    text = ""
-    for part in parts:
-        if "text" in part:
-            text += part["text"]
 
-    if not text.strip():
-        return None
+_FORECAST_CATEGORY_LABELS = {"today": "오늘", "short_term": "단기", "long_term": "장기"}
 
-    return _extract_json(text)
 
+def _forecast_stream_parser() -> IncrementalJSONArrayParser:
+    """예측 JSON 스트림에서 테마가 완성될 때마다 진행 로그 출력"""
+    def _on_theme(category: str, theme: Dict[str, Any]) -> None:
+        print(f"    ↳ [{_FORECAST_CATEGORY_LABELS.get(category, category)}] {theme.get('theme_name', '?')} 수신")
 
-def _extract_text_from_response(data: Dict) -> str:
-    """Gemini 응답에서 텍스트 추출"""
-    candidates = data.get("candidates", [])
-    if not candidates:
-        return ""
-    parts = candidates[0].get("content", {}).get("parts", [])
-    return "".join(part.get("text", "") for part in parts)
+    return IncrementalJSONArrayParser(_FORECAST_CATEGORY_LABELS.keys(), on_item=_on_theme)
 
 
-def _call_gemini_phase1(prompt: str, api_key: str, use_search: bool = True) -> Optional[str]:
+def _call_gemini_phase1(prompt: str, api_key: str, use_search: bool = True, cache_salt: str = "") -> Optional[str]:
     """Phase 1: 자유 추론 (JSON 없이 텍스트 출력)
 
     Args:
         use_search: Google Search grounding 사용 여부 (기본 True)
+        cache_salt: LLM 캐시 구분값 (Self-Consistency 샘플마다 다르게 지정)
     """
     url = f"{GEMINI_API_URL}?key={api_key}"
     payload = {
@@ -126,17 +115,18 @@ def _call_gemini_phase1(prompt: str, api_key: str, use_search: bool = True) -> O
     if use_search:
         payload["tools"] = [{"google_search": {}}]
 
-    resp = requests.post(url, json=payload, timeout=180)
-    resp.raise_for_status()
+    def _fetch() -> Optional[str]:
+        text = generate_text(api_key, payload)
+        return text.strip() if text.strip() else None
 
-    text = _extract_text_from_response(resp.json())
-    return text.strip() if text.strip() else None
+    return llm_cache.cached_call(url, payload, _fetch, salt=cache_salt)
 
 
 def _call_gemini_phase2(reasoning: str, api_key: str) -> Optional[Dict]:
     """Phase 2: 추론 결과 → JSON 구조화 (Google Search 없음)
 
     response_schema 사용을 시도하고, 실패 시 기존 텍스트+regex fallback.
+    추론 텍스트에 대한 결정적 변환이므로 결과는 LLM 캐시에 저장.
     """
     prompt = _build_phase2_prompt(reasoning)
     url = f"{GEMINI_API_URL}?key={api_key}"
@@ -151,27 +141,29 @@ def _call_gemini_phase2(reasoning: str, api_key: str) -> Optional[Dict]:
         },
     }
 
-    try:
-        resp = requests.post(url, json=payload, timeout=120)
-        resp.raise_for_status()
-        text = _extract_text_from_response(resp.json())
+    def _fetch() -> Optional[Dict]:
+        # HTTP 오류(429 등)·응답 차단은 키 풀이 냉각/키 전환을 처리하도록 그대로 전달
+        try:
+            text = generate_text(api_key, payload, on_text=_forecast_stream_parser().feed)
+        except ValueError:
+            text = ""  # 응답 본문 JSON 파싱 실패 → 아래 fallback으로
         if text.strip():
             result = _extract_json(text)
             if result:
                 return result
-    except Exception:
-        pass  # response_schema 실패 시 아래 fallback으로
 
-    # Fallback: responseMimeType 없이 재시도
-    payload["generationConfig"].pop("responseMimeType", None)
-    resp = requests.post(url, json=payload, timeout=120)
-    resp.raise_for_status()
+        # Fallback: responseMimeType 없이 재시도
+        fallback_payload = {
+            **payload,
+            "generationConfig": {k: v for k, v in payload["generationConfig"].items() if k != "responseMimeType"},
+        }
+        text = generate_text(api_key, fallback_payload, on_text=_forecast_stream_parser().feed)
+        if not text.strip():
+            return None
 
-    text = _extract_text_from_response(resp.json())
-    if not text.strip():
-        return None
+        return _extract_json(text)
 
-    return _extract_json(text)
+    return llm_cache.cached_call(url, payload, _fetch)
 
 
 def _build_phase1_prompt(context: str) -> str:
@@ -297,23 +289,35 @@ def _build_phase2_prompt(reasoning: str) -> str:
 ```"""
 
 
-def _self_consistency_vote(prompt: str, api_key: str, n_samples: int = 3, use_search: bool = False) -> Optional[str]:
+def _self_consistency_vote(
+    prompt: str,
+    api_key: Optional[str] = None,
+    n_samples: int = 3,
+    use_search: bool = False,
+    key_pool: Optional[GeminiKeyPool] = None,
+) -> Optional[str]:
     """Phase 1을 n_samples회 호출 → 2회 이상 등장 테마만 채택하여 합의 텍스트 생성
 
     투표 통과 테마가 없으면 첫 번째 응답 그대로 반환.
     use_search: 투표 호출에서 Google Search 사용 여부 (기본 False — 이미 검색된 결과를 입력받으므로)
+    key_pool: 지정 시 샘플들을 풀의 여러 키에 분산하여 동시 호출 (미지정 시 api_key 단일 키 풀)
     """
-    responses = []
-    for i in range(n_samples):
-        try:
-            print(f"    Self-Consistency 호출 {i + 1}/{n_samples}...")
-            text = _call_gemini_phase1(prompt, api_key, use_search=use_search)
-            if text:
-                responses.append(text)
-            if i < n_samples - 1:
-                time.sleep(1)  # rate limit 배려
-        except Exception as e:
-            print(f"    ⚠ Self-Consistency 호출 {i + 1} 실패: {e}")
+    pool = key_pool or GeminiKeyPool([api_key])
+
+    def _sample(i: int) -> Optional[str]:
+        print(f"    Self-Consistency 호출 {i + 1}/{n_samples}...")
+        text = pool.call(
+            lambda key: _call_gemini_phase1(prompt, key, use_search=use_search, cache_salt=f"vote-{i}"),
+            label=f"Self-Consistency {i + 1}",
+        )
+        if not text:
+            print(f"    ⚠ Self-Consistency 호출 {i + 1} 실패")
+        return text
+
+    # 샘플 간 의존성이 없으므로 동시 실행 (키별 동시 호출 수/냉각은 풀이 관리)
+    with ThreadPoolExecutor(max_workers=n_samples) as executor:
+        samples = list(executor.map(_sample, range(n_samples)))
+    responses = [text for text in samples if text]
 
     if not responses:
         return None
@@ -321,16 +325,12 @@ def _self_consistency_vote(prompt: str, api_key: str, n_samples: int = 3, use_se
     if len(responses) == 1:
         return responses[0]
 
-    # 테마명 추출 및 투표
-    def _normalize_theme(name: str) -> str:
-        """투표 비교용 테마명 정규화 (괄호 제거, 특수문자→공백 통일)"""
-        name = re.sub(r'\([^)]*\)', '', name)
-        name = re.sub(r'[/·・\-]', ' ', name)
-        return re.sub(r'\s+', ' ', name).strip()
-
-    theme_counts = {}  # 정규화된 이름 → 등장 횟수
-    theme_original = {}  # 정규화된 이름 → 원본 이름 (첫 등장 기준)
-    theme_source = {}  # 정규화된 이름 → 첫 등장 응답 인덱스
+    # 테마명 추출 및 투표 (표기가 달라도 같은 테마는 레지스트리 ID로 합산)
+    # 후보는 자유 텍스트 조각(종목명·소제목 포함)이므로 레지스트리에 등록하지 않고 조회만 한다
+    registry = get_theme_registry()
+    theme_counts = {}  # 테마 ID → 등장 응답 수
+    theme_original = {}  # 테마 ID → 원본 이름 (첫 등장 기준)
+    theme_source = {}  # 테마 ID → 첫 등장 응답 인덱스
     for idx, text in enumerate(responses):
         # "테마명:" 또는 "테마: " 패턴, "**테마명**" 패턴 등에서 추출
         themes = set()
@@ -347,13 +347,17 @@ def _self_consistency_vote(prompt: str, api_key: str, n_samples: int = 3, use_se
                 if 2 <= len(candidate) <= 20:
                     themes.add(candidate)
 
+        # 한 응답 안에서 같은 테마의 다른 표기는 1표로 계산 (미등록 후보는 정규화 키로 묶음)
+        first_names = {}
         for theme in themes:
-            normalized = _normalize_theme(theme)
-            theme_counts[normalized] = theme_counts.get(normalized, 0) + 1
-            if normalized not in theme_original:
-                theme_original[normalized] = theme
-            if normalized not in theme_source:
-                theme_source[normalized] = idx
+            tid = registry.lookup(theme)
+            first_names.setdefault(tid if tid is not None else normalize_key(theme) or theme, theme)
+        for tid, theme in first_names.items():
+            theme_counts[tid] = theme_counts.get(tid, 0) + 1
+            if tid not in theme_original:
+                theme_original[tid] = theme
+            if tid not in theme_source:
+                theme_source[tid] = idx
 
     # 2회 이상 등장한 테마 필터
     consensus_themes = {t for t, c in theme_counts.items() if c >= 2}
@@ -385,6 +389,8 @@ def build_forecast_context(
     momentum_scores: Optional[List[Dict]] = None,
     rotation_data: Optional[List[Dict]] = None,
     global_news: Optional[List[Dict]] = None,
+    index_status: Optional[Dict[str, Dict]] = None,
+    token_budget: int = FORECAST_CONTEXT_TOKEN_BUDGET,
 ) -> str:
     """Gemini 입력용 예측 컨텍스트 구성
 
@@ -396,6 +402,8 @@ def build_forecast_context(
         momentum_scores: 테마 모멘텀 분석 결과
         rotation_data: 섹터 로테이션 분석 결과
         global_news: Finnhub 글로벌 시장 뉴스
+        index_status: 지수 시계열 이동평균 상태 {"KOSPI": {...}, "KOSDAQ": {...}} (index_series.ma_status)
+        token_budget: 컨텍스트 토큰 예산 (초과 시 거래대금 테이블 하위 종목부터 제외)
     """
     lines = []
 
@@ -424,8 +432,12 @@ def build_forecast_context(
     # 3. 전일 시장 환경
     lines.append("\n## 전일 시장 환경")
 
-    # 코스닥 지수
-    kosdaq = latest_data.get("kosdaq_index")
+    # 코스피/코스닥 지수 (지수 시계열 우선, 코스닥은 latest.json 값으로 폴백)
+    index_status = index_status or {}
+    kospi = index_status.get("KOSPI")
+    if kospi:
+        lines.append(f"- 코스피 지수: {kospi.get('current', 0):.2f} ({kospi.get('status', 'N/A')})")
+    kosdaq = index_status.get("KOSDAQ") or latest_data.get("kosdaq_index")
     if kosdaq:
         lines.append(f"- 코스닥 지수: {kosdaq.get('current', 0):.2f} ({kosdaq.get('status', 'N/A')})")
 
@@ -461,9 +473,12 @@ def build_forecast_context(
     if rotation_data:
         lines.append("\n## 섹터 로테이션 분석")
         for r in rotation_data:
+            lifecycle = ""
+            if r.get("lifetime_days", 0) > r["days_active"]:
+                lifecycle = f", 누적 {r['lifetime_days']}일(재등장 {r.get('recurrences', 0)}회, 최초 {r.get('first_seen', '')})"
             lines.append(
                 f"- {r['theme_name']}: {r['phase']} ({r['signal']}) "
-                f"활동 {r['days_active']}일, 거래대금 {r['volume_trend']}"
+                f"활동 {r['days_active']}일, 거래대금 {r['volume_trend']}{lifecycle}"
             )
 
     # 글로벌 시장 뉴스 (Finnhub)
@@ -475,61 +490,57 @@ def build_forecast_context(
             if summary:
                 lines.append(f"  {summary}")
 
-    # 4. 전일 거래대금 TOP10 + 수급
+    # 4. 전일 거래대금 TOP10 + 수급 (압축 테이블, 예산 초과 시 하위 순위부터 제외)
     tv_kospi = latest_data.get("trading_value", {}).get("kospi", [])[:10]
     tv_kosdaq = latest_data.get("trading_value", {}).get("kosdaq", [])[:10]
     investor_data = latest_data.get("investor_data", {})
+    leader_codes = {
+        stock.get("code", "")
+        for theme in (theme_analysis or {}).get("themes", [])
+        for stock in theme.get("leader_stocks", [])
+    }
 
-    if tv_kospi or tv_kosdaq:
-        lines.append("\n## 전일 거래대금 TOP10 + 수급")
-        for s in tv_kospi + tv_kosdaq:
+    tv_table = Table(
+        "전일 거래대금 TOP10 + 수급",
+        ["종목", "코드", "시장", "등락%", "대금억", "외인", "기관"],
+        legend="대금억=거래대금(억원), 외인·기관=순매수 수량(주, 만=1만주), -=데이터 없음",
+        min_rows=4,
+    )
+    for market, stocks in (("코스피", tv_kospi), ("코스닥", tv_kosdaq)):
+        for rank, s in enumerate(stocks, 1):
             code = s.get("code", "")
             tv = s.get("trading_value", 0)
-            tv_str = f"{tv / 100_000_000:,.0f}억원" if tv else "N/A"
-            market = "코스피" if s in tv_kospi else "코스닥"
             inv = investor_data.get(code, {})
-            foreign = inv.get("foreign_net")
-            institution = inv.get("institution_net")
-            inv_parts = []
-            if foreign and foreign != 0:
-                sign = "+" if foreign > 0 else ""
-                inv_parts.append(f"외국인:{sign}{foreign:,}주")
-            if institution and institution != 0:
-                sign = "+" if institution > 0 else ""
-                inv_parts.append(f"기관:{sign}{institution:,}주")
-            inv_str = f" | {' '.join(inv_parts)}" if inv_parts else ""
-            lines.append(
-                f"- {s.get('name')}({code}) {market} 등락:{s.get('change_rate', 0):+.2f}% "
-                f"거래대금:{tv_str}{inv_str}"
+            tv_table.add(
+                relevance_score({"trading_value": rank}, is_leader=code in leader_codes),
+                [
+                    s.get("name"), code, market, f"{s.get('change_rate', 0):+.2f}",
+                    f"{tv / 100_000_000:.0f}" if tv else None,
+                    fmt_qty(inv.get("foreign_net")), fmt_qty(inv.get("institution_net")),
+                ],
             )
 
-    # 5. 전일 테마별 대장주 상세 (대장주 선정 근거용)
+    # 5. 전일 테마별 대장주 상세 (대장주 선정 근거용, 예산과 무관하게 전부 유지)
+    leader_table = Table(
+        "전일 테마 대장주 상세 데이터",
+        ["테마", "종목", "코드", "외인", "기관", "정배열"],
+        legend="외인·기관=순매수 수량(주, 만=1만주), 정배열=이동평균 정배열 여부(O/X)",
+    )
     if theme_analysis:
         criteria_data = latest_data.get("criteria_data", {})
-        lines.append("\n## 전일 테마 대장주 상세 데이터")
         for theme in theme_analysis.get("themes", []):
-            lines.append(f"\n### {theme.get('theme_name')}")
             for stock in theme.get("leader_stocks", []):
                 code = stock.get("code", "")
                 inv = investor_data.get(code, {})
-                criteria = criteria_data.get(code, {})
-
-                parts = [f"{stock.get('name')}({code})"]
-                # 수급
-                foreign = inv.get("foreign_net")
-                if foreign and foreign != 0:
-                    parts.append(f"외국인:{'+'if foreign>0 else ''}{foreign:,}주")
-                institution = inv.get("institution_net")
-                if institution and institution != 0:
-                    parts.append(f"기관:{'+'if institution>0 else ''}{institution:,}주")
-                # 정배열 여부
-                ma = criteria.get("ma_alignment", {})
-                if isinstance(ma, dict) and ma.get("met"):
-                    parts.append("정배열")
+                ma = criteria_data.get(code, {}).get("ma_alignment", {})
+                leader_table.add(0, [
+                    theme.get("theme_name"), stock.get("name"), code,
+                    fmt_qty(inv.get("foreign_net")), fmt_qty(inv.get("institution_net")),
+                    "O" if isinstance(ma, dict) and ma.get("met") else "X",
+                ])
+        leader_table.min_rows = len(leader_table.rows)
 
-                lines.append(f"- {' | '.join(parts)}")
-
-    return "\n".join(lines)
+    return fit_to_budget(["\n".join(lines), tv_table, leader_table], token_budget)
 
 
 def _build_forecast_prompt(context: str) -> str:
@@ -714,6 +725,99 @@ def _fix_leader_priorities(forecast: Dict[str, Any]) -> None:
                 stock["priority"] = idx + 1
 
 
+def _build_intraday_delta_prompt(current_today: List[Dict[str, Any]], market_context: str, delta_text: str) -> str:
+    """장중 증분 재예측 프롬프트: 현재 today 예측 요약 + 아침 대비 변화분만 전달"""
+    today = datetime.now(KST).strftime("%Y년 %m월 %d일")
+    now = datetime.now(KST).strftime("%H:%M")
+    summary_lines = []
+    for t in current_today:
+        leaders = ", ".join(f"{s.get('name')}({s.get('code')})" for s in t.get("leader_stocks", []))
+        summary_lines.append(
+            f"- {t.get('theme_name')} [{t.get('confidence', '')}] 촉매: {t.get('catalyst', '')} | 대장주: {leaders}"
+        )
+    summary = "\n".join(summary_lines) or "- (없음)"
+
+    return f"""당신은 한국 주식시장 테마 예측 전문 애널리스트입니다. 오늘은 {today}, 현재 {now} 장중입니다.
+
+### 현재 오늘의 유망 테마 예측
+시장 환경: {market_context}
+{summary}
+
+### 아침 예측 이후 시장 변화
+{delta_text}
+
+### 임무
+위 변화만을 근거로 기존 예측을 갱신하세요. 필요하면 Google Search로 변화 종목의 오늘 뉴스를 확인하세요.
+- 변화와 무관한 테마는 action "keep"으로 두고 다른 필드는 생략
+- 변화로 확신도/촉매/대장주가 달라진 테마만 action "update"와 바뀐 필드만 기재
+- 근거가 무너진 테마는 action "drop"
+- 변화에서 새 테마가 명확히 드러날 때만 new_themes에 추가 (최대 2개)
+
+### 출력 형식
+반드시 아래 JSON 형식으로만 응답하세요:
+```json
+{{
+  "market_context": "장중 시장 환경 1~2문장 (변화 없으면 빈 문자열)",
+  "updates": [
+    {{"theme_name": "기존 테마명 그대로", "action": "keep|update|drop", "confidence": "높음|보통|낮음", "catalyst": "바뀐 촉매", "leader_stocks": [{{"priority": 1, "name": "종목명", "code": "000000", "reason": "선정 근거", "data_verified": true}}]}}
+  ],
+  "new_themes": [
+    {{"theme_name": "테마명", "description": "배경", "catalyst": "촉매", "confidence": "높음|보통|낮음", "leader_stocks": [{{"priority": 1, "name": "종목명", "code": "000000", "reason": "선정 근거", "data_verified": true}}]}}
+  ]
+}}
+```"""
+
+
+def _run_intraday_incremental(
+    morning_forecast: Dict[str, Any],
+    latest_data: Dict[str, Any],
+    rotation_data: Optional[List[Dict]] = None,
+) -> Optional[Dict]:
+    """장중 증분 재예측: 아침 스냅샷 대비 변화분만으로 today 테마를 패치
+
+    직전 장중 실행 이후 새 변화가 없으면 LLM을 호출하지 않는다.
+
+    Returns:
+        {"market_context", "today", "intraday_last"} 또는 실패 시 None
+    """
+    baseline = morning_forecast["intraday_baseline"]
+    current_today = morning_forecast.get("today", [])
+    tracked = list(baseline.get("investor", {})) + forecast_leader_codes(current_today)
+    current = build_snapshot(latest_data, rotation_data, list(dict.fromkeys(tracked)))
+
+    since_last = diff_snapshots(morning_forecast.get("intraday_last") or baseline, current)
+    if not has_changes(since_last):
+        print("  ✓ 직전 예측 이후 시장 변화 없음 — LLM 호출 건너뜀")
+        return {
+            "market_context": morning_forecast.get("market_context", ""),
+            "today": current_today,
+            "intraday_last": current,
+        }
+
+    delta = diff_snapshots(baseline, current)
+    counts = ", ".join(f"{DELTA_LABELS[k]} {len(v)}건" for k, v in delta.items() if v)
+    print(f"  아침 대비 변화: {counts}")
+    prompt = _build_intraday_delta_prompt(current_today, morning_forecast.get("market_context", ""), format_delta(delta))
+
+    pool = get_key_pool()
+    patch = pool.call(lambda key: _call_gemini(prompt, key), label="장중 증분")
+    if not patch:
+        print("  ⚠ 증분 패치 실패")
+        return None
+
+    today = apply_patch(current_today, patch)
+    remaining = {t.get("theme_name") for t in today}
+    dropped = sum(1 for t in current_today if t.get("theme_name") not in remaining)
+    updated = sum(1 for u in patch.get("updates", []) if u.get("action") == "update")
+    added = len(today) - (len(current_today) - dropped)
+    print(f"  ✓ 증분 패치 적용: 갱신 {updated}개, 신규 {added}개, 제외 {dropped}개 (나머지 유지)")
+    return {
+        "market_context": patch.get("market_context") or morning_forecast.get("market_context", ""),
+        "today": today,
+        "intraday_last": current,
+    }
+
+
 def generate_forecast(
     latest_data: Dict[str, Any],
     theme_history: List[Dict[str, Any]],
@@ -723,6 +827,8 @@ def generate_forecast(
     rotation_data: Optional[List[Dict]] = None,
     global_news: Optional[List[Dict]] = None,
     intraday: bool = False,
+    morning_forecast: Optional[Dict[str, Any]] = None,
+    index_status: Optional[Dict[str, Dict]] = None,
 ) -> Optional[Dict]:
     """유망 테마 예측 실행
 
@@ -735,6 +841,8 @@ def generate_forecast(
         rotation_data: 섹터 로테이션 데이터
         global_news: 글로벌 시장 뉴스
         intraday: 장중 재예측 모드 (경량 파이프라인: Phase1 1회 + Phase2 1회 = 2회)
+        morning_forecast: 기존 theme-forecast.json (장중 모드에서 오늘 아침 스냅샷이 있으면 증분 패치)
+        index_status: 코스피/코스닥 지수 이동평균 상태 (index_series)
 
     Returns:
         예측 결과 dict 또는 실패 시 None
@@ -744,6 +852,22 @@ def generate_forecast(
         print("  ⚠ Gemini API 키가 설정되지 않았습니다")
         return None
 
+    # 장중 증분 모드: 오늘 아침 예측의 스냅샷이 있으면 변화분만으로 패치
+    today_label = datetime.now(KST).strftime("%Y년 %m월 %d일")
+    if (intraday and morning_forecast and morning_forecast.get("intraday_baseline")
+            and morning_forecast.get("forecast_date") == today_label):
+        print("  장중 증분 모드: 아침 예측 대비 변화분만 반영...")
+        patched = _run_intraday_incremental(morning_forecast, latest_data, rotation_data)
+        if patched:
+            forecast = {
+                **{k: morning_forecast.get(k) for k in ("forecast_date", "us_market_summary", "short_term", "long_term")},
+                **patched,
+                "generated_at": datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            _fix_leader_priorities(forecast)
+            return forecast
+        print("  ⚠ 증분 모드 실패, 경량 전체 재예측으로 진행")
+
     context = build_forecast_context(
         latest_data, theme_history,
         us_data=us_data,
@@ -751,6 +875,7 @@ def generate_forecast(
         momentum_scores=momentum_scores,
         rotation_data=rotation_data,
         global_news=global_news,
+        index_status=index_status,
     )
     if not context.strip():
         print("  ⚠ 예측 컨텍스트가 비어있습니다")
@@ -801,144 +926,59 @@ def generate_forecast(
         "long_term": result.get("long_term", []),
     }
     _fix_leader_priorities(forecast)
+    if not intraday:
+        # 장중 증분 재예측의 비교 기준 (아침 시점 시장 스냅샷)
+        forecast["intraday_baseline"] = build_snapshot(
+            latest_data, rotation_data, forecast_leader_codes(forecast["today"]),
+        )
     return forecast
 
 
 def _run_intraday_lightweight(context: str, api_keys: List[str]) -> Optional[Dict]:
     """장중 재예측 경량 파이프라인: Phase1(검색 1회) + Phase2(JSON 1회) = 2회"""
     phase1_prompt = _build_phase1_prompt(context)
+    pool = get_key_pool()
 
-    for key_idx, api_key in enumerate(api_keys):
-        try:
-            print(f"  Phase 1: 검색 + 추론 (키 {key_idx + 1}/{len(api_keys)})...")
-            reasoning = _call_gemini_phase1(phase1_prompt, api_key, use_search=True)
-            if not reasoning:
-                print(f"  ⚠ Phase 1 실패, 다음 키로 전환")
-                continue
-
-            print(f"  Phase 2: JSON 구조화...")
-            result = _call_gemini_phase2(reasoning, api_key)
-            if result:
-                return result
-
-            print(f"  ⚠ Phase 2 실패, 다음 키로 전환")
-        except requests.exceptions.HTTPError as e:
-            status = e.response.status_code if e.response is not None else 0
-            if status in (429, 503):
-                print(f"  ⚠ API 제한 ({status}), 다음 키로 전환")
-                continue
-            if status in (500, 502, 504):
-                print(f"  ⚠ 서버 오류 ({status}), 다음 키로 전환")
-                continue
-            print(f"  ✗ Gemini API 오류 ({status}): {e}")
-            if status in (400, 401, 403):
-                try:
-                    from modules.api_health import report_key_failure
-                    report_key_failure("GEMINI_API_KEY", "invalid", f"HTTP {status}: {e}")
-                except Exception:
-                    pass
-            return None
-        except Exception as e:
-            print(f"  ⚠ 경량 파이프라인 오류: {e}")
-            continue
+    print(f"  Phase 1: 검색 + 추론...")
+    reasoning = pool.call(lambda key: _call_gemini_phase1(phase1_prompt, key, use_search=True), label="Phase 1")
+    if not reasoning:
+        print(f"  ⚠ Phase 1 실패")
+        return None
 
-    return None
+    print(f"  Phase 2: JSON 구조화...")
+    result = pool.call(lambda key: _call_gemini_phase2(reasoning, key), label="Phase 2")
+    if not result:
+        print(f"  ⚠ Phase 2 실패")
+    return result
 
 
 def _run_two_phase_voting(context: str, api_keys: List[str]) -> Optional[Dict]:
     """2-Phase + Self-Consistency Voting 실행"""
     phase1_prompt = _build_phase1_prompt(context)
+    pool = get_key_pool()
 
-    for key_idx, api_key in enumerate(api_keys):
-        try:
-            # Phase 1: Self-Consistency Voting (3회)
-            print(f"  Phase 1: Self-Consistency Voting (키 {key_idx + 1}/{len(api_keys)})...")
-            reasoning = _self_consistency_vote(phase1_prompt, api_key, n_samples=3, use_search=True)
-            if not reasoning:
-                print(f"  ⚠ Phase 1 실패, 다음 키로 전환")
-                continue
-
-            # Phase 2: JSON 구조화 (1회)
-            print(f"  Phase 2: JSON 구조화...")
-            result = _call_gemini_phase2(reasoning, api_key)
-            if result:
-                return result
-
-            print(f"  ⚠ Phase 2 실패, 다음 키로 전환")
-        except requests.exceptions.HTTPError as e:
-            status = e.response.status_code if e.response is not None else 0
-            if status in (429, 503):
-                print(f"  ⚠ API 제한 ({status}), 다음 키로 전환")
-                continue
-            if status in (500, 502, 504):
-                print(f"  ⚠ 서버 오류 ({status}), 다음 키로 전환")
-                continue
-            print(f"  ✗ Gemini API 오류 ({status}): {e}")
-            if status in (400, 401, 403):
-                try:
-                    from modules.api_health import report_key_failure
-                    report_key_failure("GEMINI_API_KEY", "invalid", f"HTTP {status}: {e}")
-                except Exception:
-                    pass
-            return None
-        except Exception as e:
-            print(f"  ⚠ 2-Phase 실행 오류: {e}")
-            continue
+    # Phase 1: Self-Consistency Voting (3회, 키 풀에 분산)
+    print(f"  Phase 1: Self-Consistency Voting...")
+    reasoning = _self_consistency_vote(phase1_prompt, n_samples=3, use_search=True, key_pool=pool)
+    if not reasoning:
+        print(f"  ⚠ Phase 1 실패")
+        return None
 
-    return None
+    # Phase 2: JSON 구조화 (1회)
+    print(f"  Phase 2: JSON 구조화...")
+    result = pool.call(lambda key: _call_gemini_phase2(reasoning, key), label="Phase 2")
+    if not result:
+        print(f"  ⚠ Phase 2 실패")
+    return result
 
 
 def _run_single_call_fallback(context: str, api_keys: List[str]) -> Optional[Dict]:
-    """기존 단일 호출 fallback"""
+    """기존 단일 호출 fallback (키당 최대 3회 상당, 냉각/키 전환은 키 풀이 담당)"""
     prompt = _build_forecast_prompt(context)
-    max_retries_per_key = 3
-
-    for key_idx, api_key in enumerate(api_keys):
-        for attempt in range(max_retries_per_key):
-            try:
-                print(f"  Fallback 호출 중... (키 {key_idx + 1}/{len(api_keys)}, 시도 {attempt + 1}/{max_retries_per_key})")
-                result = _call_gemini(prompt, api_key)
-                if result:
-                    return result
-                print("  ⚠ Gemini 응답이 비어있습니다")
-            except requests.exceptions.HTTPError as e:
-                status = e.response.status_code if e.response is not None else 0
-                if status in (429, 503):
-                    if attempt < max_retries_per_key - 1:
-                        wait = 2 ** (attempt + 1)
-                        print(f"  ⚠ API 제한 ({status}), {wait}초 후 재시도...")
-                        time.sleep(wait)
-                        continue
-                    else:
-                        break
-                elif status in (500, 502, 504):
-                    if attempt < max_retries_per_key - 1:
-                        wait = 2 ** (attempt + 1)
-                        print(f"  ⚠ 서버 오류 ({status}), {wait}초 후 재시도...")
-                        time.sleep(wait)
-                        continue
-                    else:
-                        break
-                else:
-                    print(f"  ✗ Gemini API 오류 ({status}): {e}")
-                    if status in (400, 401, 403):
-                        try:
-                            from modules.api_health import report_key_failure
-                            report_key_failure("GEMINI_API_KEY", "invalid", f"HTTP {status}: {e}")
-                        except Exception:
-                            pass
-                    return None
-            except json.JSONDecodeError as e:
-                print(f"  ⚠ JSON 파싱 실패: {e}")
-                if attempt < max_retries_per_key - 1:
-                    time.sleep(2)
-                    continue
-                break
-            except Exception as e:
-                print(f"  ✗ API 호출 실패: {e}")
-                return None
+    pool = get_key_pool()
 
-    return None
+    print(f"  Fallback 호출 중... (키 {len(pool)}개 풀)")
+    return pool.call(lambda key: _call_gemini(prompt, key), max_attempts=len(pool) * 3, label="Fallback")
 
 
 def save_forecast_to_supabase(forecast: Dict[str, Any]) -> bool:
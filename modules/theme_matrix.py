@@ -0,0 +1,213 @@
+"""
+테마 등장 행렬 (테마 × 거래일)
+
+테마 히스토리의 테마명을 테마 레지스트리 ID로 한 번만 intern하여 bool 행렬로 만들고,
+등장 빈도·연속 등장(streak)·감쇠 가중 모멘텀·라이프사이클 판정을 NumPy 벡터 연산으로 계산한다.
+history/*.json은 30일만 보관되므로, 날짜별 테마 요약을 theme-history-index.json에
+누적(최대 THEME_INDEX_MAX_DAYS일)하여 250거래일 이상의 장기 구간도 같은 비용으로 다룬다.
+"""
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from modules.theme_registry import ThemeRegistry, get_theme_registry
+from modules.utils import KST
+
+THEME_INDEX_FILENAME = "theme-history-index.json"
+THEME_INDEX_MAX_DAYS = 400
+
+
+# ── 테마 히스토리 인덱스 ──────────────────────────────────────
+
+def _summarize_themes(themes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """인덱스 저장용 테마 요약 (테마명 + 대장주 코드/이름/거래대금)"""
+    summary = []
+    for theme in themes or []:
+        name = theme.get("theme_name", "")
+        if not name:
+            continue
+        leaders = []
+        for s in theme.get("leader_stocks", []):
+            if s.get("code"):
+                leader = {"code": s["code"], "name": s.get("name", "")}
+                if s.get("trading_value"):
+                    leader["trading_value"] = s["trading_value"]
+                leaders.append(leader)
+        summary.append({"theme_name": name, "leader_stocks": leaders})
+    return summary
+
+
+def load_theme_history_index(output_dir: Path, write: bool = True) -> Dict[str, List[Dict[str, Any]]]:
+    """{날짜: [테마 요약]} (없거나 손상되면 history/*.json에서 재구성)
+
+    write=False면 재구성 결과를 파일로 남기지 않는다 (인덱스를 커밋하지 않는 읽기 전용 호출용).
+    """
+    index_path = Path(output_dir) / THEME_INDEX_FILENAME
+    if index_path.exists():
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("days", {})
+        except (OSError, ValueError) as e:
+            print(f"  ⚠ 테마 히스토리 인덱스 손상, 재구성: {e}")
+    return rebuild_theme_history_index(output_dir, write=write)
+
+
+def _write_index(output_dir: Path, days: Dict[str, List[Dict[str, Any]]]) -> None:
+    keep = sorted(days)[-THEME_INDEX_MAX_DAYS:]
+    index_data = {
+        "updated_at": datetime.now(KST).strftime("%Y-%m-%d %H:%M:%S"),
+        "days": {d: days[d] for d in keep},
+    }
+    index_path = Path(output_dir) / THEME_INDEX_FILENAME
+    tmp_path = index_path.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index_data, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, index_path)
+
+
+def rebuild_theme_history_index(output_dir: Path, write: bool = True) -> Dict[str, List[Dict[str, Any]]]:
+    """history/*.json에서 날짜별 마지막 테마 분석으로 인덱스 생성 (write=True면 파일 저장)"""
+    history_dir = Path(output_dir) / "history"
+    days: Dict[str, List[Dict[str, Any]]] = {}
+    if not history_dir.exists():
+        return days
+    # 오래된 파일부터 읽어 같은 날짜는 마지막 파일이 덮어씀
+    for file_path in sorted(history_dir.glob("*.json")):
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        themes = (data.get("theme_analysis") or {}).get("themes")
+        if themes:
+            days[file_path.stem[:10]] = _summarize_themes(themes)
+    if days and write:
+        _write_index(output_dir, days)
+    return days
+
+
+def update_theme_history_index(output_dir: Path, date_str: str, themes: List[Dict[str, Any]]) -> None:
+    """오늘 테마 분석을 인덱스에 반영 (같은 날짜는 최신 분석으로 교체)"""
+    if not themes:
+        return
+    days = load_theme_history_index(output_dir)
+    days[date_str] = _summarize_themes(themes)
+    _write_index(output_dir, days)
+
+
+def index_to_history(days: Dict[str, List[Dict[str, Any]]], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """인덱스를 load_theme_history와 같은 형식([{date, themes}], 최신순)으로 변환"""
+    dates = sorted(days, reverse=True)
+    if limit:
+        dates = dates[:limit]
+    return [{"date": d, "themes": days[d]} for d in dates]
+
+
+# ── 등장 행렬 ────────────────────────────────────────────────
+
+class ThemeMatrix:
+    """theme × day bool 행렬 (행은 테마 레지스트리 ID, 열은 오래된 날짜 → 최근 날짜)"""
+
+    def __init__(self, theme_history: List[Dict[str, Any]], registry: Optional[ThemeRegistry] = None):
+        registry = registry or get_theme_registry()
+        entries = sorted(theme_history or [], key=lambda x: x.get("date", ""))
+        self.dates: List[str] = [e.get("date", "") for e in entries]
+        self.keys: List[int] = []  # 테마 ID
+        self.names: List[str] = []  # 첫 등장 원본 이름
+        row_of: Dict[int, int] = {}
+        cells = []
+        for day_idx, entry in enumerate(entries):
+            for theme in entry.get("themes", []):
+                name = theme.get("theme_name", "")
+                if not name:
+                    continue
+                key = registry.intern(name)
+                row = row_of.get(key)
+                if row is None:
+                    row = row_of[key] = len(self.keys)
+                    self.keys.append(key)
+                    self.names.append(name)
+                cells.append((row, day_idx))
+
+        self.row_of = row_of
+        self.matrix = np.zeros((len(self.keys), len(self.dates)), dtype=bool)
+        if cells:
+            rows, cols = np.array(cells).T
+            self.matrix[rows, cols] = True
+
+    @property
+    def n_days(self) -> int:
+        return self.matrix.shape[1]
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def window(self, days: int) -> "ThemeMatrix":
+        """최근 N일 구간 (해당 구간에 등장한 테마만)"""
+        sub = ThemeMatrix.__new__(ThemeMatrix)
+        cols = self.matrix[:, -days:] if days else self.matrix
+        active = np.flatnonzero(cols.any(axis=1))
+        sub.dates = self.dates[-days:] if days else list(self.dates)
+        sub.keys = [self.keys[i] for i in active]
+        sub.names = [self.names[i] for i in active]
+        sub.row_of = {k: i for i, k in enumerate(sub.keys)}
+        sub.matrix = cols[active]
+        return sub
+
+    def frequency(self) -> np.ndarray:
+        """테마별 등장일 수"""
+        return self.matrix.sum(axis=1)
+
+    def _runs(self):
+        """연속 등장 구간 (행 인덱스, 시작 열, 길이)"""
+        padded = np.pad(self.matrix.astype(np.int8), ((0, 0), (1, 1)))
+        edges = np.diff(padded, axis=1)
+        start_rows, starts = np.nonzero(edges == 1)
+        _, ends = np.nonzero(edges == -1)
+        # np.nonzero는 행 우선 순서이므로 시작/종료가 같은 순서로 짝지어진다
+        return start_rows, starts, ends - starts
+
+    def max_streak(self) -> np.ndarray:
+        """테마별 최장 연속 등장일"""
+        out = np.zeros(len(self), dtype=int)
+        rows, _, lengths = self._runs()
+        np.maximum.at(out, rows, lengths)
+        return out
+
+    def run_count(self) -> np.ndarray:
+        """테마별 연속 등장 구간 수 (재등장 횟수 + 1)"""
+        rows, _, _ = self._runs()
+        return np.bincount(rows, minlength=len(self))
+
+    def current_streak(self) -> np.ndarray:
+        """마지막 날짜까지 이어지는 연속 등장일"""
+        if not self.n_days:
+            return np.zeros(len(self), dtype=int)
+        reversed_ = self.matrix[:, ::-1]
+        # 뒤에서부터 첫 미등장 위치 = 현재 연속 일수 (전부 등장이면 전체 일수)
+        first_gap = np.argmin(reversed_, axis=1)
+        return np.where(reversed_.all(axis=1), self.n_days, first_gap)
+
+    def last_seen(self) -> np.ndarray:
+        """마지막 등장 열 인덱스 (미등장 -1)"""
+        if not self.n_days:
+            return np.full(len(self), -1)
+        last = self.n_days - 1 - np.argmax(self.matrix[:, ::-1], axis=1)
+        return np.where(self.matrix.any(axis=1), last, -1)
+
+    def first_seen(self) -> np.ndarray:
+        """첫 등장 열 인덱스 (미등장 -1)"""
+        first = np.argmax(self.matrix, axis=1)
+        return np.where(self.matrix.any(axis=1), first, -1)
+
+    def decay_momentum(self, half_life: float = 3.0) -> np.ndarray:
+        """반감기 가중 등장 합 / 최대 가능 합 (0~1, 최근 등장일수록 큰 비중)"""
+        if not self.n_days:
+            return np.zeros(len(self))
+        ages = np.arange(self.n_days - 1, -1, -1)
+        weights = 0.5 ** (ages / half_life)
+        return (self.matrix @ weights) / weights.sum()
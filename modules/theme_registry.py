@@ -0,0 +1,188 @@
+"""
+테마 레지스트리 (정규 테마 ID)
+
+Gemini가 돌려주는 테마명은 "AI/반도체(HBM)", "AI 반도체", "반도체 AI 테마"처럼 표기가
+매번 조금씩 다르다. 원본 테마명을 정규화 + 별칭/유사도 매칭으로 정수 ID에 한 번만
+매핑(intern)해 두고, 모멘텀·로테이션·투표·백테스트는 ID로 비교한다.
+
+매칭 순서:
+1. 원본 이름 캐시 (이미 본 이름은 dict 조회 1회)
+2. 정규화 키 일치 (괄호·구분기호·공백·"테마/관련주" 접미어 제거, 영문 소문자)
+3. 토큰 집합 일치 ("반도체 AI" == "AI 반도체")
+4. 동의어 시드 (방위산업 → 방산 등)
+5. difflib 유사도 (THEME_FUZZY_CUTOFF 이상) — 새 이름이 처음 등장할 때만 수행
+일치하는 테마가 없으면 새 ID를 발급한다. 레지스트리는 .cache/theme_registry.json에
+저장되어 실행 간에 별칭이 누적된다.
+"""
+import atexit
+import difflib
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config.settings import CACHE_DIR
+
+THEME_REGISTRY_PATH = CACHE_DIR / "theme_registry.json"
+THEME_FUZZY_CUTOFF = 0.85
+
+_SUFFIXES = ("관련주", "테마주", "테마", "섹터", "업종")
+
+# 표기가 달라 유사도로는 묶이지 않는 동의어 (정규화 키 → 대표 정규화 키)
+_SEED_ALIASES = {
+    "방위산업": "방산",
+    "k방산": "방산",
+    "원자력": "원전",
+    "원자력발전": "원전",
+    "이차전지": "2차전지",
+    "제약바이오": "바이오",
+    "인공지능": "ai",
+}
+
+
+@lru_cache(maxsize=8192)
+def _tokens(name: str) -> Tuple[str, ...]:
+    """정규화 토큰 (괄호 내용 제거, 구분기호→공백, 영문 소문자, 접미어 제거)"""
+    name = re.sub(r"\([^)]*\)|\[[^\]]*\]", " ", name)
+    name = re.sub(r"[/·・\-_,&+|]", " ", name).lower()
+    tokens = name.split()
+    if len(tokens) > 1 and tokens[-1] in _SUFFIXES:
+        tokens.pop()
+    elif tokens:
+        suffix = next((s for s in _SUFFIXES if tokens[-1].endswith(s) and tokens[-1] != s), None)
+        if suffix:
+            tokens[-1] = tokens[-1][: -len(suffix)]
+    return tuple(tokens)
+
+
+def normalize_key(name: str) -> str:
+    """정확 매칭용 키 (토큰 공백 없이 연결)"""
+    return "".join(_tokens(name))
+
+
+def _token_set_key(name: str) -> str:
+    return " ".join(sorted(_tokens(name)))
+
+
+class ThemeRegistry:
+    """원본 테마명 → 정규 테마 ID"""
+
+    def __init__(self, path=THEME_REGISTRY_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.names: Dict[int, str] = {}  # ID → 대표 이름 (첫 등장 원본)
+        self._by_key: Dict[str, int] = {}  # 정규화 키 → ID
+        self._by_token_set: Dict[str, int] = {}  # 토큰 집합 키 → ID
+        self._by_raw: Dict[str, int] = {}  # 원본 이름 → ID (프로세스 캐시)
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"  ⚠ 테마 레지스트리 로드 실패, 새로 생성: {e}")
+            return
+        for tid, entry in data.get("themes", {}).items():
+            tid = int(tid)
+            self.names[tid] = entry.get("name", "")
+            for alias in entry.get("aliases", []):
+                self._by_key[alias] = tid
+        for key, tid in list(self._by_key.items()):
+            self._by_token_set.setdefault(_token_set_key(key), tid)
+
+    def save(self) -> None:
+        """별칭이 추가된 경우에만 저장 (원자적 쓰기)"""
+        with self._lock:
+            if not self._dirty or not self.path:
+                return
+            aliases: Dict[int, List[str]] = {}
+            for key, tid in self._by_key.items():
+                aliases.setdefault(tid, []).append(key)
+            data = {"themes": {
+                str(tid): {"name": name, "aliases": sorted(aliases.get(tid, []))}
+                for tid, name in sorted(self.names.items())
+            }}
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, indent=1)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError as e:
+                print(f"  ⚠ 테마 레지스트리 저장 실패: {e}")
+
+    def intern(self, name: str) -> int:
+        """원본 테마명의 정규 ID (처음 보는 테마면 새 ID 발급)"""
+        tid = self._by_raw.get(name)
+        if tid is not None:
+            return tid
+        with self._lock:
+            tid = self._match(name)
+            self._by_raw[name] = tid
+            return tid
+
+    def lookup(self, name: str) -> Optional[int]:
+        """이미 등록된 테마면 ID, 아니면 None (새 ID·별칭을 만들지 않음 - 자유 텍스트 후보용)"""
+        tid = self._by_raw.get(name)
+        if tid is not None:
+            return tid
+        with self._lock:
+            return self._find(name, normalize_key(name) or name.strip())
+
+    def _find(self, name: str, key: str) -> Optional[int]:
+        tid = self._by_key.get(key)
+        if tid is None and key in _SEED_ALIASES:
+            seed = _SEED_ALIASES[key]
+            tid = self._find(seed, normalize_key(seed) or seed)
+        if tid is None:
+            tid = self._by_token_set.get(_token_set_key(name))
+        if tid is None and self._by_key:
+            close = difflib.get_close_matches(key, self._by_key.keys(), n=1, cutoff=THEME_FUZZY_CUTOFF)
+            if close:
+                tid = self._by_key[close[0]]
+        return tid
+
+    def _match(self, name: str) -> int:
+        key = normalize_key(name) or name.strip()
+        tid = self._find(name, key)
+        if tid is None and key in _SEED_ALIASES:
+            tid = self._match(_SEED_ALIASES[key])
+        if tid is None:
+            tid = max(self.names, default=0) + 1
+            self.names[tid] = name.strip()
+        if key not in self._by_key:
+            self._by_key[key] = tid
+            self._by_token_set.setdefault(_token_set_key(name), tid)
+            self._dirty = True
+        return tid
+
+    def intern_all(self, names: Iterable[str]) -> List[int]:
+        return [self.intern(n) for n in names]
+
+    def name(self, tid: int) -> str:
+        """ID의 대표 이름"""
+        return self.names.get(tid, "")
+
+    def same(self, a: str, b: str) -> bool:
+        return self.intern(a) == self.intern(b)
+
+
+_shared_registry: Optional[ThemeRegistry] = None
+_shared_registry_lock = threading.Lock()
+
+
+def get_theme_registry() -> ThemeRegistry:
+    """프로세스 공용 테마 레지스트리 (종료 시 자동 저장)"""
+    global _shared_registry
+    with _shared_registry_lock:
+        if _shared_registry is None:
+            _shared_registry = ThemeRegistry()
+            atexit.register(_shared_registry.save)
+        return _shared_registry
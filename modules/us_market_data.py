@@ -1,18 +1,10 @@
 """미국 시장 데이터 + 심리지표 + 경제 캘린더 + 테마 모멘텀 모듈"""
 import os
-import re
 from typing import Dict, List, Optional
 
+import numpy as np
 
-def _normalize_theme_name(name: str) -> str:
-    """모멘텀/로테이션 비교용 테마명 정규화
-
-    괄호 내용 제거, 특수문자→공백 통일, 양쪽 공백 제거.
-    예: "AI/반도체(HBM)" → "AI 반도체"
-    """
-    name = re.sub(r'\([^)]*\)', '', name)
-    name = re.sub(r'[/·・\-]', ' ', name)
-    return re.sub(r'\s+', ' ', name).strip()
+from modules.theme_matrix import ThemeMatrix
 
 
 def fetch_us_market_data() -> Optional[Dict]:
@@ -147,58 +139,36 @@ def fetch_global_market_news() -> Optional[List[Dict]]:
         return None
 
 
-def calculate_theme_momentum(theme_history: List[Dict]) -> List[Dict]:
-    """7일 히스토리에서 테마별 모멘텀 점수 계산
+def calculate_theme_momentum(theme_history: List[Dict], half_life: float = 3.0) -> List[Dict]:
+    """테마 히스토리에서 테마별 모멘텀 점수 계산 (기간 제한 없음, 테마 등장 행렬 기반)
 
     점수 = frequency(0.4) + recency(0.3) + continuity(0.3)
+    decay_score: 반감기(half_life일) 가중 등장 비율
     """
     if not theme_history:
         return []
 
-    # 날짜순 정렬 (오래된 순)
-    sorted_history = sorted(theme_history, key=lambda x: x.get("date", ""))
-    total_days = len(sorted_history)
-
-    # 테마별 등장 일자 인덱스 수집 (정규화된 이름으로 그룹핑)
-    theme_days = {}  # normalized_name -> [day_index, ...]
-    theme_original = {}  # normalized_name -> 원본 이름 (첫 등장 기준)
-    for day_idx, entry in enumerate(sorted_history):
-        for theme in entry.get("themes", []):
-            name = theme.get("theme_name", "")
-            if name:
-                normalized = _normalize_theme_name(name)
-                theme_days.setdefault(normalized, []).append(day_idx)
-                if normalized not in theme_original:
-                    theme_original[normalized] = name
-
-    result = []
-    for normalized, days in theme_days.items():
-        name = theme_original[normalized]
-        frequency = len(days) / total_days
-
-        # recency: 마지막 등장 이후 경과일
-        days_since_last = (total_days - 1) - max(days)
-        recency = 1.0 / (days_since_last + 1)
-
-        # continuity: 최장 연속 등장일 / 총 등장일
-        max_streak = 1
-        current_streak = 1
-        sorted_days = sorted(days)
-        for i in range(1, len(sorted_days)):
-            if sorted_days[i] == sorted_days[i - 1] + 1:
-                current_streak += 1
-                max_streak = max(max_streak, current_streak)
-            else:
-                current_streak = 1
-        continuity = max_streak / len(days) if days else 0
-
-        score = frequency * 0.4 + recency * 0.3 + continuity * 0.3
-        result.append({
-            "theme_name": name,
-            "score": round(score, 3),
-            "frequency": len(days),
-            "streak": max_streak,
-        })
+    tm = ThemeMatrix(theme_history)
+    if not len(tm):
+        return []
 
+    freq = tm.frequency()
+    streak = tm.max_streak()
+    # recency: 마지막 등장 이후 경과일, continuity: 최장 연속 등장일 / 총 등장일
+    recency = 1.0 / ((tm.n_days - 1) - tm.last_seen() + 1)
+    continuity = streak / np.maximum(freq, 1)
+    scores = (freq / tm.n_days) * 0.4 + recency * 0.3 + continuity * 0.3
+    decay = tm.decay_momentum(half_life)
+
+    result = [
+        {
+            "theme_name": tm.names[i],
+            "score": round(float(scores[i]), 3),
+            "frequency": int(freq[i]),
+            "streak": int(streak[i]),
+            "decay_score": round(float(decay[i]), 3),
+        }
+        for i in range(len(tm))
+    ]
     result.sort(key=lambda x: x["score"], reverse=True)
     return result
@@ -0,0 +1,61 @@
+"""backtest 판정/저장 경로 스모크 테스트 (Supabase 대신 가짜 클라이언트)
+
+    python -m unittest discover -s tests -t .
+"""
+import json
+import unittest
+from datetime import datetime, timedelta
+
+from modules.backtest import evaluate_prediction, update_prediction_status
+from modules.utils import KST
+
+
+class _FakeQuery:
+    def __init__(self, calls, table):
+        self.calls = calls
+        self.table = table
+
+    def update(self, data):
+        self.calls.append(("update", self.table, data))
+        return self
+
+    def eq(self, column, value):
+        self.calls.append(("eq", column, value))
+        return self
+
+    def execute(self):
+        self.calls.append(("execute",))
+        return self
+
+
+class _FakeClient:
+    def __init__(self):
+        self.calls = []
+
+    def table(self, name):
+        return _FakeQuery(self.calls, name)
+
+
+class BacktestTest(unittest.TestCase):
+    def test_evaluate_prediction_parses_json_leader_stocks(self):
+        prediction = {
+            "category": "today",
+            "prediction_date": (datetime.now(KST) - timedelta(days=10)).strftime("%Y-%m-%d"),
+            "leader_stocks": json.dumps([{"code": "005930"}, {"code": "000660"}]),
+        }
+        self.assertEqual(evaluate_prediction(prediction, {"005930": 5.0, "000660": 0.5}, 1.0), "hit")
+        self.assertEqual(evaluate_prediction(prediction, {"005930": 1.5, "000660": 0.5}, 1.0), "missed")
+        self.assertEqual(evaluate_prediction({**prediction, "leader_stocks": "not json"}, {}, 0.0), "expired")
+
+    def test_update_prediction_status_serializes_performance(self):
+        client = _FakeClient()
+        update_prediction_status(client, 7, "hit", {"005930": 5.0})
+        _, table, data = client.calls[0]
+        self.assertEqual(table, "theme_predictions")
+        self.assertEqual(data["status"], "hit")
+        self.assertEqual(json.loads(data["actual_performance"]), {"005930": 5.0})
+        self.assertIn(("eq", "id", 7), client.calls)
+
+
+if __name__ == "__main__":
+    unittest.main()